@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class AccountsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'accounts'
+
+    def ready(self):
+        """ Connect the user cache invalidation receivers. """
+        # pylint: disable=import-outside-toplevel, unused-import
+        from . import signals  # noqa: F401
@@ -0,0 +1,54 @@
+""" Cache the logged in user so it is not loaded on every request. """
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+
+
+def user_cache_key(user_id):
+    """ Return the cache key for a user. """
+    return f'auth_user:{user_id}'
+
+
+def invalidate_user(user_id):
+    """ Remove a user from the cache after it has changed. """
+    cache.delete(user_cache_key(user_id))
+
+
+def get_cached_user(request):
+    """
+    Return the user for the session, loading it from the cache where
+    possible. The session auth hash is checked against the cached user
+    in the same way as django.contrib.auth.get_user so changing the
+    password still logs out other sessions.
+
+    Without a cache shared by every worker the user is always loaded,
+    as a user changed through one worker, such as one no longer a
+    superuser, would stay in the cache of the others.
+    """
+    if not settings.SHARED_CACHE:
+        return auth.get_user(request)
+    try:
+        user_id = request.session[auth.SESSION_KEY]
+        backend_path = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if user is not None:
+        session_hash = request.session.get(auth.HASH_SESSION_KEY)
+        if session_hash and constant_time_compare(
+                session_hash, user.get_session_auth_hash()):
+            return user
+        cache.delete(key)
+
+    # Load and verify the user from the database and cache it
+    # for the following requests.
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
@@ -0,0 +1,22 @@
+""" Middleware for the accounts app. """
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+from .auth_cache import get_cached_user
+
+
+def get_user(request):
+    """ Load the user once per request. """
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_cached_user(request)
+    return request._cached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    A replacement for the Django AuthenticationMiddleware
+    which reads the logged in user from the cache.
+    """
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
@@ -0,0 +1,38 @@
+""" Keep the cached users up to date. """
+from allauth.account import signals as allauth_signals
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .auth_cache import invalidate_user
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """
+    Remove a user from the cache when it is saved, which includes
+    password changes and changes to permissions or the email address.
+    """
+    invalidate_user(instance.pk)
+
+
+@receiver(user_logged_out)
+@receiver(allauth_signals.password_changed)
+@receiver(allauth_signals.password_set)
+@receiver(allauth_signals.password_reset)
+@receiver(allauth_signals.email_changed)
+@receiver(allauth_signals.email_confirmed)
+@receiver(allauth_signals.email_added)
+@receiver(allauth_signals.email_removed)
+def account_changed(sender, request=None, user=None, **kwargs):
+    """
+    Remove the user from the cache on logout and when their account
+    is changed through allauth.
+    """
+    # The email confirmed signal is sent with the email address.
+    if user is None and 'email_address' in kwargs:
+        user = kwargs['email_address'].user
+    if user is not None and user.pk is not None:
+        invalidate_user(user.pk)
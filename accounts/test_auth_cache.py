@@ -0,0 +1,72 @@
+""" Testcases for the cached session and user loading. """
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .auth_cache import user_cache_key
+
+
+@override_settings(
+    SHARED_CACHE=True,
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class TestAuthCache(TestCase):
+    """ Tests for the cached authentication middleware. """
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            'john', 'john@email.com', 'johnpassword')
+        self.client.login(username='john', password='johnpassword')
+
+    def test_repeat_requests_do_not_query_session_or_user(self):
+        """
+        Test that once cached an authenticated request only runs the
+        view's own query.
+        """
+        # Loads the user from the database and caches it.
+        with self.assertNumQueries(2):
+            response = self.client.get('/bookings/my_bookings')
+        self.assertEqual(response.status_code, 200)
+
+        # Session and user now come from the cache.
+        with self.assertNumQueries(1):
+            response = self.client.get('/bookings/my_bookings')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_password_change_invalidates_cached_user(self):
+        """
+        Test that changing the password removes the cached user and
+        logs out the session as it would without the cache.
+        """
+        self.client.get('/bookings/my_bookings')
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+
+        self.user.set_password('newpassword')
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        response = self.client.get('/bookings/my_bookings')
+        self.assertEqual(response.status_code, 302)
+
+    def test_logout_invalidates_cached_user(self):
+        """ Test logging out removes the cached user. """
+        self.client.get('/bookings/my_bookings')
+        self.client.logout()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+    @override_settings(
+        SHARED_CACHE=False,
+        SESSION_ENGINE='django.contrib.sessions.backends.db')
+    def test_user_not_cached_without_shared_cache(self):
+        """
+        Test the user is loaded on every request when the cache is held
+        by each worker, so a change made through another is seen at once.
+        """
+        self.user.is_superuser = True
+        self.user.save()
+        self.client.get('/bookings/my_bookings')
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+        # Changed through another worker, which clears only its cache.
+        User.objects.filter(pk=self.user.pk).update(is_superuser=False)
+        response = self.client.get('/bookings/my_bookings')
+        self.assertFalse(response.context['user'].is_superuser)
@@ -1,22 +1,71 @@
 from django.contrib import admin
 
 """ Admin panel set-up for the bookings app. """
-from .models import Booking
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from .models import Booking, WaitlistEntry
+from .search import matching_ids
+
+# Tables with fewer rows than this are counted exactly.
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator which, for an unfiltered list on PostgreSQL, takes the
+    number of rows from the planner statistics rather than counting
+    every row of a large table. Smaller tables, filtered lists and
+    other databases are counted as usual.
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if not queryset.query.where and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class '
+                    'WHERE relname = %s', [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] > ESTIMATED_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
+
+
+class BookingChangeList(ChangeList):
+    """
+    Load only the columns shown in the booking list, and those the
+    booking signals read when bookings are deleted from it.
+    """
+    def get_queryset(self, request):
+        return super().get_queryset(request).only(
+            'name', 'email', 'date', 'time', 'end_time', 'party_size',
+            'restaurant', 'customer', 'customer__username')
 
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     """
-    Admin options for the Booking model.
+    Admin options for the Booking model. The list is kept fast on a
+    large table by browsing through the date index, estimating the
+    total and not counting the unfiltered bookings.
     """
-    fields = ('date', 'time', 'party_size', 'tables', 'table_numbers',
+    fields = ('restaurant', 'date', 'time', 'party_size', 'tables',
+              'table_numbers',
               'customer', 'name', 'email', 'phone_number',
               'special_requirements', 'updated')
-    list_display = ('name', 'email', 'date', 'time', 'party_size')
-    readonly_fields = ('date', 'time', 'party_size', 'tables')
-    search_fields = ['name']
-    list_filter = ('date', 'party_size', 'updated')
+    list_display = ('name', 'email', 'date', 'time', 'party_size',
+                    'customer')
+    list_select_related = ('customer',)
+    readonly_fields = ('restaurant', 'date', 'time', 'party_size', 'tables')
+    search_fields = ['name', 'email', 'phone_number']
+    list_filter = ('restaurant', 'party_size', 'updated')
+    date_hierarchy = 'date'
     ordering = ('-date', '-time')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     # Enable delete action for this model
     actions = ['delete_selected']
 
@@ -26,3 +75,30 @@ class BookingAdmin(admin.ModelAdmin):
         without checking for availability.
         """
         return False
+
+    def get_changelist(self, request, **kwargs):
+        return BookingChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search through the booking search index, which allows for
+        typos, rather than scanning every booking. Every booking which
+        may match is listed, and the change list pages them as usual.
+        """
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(id__in=matching_ids(search_term)), False
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    """
+    Admin options for the WaitlistEntry model.
+    """
+    list_display = ('name', 'date', 'earliest_time', 'latest_time',
+                    'party_size', 'offered')
+    search_fields = ['name']
+    list_filter = ('restaurant', 'date', 'offered')
+    ordering = ('-date', 'created')
+    # Enable delete action for this model
+    actions = ['delete_selected']
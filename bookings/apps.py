@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class TablesBookingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bookings'
+
+    def ready(self):
+        """ Connect the booking signal receivers. """
+        # pylint: disable=import-outside-toplevel, unused-import
+        from . import live, rollups, search, signals, slot_cache, \
+            waitlist  # noqa: F401
@@ -0,0 +1,82 @@
+""" Move past bookings out of the live Booking table. """
+from django.db import transaction
+from django.db.models import BooleanField, F, Value
+
+from .models import Booking, ArchivedBooking
+from .rollups import archiving
+
+# Fields returned by the booking history for live and archived bookings.
+HISTORY_FIELDS = ArchivedBooking.COPIED_FIELDS
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Archive up to batch_size bookings from before the cutoff date with
+    their tables in one transaction. Returns the number archived.
+    """
+    with transaction.atomic():
+        bookings = list(Booking.objects.filter(
+            date__lt=cutoff).order_by('id')[:batch_size])
+        if not bookings:
+            return 0
+        booking_ids = [booking.id for booking in bookings]
+
+        ArchivedBooking.objects.bulk_create([
+            ArchivedBooking(original_id=booking.id, **{
+                field: getattr(booking, field)
+                for field in ArchivedBooking.COPIED_FIELDS})
+            for booking in bookings])
+        # Look up the new ids as bulk_create only returns
+        # them on some databases.
+        archived_ids = dict(ArchivedBooking.objects.filter(
+            original_id__in=booking_ids).values_list('original_id', 'id'))
+
+        links = Booking.tables.through.objects.filter(
+            booking_id__in=booking_ids).values_list('booking_id', 'table_id')
+        Through = ArchivedBooking.tables.through
+        Through.objects.bulk_create([
+            Through(archivedbooking_id=archived_ids[booking_id],
+                    table_id=table_id)
+            for booking_id, table_id in links])
+
+        # The archived bookings are still counted in the rollups.
+        with archiving():
+            Booking.objects.filter(id__in=booking_ids).delete()
+    return len(bookings)
+
+
+def archive_bookings(cutoff, batch_size=1000):
+    """
+    Archive all of the bookings from before the cutoff date in batches.
+    Returns the number archived.
+    """
+    total = 0
+    while True:
+        archived = archive_batch(cutoff, batch_size)
+        if not archived:
+            return total
+        total += archived
+
+
+def booking_history(start=None, end=None):
+    """
+    Return the live and archived bookings between the start and end
+    dates (inclusive) as dictionaries ordered by date and time. Each row
+    includes the original booking id and whether it has been archived.
+    """
+    live = Booking.objects.all()
+    archived = ArchivedBooking.objects.all()
+    if start:
+        live = live.filter(date__gte=start)
+        archived = archived.filter(date__gte=start)
+    if end:
+        live = live.filter(date__lte=end)
+        archived = archived.filter(date__lte=end)
+
+    live = live.order_by().values(
+        *HISTORY_FIELDS, booking_id=F('id'),
+        is_archived=Value(False, output_field=BooleanField()))
+    archived = archived.order_by().values(
+        *HISTORY_FIELDS, booking_id=F('original_id'),
+        is_archived=Value(True, output_field=BooleanField()))
+    return live.union(archived, all=True).order_by('date', 'time')
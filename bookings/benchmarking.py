@@ -0,0 +1,100 @@
+""" Helpers for the benchmark management commands. """
+import datetime
+import os
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Booking
+
+
+@contextmanager
+def rolled_back():
+    """
+    Run a benchmark in a transaction which is rolled back at the end
+    so that none of the seeded data is kept.
+    """
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def time_call(func, repeat=20):
+    """
+    Call func repeatedly and return the timings in milliseconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'mean': statistics.mean(timings),
+        'median': statistics.median(timings),
+        'min': min(timings),
+    }
+
+
+def seed_bookings(count, first_date, days, tables, batch_size=5000):
+    """
+    Bulk insert count bookings spread over the days from first_date
+    each using one of the tables. Ids are assigned up front so the table
+    links can be inserted in bulk on every database.
+    """
+    next_id = (Booking.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+    Through = Booking.tables.through
+    for offset in range(0, count, batch_size):
+        bookings = []
+        links = []
+        for number in range(offset, min(offset + batch_size, count)):
+            table = tables[number % len(tables)]
+            # Fill each day from opening time in 2 hour sittings.
+            sitting = (number // len(tables)) % 6
+            booking = Booking(
+                id=next_id + number, restaurant_id=table.restaurant_id,
+                date=first_date + datetime.timedelta(days=number % days),
+                time=datetime.time(11 + sitting * 2, 00),
+                party_size=table.size, name=f'Seed {number}',
+                email='seed@email.com', phone_number='01234567890')
+            booking.end_time = booking._generate_end_time()
+            bookings.append(booking)
+            links.append(Through(booking_id=booking.id, table_id=table.id))
+        Booking.objects.bulk_create(bookings)
+        Through.objects.bulk_create(links)
+
+
+# Code run in a new Python process to time starting up. A management
+# command only sets Django up, while a web worker also loads the URLs,
+# views and admin before its first request.
+STARTUP_SCRIPTS = {
+    'command': 'import django; django.setup()',
+    'worker': (
+        'import il_oro_ditalia.wsgi; from django.urls import get_resolver; '
+        'get_resolver().url_patterns'),
+}
+
+
+def run_startup(script, *python_options):
+    """
+    Run a startup script in a new Python process with the current
+    settings. Returns the time taken in milliseconds, the peak memory
+    of the process in kilobytes and what it wrote to stderr.
+    """
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'il_oro_ditalia.settings')
+    # The process reports its own peak memory once started up.
+    script += (
+        '\nimport resource\n'
+        'print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)')
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *python_options, '-c', script],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        check=True)
+    elapsed = (time.perf_counter() - started) * 1000
+    return elapsed, int(result.stdout.split()[-1]), result.stderr
@@ -0,0 +1,196 @@
+""" Import bookings in bulk from CSV or JSON Lines files. """
+import csv
+import io
+import json
+from collections import defaultdict
+from django.db import connection, transaction
+
+from restaurant.models import Table
+from .models import Booking, BookingEvent
+from .forms import BookingImportForm
+from .check_availability import TableSnapshot, load_adjacency, \
+    select_single_table
+from .intervals import IntervalIndex, minutes
+from .occupancy import booked_intervals, held_days, table_bookings
+from .live import publish_bookings
+from .rollups import add_booking, change_rollups
+from .slot_cache import forget_day
+from .search import index_bookings
+from .confirmation_email import send_confirmation_emails
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+
+def read_rows(file, import_format):
+    """
+    Read the booking rows from a text file object as dictionaries.
+    """
+    if import_format == 'jsonl':
+        return [json.loads(line) for line in file if line.strip()]
+    return list(csv.DictReader(file))
+
+
+def read_upload(upload, import_format):
+    """ Read the booking rows from an uploaded file. """
+    text = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+    return read_rows(text, import_format)
+
+
+class DayPlan:
+    """
+    The table occupancy for a single day held in memory so that a batch
+    of bookings can be checked for availability without further queries.
+    """
+    def __init__(self, day, tables, restaurant=None, adjacency=None):
+        self.tables = tables
+        self.adjacency = adjacency
+        through = Booking.tables.through.objects.filter(
+            table_bookings([day]))
+        if restaurant is not None:
+            through = through.filter(booking__restaurant=restaurant)
+        intervals = booked_intervals(through.values_list(
+            'booking__date', 'table_id', 'booking__time',
+            'booking__end_time'))
+        self.busy = IntervalIndex(
+            minutes(start_time, end_time) + (table_id,)
+            for table_id, start_time, end_time in intervals[day])
+
+    def allocate(self, booking):
+        """
+        Select tables for the booking and mark them as busy.
+        Returns the list of tables or None if there is no space.
+        """
+        start, end = minutes(booking.time, booking.end_time)
+        booked = set(self.busy.overlapping(start, end))
+        free = [table for table in self.tables if table.id not in booked]
+        if not free:
+            return None
+        selected = select_single_table(
+            free, booking.party_size, self.adjacency)
+        if not selected:
+            return None
+        if not isinstance(selected, list):
+            selected = [selected]
+        for table in selected:
+            self.busy.add(start, end, table.id)
+        return selected
+
+
+def save_day(allocations):
+    """
+    Save a day's accepted bookings and their tables in one transaction.
+    Bulk creation sends no signals, so the search index, the dashboards,
+    the rollups and the cached slots are brought up to date once for
+    the day rather than once per booking.
+    """
+    bookings = [booking for booking, tables in allocations]
+    # Every booking of an import is made at the same restaurant.
+    restaurant_id = bookings[0].restaurant_id
+    day = bookings[0].date
+    with transaction.atomic():
+        if not connection.features.can_return_rows_from_bulk_insert:
+            latest = Booking.objects.order_by('-id').values_list(
+                'id', flat=True).first() or 0
+        Booking.objects.bulk_create(bookings)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # Look up the new ids as bulk_create only returns them on
+            # some databases. The rows are inserted in the order given.
+            booking_ids = Booking.objects.filter(
+                restaurant_id=restaurant_id, date=day,
+                id__gt=latest).order_by('id').values_list('id', flat=True)
+            for booking, booking_id in zip(bookings, booking_ids):
+                booking.id = booking_id
+        for booking in bookings:
+            booking.saved_restaurant_id = booking.restaurant_id
+            booking.saved_slot = booking.slot
+            booking.saved_details = booking.details
+
+        Through = Booking.tables.through
+        Through.objects.bulk_create([
+            Through(booking_id=booking.id, table_id=table.id)
+            for booking, tables in allocations for table in tables])
+
+        index_bookings(bookings)
+        publish_bookings(
+            restaurant_id, [booking.id for booking in bookings],
+            BookingEvent.CREATED)
+        deltas = {}
+        for booking, tables in allocations:
+            add_booking(
+                deltas, restaurant_id, booking.slot,
+                [table.size for table in tables])
+        change_rollups(deltas)
+        for held_day in {
+                held_day for booking in bookings
+                for held_day in held_days(
+                    booking.date, booking.time, booking.end_time)}:
+            forget_day(restaurant_id, held_day)
+
+
+def import_bookings(rows, send_emails=False, restaurant=None):
+    """
+    Validate and import the booking rows. Rows are grouped by date and
+    checked for availability in time order against the bookings already
+    saved for that day. When a restaurant is given the bookings are made
+    at its tables. Returns a report with the result for each row.
+    """
+    report = [None] * len(rows)
+    days = defaultdict(list)
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            # A JSON Lines line can hold any JSON value, not only objects.
+            report[index] = {
+                'row': index + 1, 'status': 'rejected',
+                'errors': {'__all__': [{
+                    'message': 'Each booking should be a JSON object.',
+                    'code': 'invalid'}]}}
+            continue
+        form = BookingImportForm(data=row)
+        if form.is_valid():
+            booking = form.save(commit=False)
+            booking.end_time = booking._generate_end_time()
+            booking.restaurant = restaurant
+            days[booking.date].append((index, booking))
+        else:
+            report[index] = {
+                'row': index + 1, 'status': 'rejected',
+                'errors': form.errors.get_json_data()}
+
+    tables = Table.objects.order_by('id')
+    if restaurant is not None:
+        tables = tables.filter(restaurant=restaurant)
+    tables = [
+        TableSnapshot(table_id, size)
+        for table_id, size in tables.values_list('id', 'size')]
+    # The floor plan is loaded once for every day of the import.
+    adjacency = load_adjacency(tables)
+    accepted = []
+    for day in sorted(days):
+        plan = DayPlan(day, tables, restaurant, adjacency)
+        allocations = []
+        for index, booking in sorted(
+                days[day], key=lambda item: (item[1].time, item[0])):
+            selected = plan.allocate(booking)
+            if selected:
+                allocations.append((booking, selected))
+                report[index] = {'row': index + 1, 'status': 'accepted'}
+            else:
+                report[index] = {
+                    'row': index + 1, 'status': 'rejected',
+                    'errors': {'__all__': [{
+                        'message': 'Sorry no tables available at that time!',
+                        'code': 'unavailable'}]}}
+        if allocations:
+            save_day(allocations)
+            accepted.extend(booking for booking, _ in allocations)
+        for index, booking in days[day]:
+            if report[index]['status'] == 'accepted':
+                report[index]['booking_id'] = booking.id
+
+    emails_sent = send_confirmation_emails(accepted) if send_emails else 0
+    return {
+        'accepted': len(accepted),
+        'rejected': len(rows) - len(accepted),
+        'emails_sent': emails_sent,
+        'rows': report,
+    }
@@ -1,8 +1,12 @@
 """ Set up booking slots and check for available tables. """
 from datetime import datetime, date, timedelta
-from itertools import combinations, chain
+from collections import Counter
+from itertools import combinations, combinations_with_replacement
 from restaurant.models import Table
 from .models import Booking
+from .durations import default_duration
+from .occupancy import MAX_COMBINED_TABLES, duration_slots, load_occupancy, \
+    table_adjacency
 
 
 def create_booking_slots(opening_time, closing_time):
@@ -26,63 +30,170 @@ def create_booking_slots(opening_time, closing_time):
     return [(slot.time(), slot.strftime('%H:%M')) for slot in booking_slots]
 
 
-def find_tables(selected_date, selected_time, end, party_size, booking_id):
+def find_tables(selected_date, selected_time, end, party_size, booking_id,
+                restaurant=None):
     """
     Search for available tables on the date and time of the required booking.
+    Only the tables of the restaurant are searched when one is given.
     """
+    # Load the day's bookings once and find the free tables
+    # from the index of the times each table is booked.
+    occupancy = load_occupancy(
+        selected_date, booking_id, restaurant=restaurant)
+    # A booking being updated keeps what it can of its tables.
+    if booking_id:
+        tables = current_tables(
+            occupancy, booking_id, selected_time, end, party_size)
+        if tables:
+            return tables
+    return select_tables(occupancy, selected_time, end, party_size)
 
-    # If updating a booking exclude the booking id from the search
-    # so that the table will be considered available.
 
-    # Exclude tables whose bookings overlap
-    # the start time of the required booking
-    if booking_id:
-        check1 = Table.objects.exclude(
-            bookings__in=Booking.objects.exclude(id=booking_id).filter(
-                date=selected_date, time__lt=selected_time,
-                end_time__gt=selected_time))
-    else:
-        check1 = Table.objects.exclude(
-            bookings__date=selected_date,
-            bookings__time__lt=selected_time,
-            bookings__end_time__gt=selected_time)
+def current_tables(occupancy, booking_id, selected_time, end, party_size):
+    """
+    Return the tables for a booking being updated which change the
+    least from its current tables. The booking keeps the fewest seats
+    of its tables free at the new time which seat the party, or when
+    they are too few, all of them with the fewest seats of the other
+    free tables added. Returns None when none of its tables are free.
+    """
+    current = set(Booking.tables.through.objects.filter(
+        booking_id=booking_id).values_list('table_id', flat=True))
+    free = [
+        TableSnapshot(table_id, size)
+        for table_id, size in occupancy.free_tables(selected_time, end)]
+    kept = [table for table in free if table.id in current]
+    if not kept:
+        return None
+    others = [table for table in free if table.id not in current]
+    adjacency = occupancy.adjacency
+    selected = (fewest_seats([], kept, party_size, adjacency) or
+                fewest_seats(kept, others, party_size, adjacency))
+    if selected is None:
+        return None
+    return load_tables(selected if len(selected) > 1 else selected[0])
+
+
+def fewest_seats(kept, others, party_size, adjacency=None):
+    """
+    Return the kept tables with those of the others which seat the
+    party with the fewest seats to spare, then the fewest tables, or
+    None when they cannot. On a floor plan the tables are joined.
+    """
+    best = None
+    for count in range(1, MAX_COMBINED_TABLES - len(kept) + 1):
+        for added in combinations(others, count):
+            tables = kept + list(added)
+            spaces_left = sum(table.size for table in tables) - party_size
+            if spaces_left < 0 or (best is not None and
+                                   spaces_left >= best[0]):
+                continue
+            if adjacency is None or joined(tables, adjacency):
+                best = (spaces_left, tables)
+    return best and best[1]
 
-    # Exclude tables whose bookings overlap
-    # the end time of the required booking
-    if booking_id:
-        check2 = check1.exclude(
-            bookings__in=Booking.objects.exclude(id=booking_id).filter(
-                date=selected_date, time__lt=end, end_time__gt=end))
-    else:
-        check2 = check1.exclude(
-            bookings__date=selected_date,
-            bookings__time__lt=end,
-            bookings__end_time__gt=end)
-
-    # Exclude any tables whose bookings span the required booking
-    # booking length is fixed at 2 hours so there will be no bookings
-    # in the centre of the time range
-    if booking_id:
-        available_tables = check2.exclude(
-            bookings__in=Booking.objects.exclude(id=booking_id).filter(
-                date=selected_date, time__lte=selected_time,
-                end_time__gte=end))
-    else:
-        available_tables = check2.exclude(
-            bookings__date=selected_date,
-            bookings__time__lte=selected_time,
-            bookings__end_time__gte=end)
+
+def joined(tables, adjacency):
+    """ Return whether the tables are joined on the floor plan. """
+    members = {table.id for table in tables}
+    reached = {tables[0].id}
+    waiting = [tables[0].id]
+    while waiting:
+        for neighbour in adjacency.get(waiting.pop(), ()):
+            if neighbour in members and neighbour not in reached:
+                reached.add(neighbour)
+                waiting.append(neighbour)
+    return reached == members
+
+
+def select_tables(occupancy, selected_time, end, party_size):
+    """
+    Select the tables for a booking from those free in a day's occupancy.
+    Several bookings can be checked against one occupancy.
+    """
+    # Search using just the id and size of each table
+    # rather than full model instances.
+    snapshots = [
+        TableSnapshot(table_id, size)
+        for table_id, size in occupancy.free_tables(selected_time, end)]
 
     # If there are any tables left after the checks
     # we need to select one or more for the booking
-    if available_tables:
-        return select_single_table(available_tables, party_size)
+    if snapshots:
+        return load_tables(select_single_table(
+            snapshots, party_size, load_adjacency))
+    return None
+
 
+def largest_parties(occupancy, length=None):
+    """
+    Return for each slot the largest party the table search seats at
+    the tables free for a booking of length slots starting then, by
+    default the length of a booking without a duration rule.
 
-def select_single_table(tables, party_size):
+    Any of the largest tables can be combined when the restaurant has
+    no floor plan, so the occupancy's max_party is the answer. On a
+    floor plan the largest tables may not be next to each other, so
+    each smaller party is searched for in turn, once for each set of
+    free tables.
+    """
+    max_party = occupancy.max_party(length)
+    adjacency = occupancy.adjacency
+    if adjacency is None:
+        return max_party
+    length = length or duration_slots(default_duration())
+    seated = {}
+    parties = []
+    for first, party in enumerate(max_party):
+        free = tuple(occupancy.free_mask(first, first + length))
+        if free not in seated:
+            snapshots = [
+                TableSnapshot(table_id, size)
+                for table_id, size, is_free in zip(
+                    occupancy.table_ids, occupancy.sizes, free)
+                if is_free]
+            while party and not select_single_table(
+                    snapshots, party, adjacency):
+                party -= 1
+            seated[free] = party
+        parties.append(seated[free])
+    return parties
+
+
+class TableSnapshot:
+    """
+    The id and size of an available table. Used by the table search
+    in place of Table instances, which are much larger and slower to
+    create and read.
+    """
+    __slots__ = ('id', 'size')
+
+    def __init__(self, table_id, size):
+        self.id = table_id
+        self.size = size
+
+    def __repr__(self):
+        return f'TableSnapshot(id={self.id}, size={self.size})'
+
+
+def load_tables(selected):
+    """
+    Load the Table instances for the selected table snapshot or list
+    of snapshots, keeping the order of the selection.
+    """
+    if not selected:
+        return None
+    if not isinstance(selected, list):
+        return Table.objects.get(id=selected.id)
+    tables = Table.objects.in_bulk([snapshot.id for snapshot in selected])
+    return [tables[snapshot.id] for snapshot in selected]
+
+
+def select_single_table(tables, party_size, adjacency=None):
     """
     Check the available tables from the find_tables function
     and see if there is one big enough for the required party size.
+    The adjacency of the tables is passed on for combining tables.
     """
 
     # It is preferred to fulfil the booking will a single table
@@ -110,41 +221,126 @@ def select_single_table(tables, party_size):
     else:
         # if still no table has been found,
         # see if we can combine tables to fit the party size
-        return combine_tables(tables, party_size)
+        return combine_tables(tables, party_size, adjacency)
 
 
-def combine_tables(tables, party_size):
+def combine_tables(tables, party_size, adjacency=None):
     """
     Combine available tables to see if a combined table will
-    fit the required party size.
+    fit the required party size. When the adjacency of the tables is
+    given, as a dictionary or a function of the tables returning one,
+    only tables next to each other on the floor plan are combined.
     """
+    if callable(adjacency):
+        adjacency = adjacency(tables)
+    if adjacency is not None:
+        return combine_adjacent_tables(tables, party_size, adjacency)
 
     # With tables only 2 or 4 person in size and party size maximum 8
-    # we will only ever need to combine up to 4 tables
-    combos2 = combinations(tables, 2)
-    combos3 = combinations(tables, 3)
-    combos4 = combinations(tables, 4)
+    # we will only ever need to combine up to 4 tables.
+    # Tables of the same size are interchangeable, so each mix of sizes
+    # is summed once rather than every combination of tables. The sizes
+    # are read from the tables in one pass.
+    sizes = [table.size for table in tables]
+    available = Counter(sizes)
+    best = None
+    for count in (2, 3, 4):
+        for mix in combinations_with_replacement(sorted(available), count):
+            needed = Counter(mix)
+            if any(needed[size] > available[size] for size in needed):
+                continue
+            # for each mix of table sizes calculate combined size
+            spaces_left = sum(mix) - party_size
+            if spaces_left < 0:
+                continue
+            # An exact match with the fewest tables is preferred, then
+            # the least leftover spaces with the fewest tables, taking
+            # the first tables of each size as the search always has.
+            candidate = (spaces_left, count, first_tables(sizes, needed))
+            if best is None or candidate < best:
+                best = candidate
+        if best is not None and best[0] == 0:
+            break
+
+    if best is not None:
+        return [tables[index] for index in best[2]]
+    # if we have not returned by now there are no tables for the booking
+
+
+def first_tables(sizes, needed):
+    """
+    Return the positions of the first tables with the needed count of
+    each size, which is the first combination of the tables in order
+    with that mix of sizes.
+    """
+    needed = Counter(needed)
+    positions = []
+    for index, size in enumerate(sizes):
+        if needed[size]:
+            needed[size] -= 1
+            positions.append(index)
+    return tuple(positions)
+
+
+def load_adjacency(tables):
+    """
+    Return the ids of the neighbouring tables of each of the tables,
+    or None when their restaurant has no floor plan and any of its
+    tables can be combined.
+    """
+    return table_adjacency([table.id for table in tables])
+
+
+def combine_adjacent_tables(tables, party_size, adjacency):
+    """
+    Combine tables next to each other to fit the party size, preferring
+    an exact fit with the fewest tables, then the least leftover space
+    with the fewest tables, as when any tables can be combined.
+
+    Only groups of tables joined on the floor plan are considered. Each
+    group is grown one neighbouring free table at a time, so tables
+    across the room are never tried together, and groups which already
+    seat the party, or could not reach it with the largest tables, are
+    not grown further.
+    """
+    if not tables:
+        return None
+    by_id = {table.id: table for table in tables}
+    largest = max(table.size for table in tables)
+    order = {table.id: index for index, table in enumerate(tables)}
+    groups = {frozenset([table.id]): table.size for table in tables}
+    best = None
     leftover = 0
-    combined_tables = ''
-    for combo in chain(combos2, combos3, combos4):
-        # for each combination of tables calculate combined size
-        combined_size = sum([table.size for table in combo])
-        # if combined size matches the party size great return the table
-        if combined_size == party_size:
-            combined_tables = list(combo)
-            return combined_tables
-        # if there is no exact match return the tables with the
-        # least leftover spaces
-        elif combined_size > party_size:
+    for count in range(2, MAX_COMBINED_TABLES + 1):
+        grown = {}
+        for members, seats in groups.items():
+            if seats >= party_size:
+                continue
+            neighbours = set().union(*(
+                adjacency.get(member, ()) for member in members))
+            # Only free tables are in the order.
+            for neighbour in sorted(
+                    (neighbours & order.keys()) - members, key=order.get):
+                group = members | {neighbour}
+                if group in grown:
+                    continue
+                combined_size = seats + by_id[neighbour].size
+                if (combined_size + (MAX_COMBINED_TABLES - count) * largest
+                        < party_size):
+                    continue
+                grown[group] = combined_size
+        for group, combined_size in grown.items():
             spaces_left = combined_size - party_size
-            if leftover:
-                if spaces_left < leftover:
-                    leftover = spaces_left
-                    combined_tables = list(combo)
-            else:
+            if spaces_left == 0:
+                return sorted(
+                    (by_id[member] for member in group),
+                    key=lambda table: order[table.id])
+            if spaces_left > 0 and (best is None or spaces_left < leftover):
+                best = group
                 leftover = spaces_left
-                combined_tables = list(combo)
+        groups = grown
 
-    if combined_tables:
-        return combined_tables
-    # if we have not returned by now there are no tables for the booking
\ No newline at end of file
+    if best is None:
+        return None
+    return sorted(
+        (by_id[member] for member in best), key=lambda table: order[table.id])
@@ -1,32 +1,120 @@
 """ Confirmation email set-up for bookings made. """
-from django.core.mail import send_mail
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.core.mail import EmailMessage, get_connection
 from django.template.loader import render_to_string
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
 
-def send_confirmation_email(booking):
+# Emails are sent from a small pool of background threads so that a slow
+# SMTP server does not hold up the booking response.
+email_executor = ThreadPoolExecutor(
+    max_workers=2, thread_name_prefix='booking-email')
+
+
+def render_email(subject_template, body_template, context, to_email):
     """
-    Send a booking confirmation email to the customer email
-    when a booking is confirmed.
+    Render an email to a customer from the confirmation email templates.
     """
-    customer_email = booking.email
     subject = render_to_string(
-        'bookings/confirmation_emails/confirmation_email_subject.txt',
-        {'booking': booking})
-    if booking.customer:
+        f'bookings/confirmation_emails/{subject_template}', context)
+    body = render_to_string(
+        f'bookings/confirmation_emails/{body_template}', context)
+
+    # Email subjects must not contain newlines.
+    subject = ' '.join(subject.splitlines())
+    return EmailMessage(
+        subject, body, settings.DEFAULT_FROM_EMAIL, [to_email])
+
+
+def build_confirmation_email(booking):
+    """
+    Render the booking confirmation email for the customer.
+    """
+    if booking.customer_id:
         # If the customer is logged in inform them that they can update
         # or cancel the booking themselves.
-        body = render_to_string(
-            'bookings/confirmation_emails/confirmation_email_body_user.txt',
-            {'booking': booking})
+        body_template = 'confirmation_email_body_user.txt'
     else:
-        body = render_to_string(
-            'bookings/confirmation_emails/confirmation_email_body.txt',
-            {'booking': booking})
-
-    send_mail(
-        subject,
-        body,
-        settings.DEFAULT_FROM_EMAIL,
-        [customer_email]
-    )
\ No newline at end of file
+        body_template = 'confirmation_email_body.txt'
+
+    return render_email(
+        'confirmation_email_subject.txt', body_template,
+        {'booking': booking}, booking.email)
+
+
+def build_reminder_email(booking):
+    """
+    Render the reminder email sent the day before a booking.
+    """
+    return render_email(
+        'reminder_email_subject.txt', 'reminder_email_body.txt',
+        {'booking': booking}, booking.email)
+
+
+def send_confirmation_email(booking):
+    """
+    Send a booking confirmation email to the customer email
+    when a booking is confirmed.
+    """
+    build_confirmation_email(booking).send()
+
+
+def _send_in_background(message):
+    """ Send a prepared email, logging any failure. """
+    try:
+        message.send()
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('Failed to send email to %s', message.to)
+
+
+def dispatch_email(message):
+    """
+    Send a rendered email without blocking the request.
+    """
+    if getattr(settings, 'BOOKING_EMAIL_ASYNC', True):
+        email_executor.submit(_send_in_background, message)
+    else:
+        message.send()
+
+
+def dispatch_confirmation_email(booking):
+    """
+    Send the confirmation email without blocking the request. The email
+    is rendered straight away, while the booking is available in this
+    thread, and handed to the email threads to be sent.
+    """
+    dispatch_email(build_confirmation_email(booking))
+
+
+def build_waitlist_offer_email(entry, offer_time, booking_url):
+    """
+    Render the email offering a freed table to a waitlisted customer.
+    """
+    context = {
+        'entry': entry,
+        'offer_time': offer_time,
+        'booking_url': booking_url,
+    }
+    return render_email(
+        'waitlist_offer_subject.txt', 'waitlist_offer_body.txt', context,
+        entry.email)
+
+
+def send_confirmation_emails(bookings, batch_size=50):
+    """
+    Send the confirmation emails for several bookings in batches over
+    a single connection to the mail server. Returns the number sent.
+    """
+    sent = 0
+    with get_connection() as connection:
+        batch = []
+        for booking in bookings:
+            batch.append(build_confirmation_email(booking))
+            if len(batch) >= batch_size:
+                sent += connection.send_messages(batch) or 0
+                batch = []
+        if batch:
+            sent += connection.send_messages(batch) or 0
+    return sent
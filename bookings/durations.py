@@ -0,0 +1,53 @@
+""" How long a table is booked for. """
+from datetime import datetime, date, time, timedelta
+from django.conf import settings
+
+
+def rule_matches(rule, party_size, start_time):
+    """
+    Check whether a duration rule applies to a booking. Each of the
+    rule's limits is optional and the times are given as 'HH:MM'.
+    """
+    if party_size < rule.get('min_party', 0):
+        return False
+    if 'max_party' in rule and party_size > rule['max_party']:
+        return False
+    if 'from' in rule and start_time < time.fromisoformat(rule['from']):
+        return False
+    if 'until' in rule and start_time >= time.fromisoformat(rule['until']):
+        return False
+    return True
+
+
+def booking_duration(party_size, start_time):
+    """
+    Return how long a booking is for using the first of the
+    BOOKING_DURATION_RULES which matches it, otherwise the
+    BOOKING_DEFAULT_DURATION.
+    """
+    for rule in settings.BOOKING_DURATION_RULES:
+        if rule_matches(rule, party_size, start_time):
+            return timedelta(minutes=rule['minutes'])
+    return default_duration()
+
+
+def default_duration():
+    """ Return the length of bookings which match no duration rule. """
+    return timedelta(minutes=settings.BOOKING_DEFAULT_DURATION)
+
+
+def booking_end_time(start_time, party_size):
+    """
+    Return the end time of a booking. Bookings running past midnight
+    have an end time earlier than their start time.
+    """
+    end = datetime.combine(date.today(), start_time) + booking_duration(
+        party_size, start_time)
+    return end.time()
+
+
+def longest_duration():
+    """ Return the longest that any booking can be for. """
+    return timedelta(minutes=max(
+        [settings.BOOKING_DEFAULT_DURATION] +
+        [rule['minutes'] for rule in settings.BOOKING_DURATION_RULES]))
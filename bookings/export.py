@@ -0,0 +1,118 @@
+""" Stream bookings for a date range as CSV or JSON Lines. """
+import csv
+import heapq
+import json
+from itertools import islice
+from django.db.models import prefetch_related_objects
+
+from .models import Booking, ArchivedBooking
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+EXPORT_FIELDS = (
+    'id', 'restaurant', 'date', 'time', 'end_time', 'party_size', 'tables',
+    'table_numbers', 'customer', 'name', 'email', 'phone_number',
+    'special_requirements', 'updated')
+
+
+class Echo:
+    """
+    A file-like object that returns the written value so the csv writer
+    can be used to produce lines for a streaming response.
+    """
+    def write(self, value):
+        """ Return the value rather than storing it. """
+        return value
+
+
+def iter_chunked(model, start, end, chunk_size, restaurant=None):
+    """
+    Yield the bookings of one model between the start and end dates
+    (inclusive) in date and time order. Rows are read from the database
+    with a server-side cursor where supported and the tables for each
+    chunk are fetched in one query, so memory use does not grow with
+    the size of the range.
+    """
+    queryset = model.objects.filter(
+        date__gte=start, date__lte=end).select_related(
+            'customer', 'restaurant').order_by('date', 'time', 'id')
+    if restaurant is not None:
+        queryset = queryset.filter(restaurant=restaurant)
+    bookings = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(bookings, chunk_size))
+        if not chunk:
+            break
+        # iterator() ignores prefetch_related in Django 3.2
+        # so prefetch the tables for each chunk by hand.
+        prefetch_related_objects(chunk, 'tables')
+        yield from chunk
+
+
+def iter_bookings(start, end, chunk_size=2000, restaurant=None):
+    """
+    Yield the live and archived bookings between the start and end
+    dates (inclusive), of one restaurant when given, in date and time
+    order.
+    """
+    # Bookings can be imported for past dates, so a live booking may be
+    # older than an archived one and the two are merged by date and time.
+    return heapq.merge(
+        *(iter_chunked(model, start, end, chunk_size, restaurant)
+          for model in (ArchivedBooking, Booking)),
+        key=lambda booking: (booking.date, booking.time))
+
+
+def booking_row(booking):
+    """ Convert a booking to a dictionary of the exported fields. """
+    return {
+        'id': getattr(booking, 'original_id', booking.id),
+        'restaurant': booking.restaurant.slug if booking.restaurant else '',
+        'date': booking.date.isoformat(),
+        'time': booking.time.strftime('%H:%M'),
+        'end_time': booking.end_time.strftime('%H:%M'),
+        'party_size': booking.party_size,
+        'tables': [
+            {'id': table.id, 'size': table.size}
+            for table in booking.tables.all()],
+        'table_numbers': booking.table_numbers,
+        'customer': booking.customer.username if booking.customer else '',
+        'name': booking.name,
+        'email': booking.email,
+        'phone_number': booking.phone_number,
+        'special_requirements': booking.special_requirements,
+        'updated': getattr(booking, 'updated', False),
+    }
+
+
+def export_csv(bookings):
+    """ Yield the bookings as lines of CSV starting with a header. """
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for booking in bookings:
+        row = booking_row(booking)
+        # Tables are written as id:size pairs in a single column.
+        row['tables'] = ' '.join(
+            f"{table['id']}:{table['size']}" for table in row['tables'])
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+def export_jsonl(bookings):
+    """ Yield the bookings as JSON Lines. """
+    for booking in bookings:
+        yield json.dumps(booking_row(booking)) + '\n'
+
+
+def generate_export(start, end, export_format='csv', chunk_size=2000,
+                    restaurant=None):
+    """
+    Return a generator of the bookings between the start and end dates
+    in the requested export format, of one restaurant when given.
+    """
+    bookings = iter_bookings(start, end, chunk_size, restaurant)
+    if export_format == 'jsonl':
+        return export_jsonl(bookings)
+    return export_csv(bookings)
@@ -2,31 +2,42 @@
 import datetime
 from django import forms
 
-from .models import Booking
+from .models import Booking, WaitlistEntry
 from .check_availability import find_tables
+from .durations import booking_end_time
+from .idempotency import new_key
 
 
 class BookingForm(forms.ModelForm):
     """
     A form for making or updating a booking in the restaurant.
     """
+    # Identifies a submission of the form so repeats can be recognised.
+    idempotency_key = forms.CharField(
+        widget=forms.HiddenInput, required=False)
+
     class Meta:
         """ Select the model and define the fields. """
         model = Booking
         fields = ('date', 'time', 'party_size',
                   'name', 'email', 'phone_number', 'special_requirements')
 
-    def __init__(self, slots, booking_id, *args, **kwargs):
+    def __init__(self, slots, booking_id, *args, restaurant=None, **kwargs):
         """
         Set the booking time choices, add a calender widget for the
         booking date field and add placeholder text. Also extract the
-        current booking id for use in the form validation table search.
+        current booking id and the restaurant for use in the form
+        validation table search.
         """
         # Get the id for the original booking for use in the table search.
         # If a new booking is being made the id will be an empty string.
         self.form_booking_id = booking_id
+        self.restaurant = restaurant
 
         super().__init__(*args, **kwargs)
+        if restaurant is not None and self.instance.restaurant_id is None:
+            self.instance.restaurant = restaurant
+        self.fields['idempotency_key'].initial = new_key()
         self.fields['time'].widget = forms.Select(choices=slots)
         self.fields['date'].widget = forms.DateInput(attrs={'type': 'date'})
         self.fields['special_requirements'].widget.attrs['placeholder'] = (
@@ -45,14 +56,12 @@ class BookingForm(forms.ModelForm):
         current_booking_id = self.form_booking_id
 
         # Calculate the end time of the planned booking.
-        end = datetime.datetime.combine(
-            datetime.date.today(), planned_time) + datetime.timedelta(hours=2)
-        booking_end = end.time()
+        booking_end = booking_end_time(planned_time, planned_party_size)
 
         # Search for avaiable tables using the form parameters.
         tables = find_tables(
             planned_date, planned_time, booking_end, planned_party_size,
-            current_booking_id)
+            current_booking_id, self.restaurant)
 
         # Make the selected table(s) available to the view or
         # raise a validation error if none available.
@@ -63,4 +72,63 @@ class BookingForm(forms.ModelForm):
                 "Sorry no tables available at that time!"
             )
 
-        return cleaned_datas
\ No newline at end of file
+        return cleaned_data
+
+
+class BookingImportForm(forms.ModelForm):
+    """
+    A form for validating the fields of an imported booking. Table
+    availability is checked for the whole import rather than per form.
+    """
+    class Meta:
+        """ Select the model and define the fields. """
+        model = Booking
+        fields = ('date', 'time', 'party_size',
+                  'name', 'email', 'phone_number', 'special_requirements')
+
+    def clean_date(self):
+        """
+        Reject bookings for past dates, which belong in the archive
+        rather than among the live bookings.
+        """
+        planned_date = self.cleaned_data['date']
+        if planned_date < datetime.date.today():
+            raise forms.ValidationError(
+                "Bookings can only be imported for today or later.")
+        return planned_date
+
+
+class WaitlistForm(forms.ModelForm):
+    """
+    A form for joining the waitlist when no tables are available.
+    """
+    class Meta:
+        """ Select the model and define the fields. """
+        model = WaitlistEntry
+        fields = ('date', 'earliest_time', 'latest_time', 'party_size',
+                  'name', 'email', 'phone_number')
+
+    def __init__(self, slots, *args, restaurant=None, **kwargs):
+        """
+        Set the time choices to the booking slots and add a calender
+        widget for the date field.
+        """
+        super().__init__(*args, **kwargs)
+        if restaurant is not None:
+            self.instance.restaurant = restaurant
+        self.fields['earliest_time'].widget = forms.Select(choices=slots)
+        self.fields['latest_time'].widget = forms.Select(choices=slots)
+        self.fields['date'].widget = forms.DateInput(attrs={'type': 'date'})
+
+    def clean(self):
+        """
+        Check the customer's latest arrival time is not before
+        their earliest.
+        """
+        cleaned_data = super().clean()
+        earliest = cleaned_data.get('earliest_time')
+        latest = cleaned_data.get('latest_time')
+        if earliest and latest and latest < earliest:
+            raise forms.ValidationError(
+                "The latest time can't be before the earliest time!")
+        return cleaned_data
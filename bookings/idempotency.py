@@ -0,0 +1,109 @@
+""" Recognise repeated submissions of the booking form. """
+import datetime
+import re
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import BookingSubmission
+
+# Marks a submission which is still being processed.
+PENDING = 'pending'
+
+KEY_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def is_valid(key):
+    """ Check a submitted key has the expected format. """
+    return bool(KEY_PATTERN.match(key or ''))
+
+
+def new_key():
+    """ Return a new key to embed in a booking form. """
+    return uuid.uuid4().hex
+
+
+def cache_key(key):
+    """ Return the cache key used to store a submission. """
+    return f'booking_submission:{key}'
+
+
+def claim(key):
+    """
+    Record that a submission is being processed. Returns False if the
+    key is invalid or has already been claimed by an earlier submission.
+    Submissions are kept in the cache when every worker shares it, and
+    in the database otherwise.
+    """
+    if not is_valid(key):
+        return False
+    if settings.SHARED_CACHE:
+        return cache.add(
+            cache_key(key), PENDING, settings.BOOKING_IDEMPOTENCY_TTL)
+
+    # Submissions are forgotten after the time they are cached for.
+    BookingSubmission.objects.filter(
+        created__lt=timezone.now() - datetime.timedelta(
+            seconds=settings.BOOKING_IDEMPOTENCY_TTL)).delete()
+    try:
+        with transaction.atomic():
+            BookingSubmission.objects.create(key=key)
+    except IntegrityError:
+        return False
+    return True
+
+
+def complete(key, booking_id):
+    """ Store the booking made by a submission. """
+    if not is_valid(key):
+        return
+    if settings.SHARED_CACHE:
+        cache.set(
+            cache_key(key), booking_id, settings.BOOKING_IDEMPOTENCY_TTL)
+    else:
+        BookingSubmission.objects.filter(key=key).update(
+            booking_id=booking_id)
+
+
+def release(key):
+    """ Allow a failed submission to be made again. """
+    if not is_valid(key):
+        return
+    if settings.SHARED_CACHE:
+        cache.delete(cache_key(key))
+    else:
+        BookingSubmission.objects.filter(key=key).delete()
+
+
+def stored_result(key):
+    """
+    Return the booking id stored for a submission, PENDING while it is
+    processed, or None when there is no submission.
+    """
+    if settings.SHARED_CACHE:
+        return cache.get(cache_key(key))
+    for booking_id in BookingSubmission.objects.filter(key=key).values_list(
+            'booking_id', flat=True):
+        return PENDING if booking_id is None else booking_id
+    return None
+
+
+def previous_booking(key, wait=0.3, interval=0.05):
+    """
+    Return the id of the booking made by an earlier submission with the
+    same key. If the earlier submission is still being processed wait a
+    moment for it to finish, as a double click arrives just after it,
+    without holding the worker thread for longer. Returns None if there
+    is no result yet.
+    """
+    if not is_valid(key):
+        return None
+    deadline = time.monotonic() + wait
+    while True:
+        result = stored_result(key)
+        if result != PENDING or time.monotonic() >= deadline:
+            return None if result == PENDING else result
+        time.sleep(interval)
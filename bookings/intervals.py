@@ -0,0 +1,57 @@
+""" An index of the times tables are booked on a day. """
+from bisect import bisect_left, bisect_right
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def minutes(start_time, end_time):
+    """
+    Convert a booking's start and end times to minutes after midnight.
+    Bookings finishing at or after midnight end on the following day.
+    """
+    start = start_time.hour * 60 + start_time.minute
+    end = end_time.hour * 60 + end_time.minute
+    if end <= start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+
+class IntervalIndex:
+    """
+    Booked intervals sorted by their start. As no interval is longer
+    than the longest one added, the intervals overlapping a time can
+    only start within that length before it. Both ends of that range
+    are found by bisection, so an overlap query takes O(log n + k) for
+    the k intervals in it, whatever the length of each booking.
+    """
+    def __init__(self, intervals=()):
+        """ Index (start, end, value) intervals given in minutes. """
+        intervals = sorted(intervals, key=lambda interval: interval[0])
+        self.starts = [start for start, _, _ in intervals]
+        self.ends = [end for _, end, _ in intervals]
+        self.values = [value for _, _, value in intervals]
+        self.longest = max(
+            (end - start for start, end, _ in intervals), default=0)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add(self, start, end, value):
+        """ Add an interval, keeping the index sorted. """
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.values.insert(position, value)
+        self.longest = max(self.longest, end - start)
+
+    def overlapping(self, start, end):
+        """
+        Return the values of the intervals overlapping start to end.
+        Intervals which finish as it starts, or start as it finishes,
+        do not overlap it.
+        """
+        first = bisect_right(self.starts, start - self.longest)
+        last = bisect_left(self.starts, end)
+        return [
+            self.values[position] for position in range(first, last)
+            if self.ends[position] > start]
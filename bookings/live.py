@@ -0,0 +1,231 @@
+""" Stream booking changes to the owner's open dashboards. """
+import asyncio
+import datetime
+import json
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Booking, BookingEvent
+
+# The batch of events of the transaction open in each thread.
+pending = threading.local()
+
+# The number of streams open in this worker, each holding one of its
+# threads, and the lock guarding it.
+open_streams = 0
+open_streams_lock = threading.Lock()
+
+
+class EventBatch:
+    """
+    The events published in a transaction. Each change registers a
+    commit callback of its own, so Django drops the changes of a
+    savepoint which is rolled back, and the callbacks which run share
+    the bookings given events so far. A booking already given an event
+    is not given an update as well, so a booking made and then given
+    its tables is sent once as created.
+    """
+    def __init__(self):
+        self.booking_ids = set()
+        self.committed = False
+
+    def save(self, events):
+        """ Save the events of a change once the transaction commits. """
+        self.committed = True
+        BookingEvent.objects.bulk_create([
+            event for event in events
+            if event.booking_id not in self.booking_ids or
+            event.kind != BookingEvent.UPDATED])
+        self.booking_ids.update(event.booking_id for event in events)
+
+
+def publish(booking, kind):
+    """
+    Record a change to a booking once the current transaction commits.
+    A booking changed several times in a transaction has one event, so
+    a booking made and then given its tables is sent once as created.
+    """
+    publish_bookings(booking.restaurant_id, [booking.id], kind)
+
+
+def publish_bookings(restaurant_id, booking_ids, kind):
+    """
+    Record a change to bookings of a restaurant, such as those changed
+    together by a queryset update, which sends no signals.
+    """
+    # A batch is used until its transaction commits. The batch of a
+    # transaction rolled back saved nothing and is used for the next.
+    batch = getattr(pending, 'batch', None)
+    if batch is None or batch.committed:
+        batch = pending.batch = EventBatch()
+    events = [
+        BookingEvent(
+            restaurant_id=restaurant_id, booking_id=booking_id, kind=kind)
+        for booking_id in booking_ids]
+    transaction.on_commit(lambda: batch.save(events))
+
+
+def last_event_id():
+    """ Return the id of the latest event, or 0 when there are none. """
+    latest = BookingEvent.objects.order_by('-id').values_list(
+        'id', flat=True).first()
+    return latest or 0
+
+
+def prune_events():
+    """
+    Delete the events older than the streams reconnect within. Returns
+    the number of events deleted.
+    """
+    deleted, _ = BookingEvent.objects.filter(created__lt=timezone.now() - (
+        datetime.timedelta(seconds=settings.BOOKING_EVENT_SECONDS))).delete()
+    return deleted
+
+
+def event_messages(request, events):
+    """
+    Yield the server sent event messages of booking changes, with each
+    changed booking's card rendered as it is shown on the dashboard.
+    Only the latest change to each booking is sent, and bookings before
+    today are sent as cancelled as they are no longer listed.
+    """
+    bookings = Booking.objects.filter(
+        id__in={event.booking_id for event in events},
+        date__gte=datetime.date.today()).prefetch_related('tables')
+    bookings = {booking.id: booking for booking in bookings}
+
+    latest = {event.booking_id: event for event in events}
+    for event in sorted(latest.values(), key=lambda event: event.id):
+        booking = bookings.get(event.booking_id)
+        data = {'id': event.booking_id, 'kind': event.kind}
+        if booking is None:
+            data['kind'] = BookingEvent.CANCELLED
+        else:
+            data['start'] = f'{booking.date.isoformat()}T{booking.time}'
+            data['html'] = render_to_string(
+                'bookings/includes/booking_card.html',
+                {'booking': booking}, request)
+        yield (
+            f'id: {event.id}\nevent: booking\n'
+            f'data: {json.dumps(data)}\n\n')
+
+
+def new_messages(request, restaurant, after):
+    """
+    Return the messages of the restaurant's booking changes after the
+    event id given, with the id of the last change sent.
+    """
+    events = list(BookingEvent.objects.filter(
+        restaurant=restaurant, id__gt=after))
+    if not events:
+        return [], after
+    return list(event_messages(request, events)), events[-1].id
+
+
+def open_stream():
+    """
+    Return whether a stream may be held open in this worker, counting
+    it when it may. At most BOOKING_STREAMS are held at once, so that
+    open dashboards leave the worker's other threads for requests.
+    """
+    global open_streams  # pylint: disable=global-statement
+    with open_streams_lock:
+        if open_streams >= settings.BOOKING_STREAMS:
+            return False
+        open_streams += 1
+        return True
+
+
+def close_stream():
+    """ Stop counting a stream which was held open. """
+    global open_streams  # pylint: disable=global-statement
+    with open_streams_lock:
+        open_streams -= 1
+
+
+def event_stream(request, restaurant, after):
+    """
+    Yield the booking changes of a restaurant after the event id given
+    for BOOKING_STREAM_SECONDS, checking for new events every
+    BOOKING_STREAM_POLL seconds. Every worker reads the same events, so
+    a change made through any worker reaches every dashboard. Browsers
+    reconnect once the stream ends, sending the last event id received,
+    so no change is missed and a worker is only held for a while.
+
+    Each stream holds a thread of the WSGI worker, so when
+    BOOKING_STREAMS are open in the worker already, the changes waiting
+    are sent at once and the stream ends, with the browser asked to
+    reconnect after BOOKING_STREAM_BUSY_RETRY seconds.
+    """
+    held = open_stream()
+    try:
+        retry = (settings.BOOKING_STREAM_POLL if held
+                 else settings.BOOKING_STREAM_BUSY_RETRY)
+        yield f'retry: {retry * 1000}\n\n'
+        ends = time.monotonic() + (
+            settings.BOOKING_STREAM_SECONDS if held else 0)
+        while True:
+            messages, after = new_messages(request, restaurant, after)
+            yield from messages
+            if time.monotonic() >= ends:
+                return
+            if not messages:
+                # A comment keeps proxies from closing an idle stream.
+                yield ': waiting\n\n'
+            time.sleep(settings.BOOKING_STREAM_POLL)
+    finally:
+        if held:
+            close_stream()
+
+
+async def aevent_stream(request, restaurant, after):
+    """
+    Yield the same messages as event_stream from the event loop of the
+    ASGI application. A stream only uses a thread while it checks for
+    changes, so there is no limit to the streams open at once.
+    """
+    yield f'retry: {settings.BOOKING_STREAM_POLL * 1000}\n\n'
+    ends = time.monotonic() + settings.BOOKING_STREAM_SECONDS
+    while True:
+        messages, after = await sync_to_async(new_messages)(
+            request, restaurant, after)
+        for message in messages:
+            yield message
+        if time.monotonic() >= ends:
+            return
+        if not messages:
+            # A comment keeps proxies from closing an idle stream.
+            yield ': waiting\n\n'
+        await asyncio.sleep(settings.BOOKING_STREAM_POLL)
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, **kwargs):
+    """ Send new bookings and changes to bookings to the dashboards. """
+    publish(
+        instance, BookingEvent.CREATED if created else BookingEvent.UPDATED)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    """
+    Remove cancelled bookings from the dashboards. Past bookings being
+    archived are no longer listed.
+    """
+    if instance.date >= datetime.date.today():
+        publish(instance, BookingEvent.CANCELLED)
+
+
+@receiver(m2m_changed, sender=Booking.tables.through)
+def booking_tables_changed(sender, instance, action, reverse, **kwargs):
+    """ Show the tables given to a booking on the dashboards. """
+    if reverse or action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    publish(instance, BookingEvent.UPDATED)
@@ -0,0 +1,30 @@
+""" Archive bookings older than a number of days. """
+import datetime
+import time
+from django.core.management.base import BaseCommand
+
+from bookings.archive import archive_bookings
+
+
+class Command(BaseCommand):
+    """
+    Move bookings older than the given number of days, with their
+    tables, into the archive so the live booking table only holds
+    recent and future bookings.
+    """
+    help = 'Move old bookings into the booking archive.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=90,
+            help='Archive bookings older than this many days.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = datetime.date.today() - datetime.timedelta(
+            days=options['days'])
+        started = time.perf_counter()
+        archived = archive_bookings(cutoff, options['batch_size'])
+        self.stdout.write(
+            f'Archived {archived} bookings from before {cutoff} in '
+            f'{time.perf_counter() - started:.2f}s.')
@@ -0,0 +1,46 @@
+""" Benchmark rendering the booking form with and without caching. """
+import datetime
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from bookings.benchmarking import time_call
+from bookings.check_availability import create_booking_slots
+from bookings.forms import BookingForm
+
+FIELDS = ('date', 'time', 'party_size', 'name', 'email', 'phone_number',
+          'special_requirements')
+
+
+def form_template(field_filter):
+    """ Return a template rendering the booking form fields. """
+    return Template(
+        '{% load crispy_forms_tags booking_forms %}' + ''.join(
+            f'{{{{ booking_form.{field} | {field_filter} }}}}'
+            for field in FIELDS))
+
+
+class Command(BaseCommand):
+    """
+    Time rendering the fields of a new booking form through crispy
+    forms on every request and with the rendered fields reused.
+    """
+    help = 'Benchmark rendering the booking form.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        slots = create_booking_slots(
+            datetime.time(11, 00), datetime.time(23, 00))
+        results = [
+            ('crispy', form_template('as_crispy_field')),
+            ('cached', form_template('as_cached_crispy_field')),
+        ]
+        for label, template in results:
+            def render():
+                template.render(Context(
+                    {'booking_form': BookingForm(slots, '')}))
+            timing = time_call(render, options['repeat'])
+            self.stdout.write(
+                f"{label:<10}{timing['mean']:>10.3f} ms"
+                f"{timing['median']:>10.3f} ms median")
@@ -0,0 +1,104 @@
+""" Benchmark the booking search against scanning every booking. """
+import datetime
+import random
+from difflib import SequenceMatcher
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from restaurant.models import Restaurant, Table
+from bookings.benchmarking import rolled_back, seed_bookings, time_call
+from bookings.models import Booking
+from bookings.search import MIN_SCORE, booking_words, reindex_bookings, \
+    score, search_bookings, search_words
+
+FIRST_NAMES = [
+    'Alice', 'Bruno', 'Chiara', 'Daniel', 'Elena', 'Francesco', 'Giulia',
+    'Hannah', 'Isabella', 'James', 'Luca', 'Maria', 'Noah', 'Olivia',
+    'Paolo', 'Rosa', 'Sofia', 'Thomas', 'Valentina', 'William']
+LAST_NAMES = [
+    'Bianchi', 'Brown', 'Colombo', 'Conti', 'Esposito', 'Ferrari', 'Greco',
+    'Jones', 'Marino', 'Ricci', 'Romano', 'Russo', 'Smith', 'Taylor',
+    'Williams', 'Wilson']
+
+
+class Command(BaseCommand):
+    """
+    Seed bookings with varied names, emails and phone numbers and time
+    searches of the restaurant's bookings for part of a name, an email,
+    a phone number and a name with a typo, with a scan of every booking
+    and with the search. A case insensitive scan finds nothing for a
+    typo, so that is scanned by scoring every booking as the search
+    does. The number of bookings each finds is shown too. All data is
+    seeded in a transaction which is rolled back.
+    """
+    help = 'Benchmark the booking search index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        randomiser = random.Random(1)
+        with rolled_back():
+            restaurant = Restaurant.objects.create(
+                name='Benchmark Restaurant')
+            tables = [Table.objects.create(restaurant=restaurant, size=4)]
+            seed_bookings(
+                options['bookings'], datetime.date.today(), 365, tables)
+            bookings = list(Booking.objects.only('id'))
+            for booking in bookings:
+                first = randomiser.choice(FIRST_NAMES)
+                last = randomiser.choice(LAST_NAMES)
+                number = randomiser.randrange(10 ** 6)
+                booking.name = f'{first} {last}'
+                booking.email = f'{first}.{last}{number}@example.com'.lower()
+                booking.phone_number = f'07700 {number:06d}'
+            Booking.objects.bulk_update(
+                bookings, ['name', 'email', 'phone_number'], batch_size=5000)
+            self.stdout.write(f'Indexed {reindex_bookings()} bookings.')
+
+            target = bookings[len(bookings) // 2]
+            searches = [
+                ('part of a name', target.name.split()[1][:4], False),
+                ('email', target.email.split('@')[0], False),
+                ('phone number', target.phone_number[-7:], False),
+                ('name with a typo', target.name[:-2] + target.name[-1],
+                 True),
+            ]
+            for label, query, typo in searches:
+                words = query.split()
+
+                def scan():
+                    condition = Q()
+                    for word in words:
+                        condition &= (
+                            Q(name__icontains=word) |
+                            Q(email__icontains=word) |
+                            Q(phone_number__icontains=word))
+                    return list(Booking.objects.filter(
+                        condition, restaurant=restaurant)[:20])
+
+                def score_every_booking():
+                    matchers = [
+                        SequenceMatcher(None, b=word)
+                        for word in search_words(query)]
+                    return [
+                        booking_id
+                        for booking_id, *details in Booking.objects.filter(
+                            restaurant=restaurant).values_list(
+                                'id', *Booking.SEARCH_FIELDS).iterator()
+                        if score(
+                            matchers, booking_words(*details)) >= MIN_SCORE
+                    ][:20]
+
+                scanner = score_every_booking if typo else scan
+
+                def search():
+                    return search_bookings(query, restaurant)
+
+                scanned = time_call(scanner, options['repeat'])
+                searched = time_call(search, options['repeat'])
+                self.stdout.write(
+                    f"{label:<18}{scanned['mean']:>9.1f} ms scan"
+                    f"{len(scanner()):>4} found{searched['mean']:>9.1f} ms "
+                    f"search{len(search()):>4} found  {query!r}")
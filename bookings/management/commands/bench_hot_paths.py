@@ -0,0 +1,64 @@
+""" Benchmark the hot booking queries as the booking history grows. """
+import datetime
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from restaurant.models import Restaurant, Table
+from bookings.archive import archive_bookings
+from bookings.benchmarking import rolled_back, seed_bookings, time_call
+from bookings.check_availability import find_tables
+from bookings.models import Booking
+
+
+class Command(BaseCommand):
+    """
+    Time the queries used by find_tables, manage_bookings and
+    my_bookings with growing amounts of past bookings, both left in the
+    live table and after they have been archived. All data is seeded in
+    a transaction which is rolled back.
+    """
+    help = 'Benchmark hot-path queries against the size of the history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--history', type=int, nargs='+', default=[0, 10000, 100000],
+            help='Numbers of past bookings to test with.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'history':>10}{'live ms':>12}{'archived ms':>14}")
+        for history in options['history']:
+            with rolled_back():
+                live, archived = self.run(history, options['repeat'])
+            self.stdout.write(
+                f'{history:>10}{live:>12.2f}{archived:>14.2f}')
+
+    def run(self, history, repeat):
+        """
+        Seed the history and return the mean time of the hot queries
+        before and after archiving it.
+        """
+        restaurant = Restaurant.objects.create(name='Benchmark Restaurant')
+        tables = [
+            Table.objects.create(restaurant=restaurant, size=size)
+            for size in (2, 2, 4, 4, 2, 4, 4, 2)]
+        customer = User.objects.create(username='benchmark-customer')
+        today = datetime.date.today()
+        seed_bookings(200, today, 14, tables)
+        seed_bookings(
+            history, today - datetime.timedelta(days=3 * 365), 2 * 365,
+            tables)
+
+        def hot_paths():
+            find_tables(
+                today, datetime.time(19, 00), datetime.time(21, 00), 4, '')
+            list(Booking.objects.filter(date__gte=today))
+            list(Booking.objects.filter(
+                customer__isnull=False, customer=customer.id,
+                date__gte=today))
+
+        live = time_call(hot_paths, repeat)['mean']
+        archive_bookings(today - datetime.timedelta(days=90), 5000)
+        archived = time_call(hot_paths, repeat)['mean']
+        return live, archived
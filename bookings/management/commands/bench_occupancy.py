@@ -0,0 +1,64 @@
+""" Benchmark the day occupancy against a query per booking slot. """
+import datetime
+from django.core.management.base import BaseCommand
+
+from restaurant.models import Restaurant, Table
+from bookings.benchmarking import rolled_back, seed_bookings, time_call
+from bookings.durations import default_duration
+from bookings.occupancy import NumpyDayOccupancy, PythonDayOccupancy, \
+    duration_slots, load_numpy, load_occupancy, slot_index, slot_time
+
+
+class Command(BaseCommand):
+    """
+    Time finding the free seats for every booking slot of a busy day,
+    first loading the day's bookings for each slot as the table search
+    does and then with the occupancy loaded once, with and without
+    NumPy. All data is seeded in a transaction which is rolled back.
+    """
+    help = 'Benchmark the day occupancy matrix.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tables', type=int, default=40)
+        parser.add_argument('--bookings', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            restaurant = Restaurant.objects.create(
+                name='Benchmark Restaurant')
+            tables = [
+                Table.objects.create(restaurant=restaurant, size=size)
+                for size in [2, 4] * (options['tables'] // 2)]
+            day = datetime.date.today()
+            seed_bookings(options['bookings'], day, 1, tables)
+            slots = range(
+                slot_index(datetime.time(11, 00)),
+                slot_index(datetime.time(22, 00)))
+            length = duration_slots(default_duration())
+
+            def per_slot_loads():
+                for slot in slots:
+                    load_occupancy(day).free_seats(
+                        slot_time(slot), slot_time(slot + length))
+
+            def with_occupancy(backend):
+                occupancy = load_occupancy(day, backend=backend)
+                for slot in slots:
+                    occupancy.free_seats(
+                        slot_time(slot), slot_time(slot + length))
+                occupancy.max_party()
+                occupancy.utilisation()
+
+            results = [('occupancy per slot', per_slot_loads)]
+            results.append((
+                'python occupancy',
+                lambda: with_occupancy(PythonDayOccupancy)))
+            if load_numpy():
+                results.append((
+                    'numpy occupancy',
+                    lambda: with_occupancy(NumpyDayOccupancy)))
+            for label, func in results:
+                timing = time_call(func, options['repeat'])
+                self.stdout.write(
+                    f"{label:<20}{timing['mean']:>10.1f} ms")
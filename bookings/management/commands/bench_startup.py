@@ -0,0 +1,24 @@
+""" Benchmark the start up time and memory of commands and workers. """
+import statistics
+from django.core.management.base import BaseCommand
+
+from bookings.benchmarking import STARTUP_SCRIPTS, run_startup
+
+
+class Command(BaseCommand):
+    """
+    Start a management command and a web worker in new processes
+    repeatedly and report the mean time taken and peak memory (RSS).
+    """
+    help = 'Benchmark the cold start of commands and web workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        for label, script in STARTUP_SCRIPTS.items():
+            runs = [run_startup(script) for _ in range(options['repeat'])]
+            elapsed = statistics.mean(run[0] for run in runs)
+            memory = max(run[1] for run in runs) / 1024
+            self.stdout.write(
+                f'{label:<10}{elapsed:>10.0f} ms{memory:>10.1f} MB RSS')
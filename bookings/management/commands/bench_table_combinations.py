@@ -0,0 +1,87 @@
+""" Benchmark combining tables with and without a floor plan. """
+import random
+from django.core.management.base import BaseCommand
+
+from bookings.benchmarking import time_call
+from bookings.check_availability import TableSnapshot, combine_tables
+
+
+def grid_floor(count, columns, randomiser):
+    """
+    Return count tables of 2 and 4 seats laid out in rows of columns
+    tables, and the neighbours of each table in its row and column.
+    """
+    tables = [
+        TableSnapshot(table_id, randomiser.choice((2, 2, 4)))
+        for table_id in range(count)]
+    adjacency = {table.id: set() for table in tables}
+    for table_id in range(count):
+        neighbours = [table_id + columns]
+        if (table_id + 1) % columns:
+            neighbours.append(table_id + 1)
+        for neighbour in neighbours:
+            if neighbour < count:
+                adjacency[table_id].add(neighbour)
+                adjacency[neighbour].add(table_id)
+    return tables, adjacency
+
+
+def is_connected(tables, adjacency):
+    """ Return whether the tables are joined through their neighbours. """
+    ids = {table.id for table in tables}
+    reached = {tables[0].id}
+    waiting = [tables[0].id]
+    while waiting:
+        for neighbour in adjacency[waiting.pop()] & ids - reached:
+            reached.add(neighbour)
+            waiting.append(neighbour)
+    return reached == ids
+
+
+class Command(BaseCommand):
+    """
+    Time combining the free tables of floors of increasing size for a
+    party no single table seats, trying every combination of tables
+    and trying only neighbouring tables on a grid floor plan. A share
+    of the tables is taken by other bookings. Reports how often the
+    combinations of any tables would put apart tables together.
+    """
+    help = 'Benchmark the floor plan table combination search.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tables', type=int, nargs='+', default=[20, 40, 60])
+        parser.add_argument('--columns', type=int, default=6)
+        parser.add_argument('--booked', type=float, default=0.3)
+        parser.add_argument('--party-size', type=int, default=7)
+        parser.add_argument('--floors', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        randomiser = random.Random(1)
+        party_size = options['party_size']
+        self.stdout.write(
+            f"{'tables':>8}{'any ms':>10}{'floor plan ms':>15}"
+            f"{'apart':>8}")
+        for count in options['tables']:
+            any_ms = plan_ms = 0
+            apart = 0
+            for _ in range(options['floors']):
+                tables, adjacency = grid_floor(
+                    count, options['columns'], randomiser)
+                free = [
+                    table for table in tables
+                    if randomiser.random() >= options['booked']]
+                any_ms += time_call(
+                    lambda: combine_tables(free, party_size),
+                    options['repeat'])['mean']
+                plan_ms += time_call(
+                    lambda: combine_tables(free, party_size, adjacency),
+                    options['repeat'])['mean']
+                combined = combine_tables(free, party_size)
+                if combined and not is_connected(combined, adjacency):
+                    apart += 1
+            floors = options['floors']
+            self.stdout.write(
+                f'{count:>8}{any_ms / floors:>10.1f}'
+                f'{plan_ms / floors:>15.2f}{apart:>5}/{floors}')
@@ -0,0 +1,68 @@
+""" Benchmark the table search with model instances and snapshots. """
+import tracemalloc
+from django.core.management.base import BaseCommand
+
+from restaurant.models import Restaurant, Table
+from bookings.benchmarking import rolled_back, time_call
+from bookings.check_availability import TableSnapshot, select_single_table
+
+
+def peak_memory(func):
+    """ Return the peak memory in KiB allocated while calling func. """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    """
+    Compare loading the free tables as Table instances with loading
+    them as TableSnapshot objects, and searching them for a party that
+    needs tables combining, on floors of increasing size. The tables
+    are seeded in a transaction which is rolled back.
+    """
+    help = 'Benchmark the table search on large floors.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tables', type=int, nargs='+', default=[20, 60, 120, 240])
+        parser.add_argument('--party-size', type=int, default=7)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'tables':>8}{'models ms':>12}{'snapshots ms':>14}"
+            f"{'models KiB':>12}{'snapshots KiB':>15}")
+        for count in options['tables']:
+            with rolled_back():
+                restaurant = Restaurant.objects.create(
+                    name='Benchmark Restaurant')
+                # Two person tables only, so larger parties need
+                # combinations of up to four tables.
+                Table.objects.bulk_create([
+                    Table(restaurant=restaurant, size=2)
+                    for _ in range(count)])
+                tables = Table.objects.filter(restaurant=restaurant)
+                party_size = options['party_size']
+
+                # Each call loads the tables afresh, as find_tables does,
+                # rather than reusing the instances a queryset caches.
+                def with_models():
+                    select_single_table(list(tables.all()), party_size)
+
+                def with_snapshots():
+                    select_single_table([
+                        TableSnapshot(table_id, size) for table_id, size
+                        in tables.values_list('id', 'size')], party_size)
+
+                models_ms = time_call(with_models, options['repeat'])['mean']
+                snapshots_ms = time_call(
+                    with_snapshots, options['repeat'])['mean']
+                models_kib = peak_memory(with_models)
+                snapshots_kib = peak_memory(with_snapshots)
+            self.stdout.write(
+                f'{count:>8}{models_ms:>12.1f}{snapshots_ms:>14.1f}'
+                f'{models_kib:>12.0f}{snapshots_kib:>15.0f}')
@@ -0,0 +1,53 @@
+""" Export bookings for a date range as CSV or JSON Lines. """
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant.models import Restaurant
+from bookings.export import EXPORT_FORMATS, generate_export
+
+
+def parse_date(value):
+    """ Parse a YYYY-MM-DD command line date. """
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError as error:
+        raise CommandError(
+            f'"{value}" is not a valid date (YYYY-MM-DD).') from error
+
+
+class Command(BaseCommand):
+    """
+    Write the bookings between two dates, with their tables and
+    customer, to a file or stdout.
+    """
+    help = 'Export bookings for a date range as CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('start', type=parse_date)
+        parser.add_argument('end', type=parse_date)
+        parser.add_argument(
+            '--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument(
+            '--output', help='File to write to. Defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--restaurant',
+            help='Slug of the restaurant to export. Defaults to all.')
+
+    def handle(self, *args, **options):
+        restaurant = None
+        if options['restaurant']:
+            restaurant = Restaurant.objects.filter(
+                slug=options['restaurant']).first()
+            if restaurant is None:
+                raise CommandError('No restaurant found.')
+        lines = generate_export(
+            options['start'], options['end'], options['format'],
+            options['chunk_size'], restaurant)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8',
+                      newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
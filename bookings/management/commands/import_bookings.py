@@ -0,0 +1,55 @@
+""" Import bookings in bulk from a CSV or JSON Lines file. """
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant.models import Restaurant
+from bookings.bulk_import import IMPORT_FORMATS, import_bookings, read_rows
+
+
+class Command(BaseCommand):
+    """
+    Import phone, walk-in or legacy bookings, checking table availability
+    for each day and reporting the rows that could not be booked.
+    """
+    help = 'Import bookings from a CSV or JSON Lines file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=IMPORT_FORMATS,
+            help='Defaults to the file extension.')
+        parser.add_argument(
+            '--send-emails', action='store_true',
+            help='Send confirmation emails for the accepted bookings.')
+        parser.add_argument(
+            '--restaurant',
+            help='Slug of the restaurant to book. Defaults to the first.')
+
+    def handle(self, *args, **options):
+        import_format = options['format'] or options['path'].rsplit(
+            '.', 1)[-1].lower()
+        if import_format not in IMPORT_FORMATS:
+            raise CommandError('Format should be csv or jsonl.')
+
+        restaurants = Restaurant.objects.order_by('id')
+        if options['restaurant']:
+            restaurants = restaurants.filter(slug=options['restaurant'])
+        restaurant = restaurants.first()
+        if restaurant is None:
+            raise CommandError('No restaurant found.')
+
+        with open(options['path'], encoding='utf-8', newline='') as file:
+            rows = read_rows(file, import_format)
+        report = import_bookings(
+            rows, send_emails=options['send_emails'], restaurant=restaurant)
+
+        for row in report['rows']:
+            if row['status'] == 'rejected':
+                errors = '; '.join(
+                    f"{field}: {error['message']}"
+                    for field, field_errors in row['errors'].items()
+                    for error in field_errors)
+                self.stdout.write(f"Row {row['row']} rejected - {errors}")
+        self.stdout.write(
+            f"{report['accepted']} bookings imported, "
+            f"{report['rejected']} rejected, "
+            f"{report['emails_sent']} emails sent.")
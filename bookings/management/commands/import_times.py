@@ -0,0 +1,53 @@
+""" Report the time taken to import each module when starting up. """
+from collections import Counter
+from django.core.management.base import BaseCommand
+
+from bookings.benchmarking import STARTUP_SCRIPTS, run_startup
+
+
+def parse_import_times(report):
+    """
+    Return the own and cumulative import times in milliseconds of each
+    module from the report written by python -X importtime.
+    """
+    modules = []
+    for line in report.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, module = line[len('import time:'):].split('|')
+        modules.append(
+            (module.strip(), int(own) / 1000, int(cumulative) / 1000))
+    return modules
+
+
+class Command(BaseCommand):
+    """
+    Start Django in a new process with python -X importtime and list
+    the slowest modules to import, including what they import, and the
+    import time of each top level package.
+    """
+    help = 'Report the import time of each module at start up.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--startup', choices=STARTUP_SCRIPTS, default='command',
+            help='Time starting a management command or a web worker.')
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        elapsed, _, report = run_startup(
+            STARTUP_SCRIPTS[options['startup']], '-X', 'importtime')
+        modules = parse_import_times(report)
+
+        self.stdout.write(f'Started up in {elapsed:.0f} ms.\n')
+        self.stdout.write(f"{'cumulative ms':>14}{'own ms':>10}  module")
+        for module, own, cumulative in sorted(
+                modules, key=lambda row: -row[2])[:options['limit']]:
+            self.stdout.write(f'{cumulative:>14.1f}{own:>10.1f}  {module}')
+
+        packages = Counter()
+        for module, own, _ in modules:
+            packages[module.split('.')[0]] += own
+        self.stdout.write(f"\n{'own ms':>14}  package")
+        for package, own in packages.most_common(options['limit']):
+            self.stdout.write(f'{own:>14.1f}  {package}')
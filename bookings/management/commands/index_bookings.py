@@ -0,0 +1,26 @@
+""" Build the search index of the booking names, emails and phones. """
+import time
+from django.core.management.base import BaseCommand
+
+from bookings.search import reindex_bookings
+
+
+class Command(BaseCommand):
+    """
+    Index every booking for searching, for example after first adding
+    the search or after changing bookings without signals. Bookings are
+    indexed a batch at a time.
+    """
+    help = 'Rebuild the booking search index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Number of bookings indexed in each transaction.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        indexed = reindex_bookings(options['batch_size'])
+        self.stdout.write(
+            f'Indexed {indexed} bookings in '
+            f'{time.perf_counter() - started:.2f}s.')
@@ -0,0 +1,91 @@
+""" Load test running deployments of the site and compare the results. """
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+from urllib.request import urlopen
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(timings, pct):
+    """ Return the requested percentile of a sorted list of timings. """
+    if not timings:
+        return 0
+    index = min(len(timings) - 1, int(round(pct / 100 * (len(timings) - 1))))
+    return timings[index]
+
+
+class Command(BaseCommand):
+    """
+    Send the same requests to one or more running deployments, for
+    example the WSGI app under gunicorn and the ASGI app under uvicorn:
+
+        gunicorn il_oro_ditalia.wsgi:application -b :8000 -w 2
+        uvicorn il_oro_ditalia.asgi:application --port 8001 --workers 2
+        python manage.py loadtest --target wsgi=http://localhost:8000 \\
+            --target asgi=http://localhost:8001
+    """
+    help = 'Compare requests/sec and latency between running deployments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True,
+            help='A deployment to test given as label=base_url.')
+        parser.add_argument(
+            '--path', action='append',
+            help='Path to request, may be repeated. Defaults to the '
+                 'homepage and an availability lookup.')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--timeout', type=float, default=10)
+
+    def handle(self, *args, **options):
+        paths = options['path'] or [
+            '/', '/bookings/availability?date=2030-01-04&time=19:00'
+                 '&party_size=4']
+        targets = []
+        for target in options['target']:
+            label, sep, base_url = target.partition('=')
+            if not sep:
+                raise CommandError(
+                    f'Target "{target}" should be given as label=base_url.')
+            targets.append((label, base_url.rstrip('/')))
+
+        self.stdout.write(
+            f"{'target':<10}{'req/s':>10}{'mean ms':>10}{'p50 ms':>10}"
+            f"{'p99 ms':>10}{'errors':>8}")
+        for label, base_url in targets:
+            result = self.run_target(base_url, paths, options)
+            self.stdout.write(
+                f"{label:<10}{result['rps']:>10.1f}{result['mean']:>10.1f}"
+                f"{result['p50']:>10.1f}{result['p99']:>10.1f}"
+                f"{result['errors']:>8}")
+
+    def run_target(self, base_url, paths, options):
+        """ Run the load test against a single deployment. """
+        urls = [
+            base_url + paths[i % len(paths)]
+            for i in range(options['requests'])]
+
+        def fetch(url):
+            start = time.perf_counter()
+            try:
+                with urlopen(url, timeout=options['timeout']) as response:
+                    response.read()
+                    ok = response.status < 400
+            except (URLError, OSError):
+                ok = False
+            return ok, (time.perf_counter() - start) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(fetch, urls))
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(ms for ok, ms in results if ok)
+        return {
+            'rps': len(timings) / elapsed if elapsed else 0,
+            'mean': sum(timings) / len(timings) if timings else 0,
+            'p50': percentile(timings, 50),
+            'p99': percentile(timings, 99),
+            'errors': len(results) - len(timings),
+        }
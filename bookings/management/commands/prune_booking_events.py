@@ -0,0 +1,16 @@
+""" Delete the booking changes no dashboard will ask for again. """
+from django.core.management.base import BaseCommand
+
+from bookings.live import prune_events
+
+
+class Command(BaseCommand):
+    """
+    Delete the booking events older than BOOKING_EVENT_SECONDS, which
+    reconnecting dashboards no longer ask for. Run it periodically, as
+    the streams only read events.
+    """
+    help = 'Delete the booking events older than the streams ask for.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Deleted {prune_events()} booking events.')
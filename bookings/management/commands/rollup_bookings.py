@@ -0,0 +1,34 @@
+""" Rebuild the slot rollups used by the utilisation report. """
+import datetime
+import time
+from django.core.management.base import BaseCommand
+
+from bookings.rollups import backfill_rollups
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the slot rollups from the live and archived bookings, for
+    example after first adding them or after changing bookings without
+    signals. The dates are refreshed a batch at a time.
+    """
+    help = 'Rebuild the booking slot rollups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start', type=datetime.date.fromisoformat,
+            help='First date to rebuild, as YYYY-MM-DD.')
+        parser.add_argument(
+            '--end', type=datetime.date.fromisoformat,
+            help='Last date to rebuild, as YYYY-MM-DD.')
+        parser.add_argument(
+            '--batch-size', type=int, default=30,
+            help='Number of dates rebuilt in each transaction.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        refreshed = backfill_rollups(
+            options['start'], options['end'], options['batch_size'])
+        self.stdout.write(
+            f'Rebuilt the rollups of {refreshed} dates in '
+            f'{time.perf_counter() - started:.2f}s.')
@@ -0,0 +1,57 @@
+""" Send reminder emails for the next day's bookings. """
+import datetime
+import time
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.models import Booking
+from bookings.confirmation_email import build_reminder_email
+
+
+class Command(BaseCommand):
+    """
+    Email a reminder to every customer with a booking tomorrow. Each
+    booking is marked once its reminder is sent so the command is safe
+    to run repeatedly from cron.
+    """
+    help = "Send reminder emails for tomorrow's bookings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date', help='Send reminders for this date (YYYY-MM-DD) '
+                           'instead of tomorrow.')
+        parser.add_argument('--chunk-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                day = datetime.date.fromisoformat(options['date'])
+            except ValueError as error:
+                raise CommandError('Date should be YYYY-MM-DD.') from error
+        else:
+            day = datetime.date.today() + datetime.timedelta(days=1)
+
+        started = time.perf_counter()
+        bookings = list(Booking.objects.filter(
+            date=day, reminder_sent=False).select_related(
+                'restaurant').order_by('time', 'id'))
+        chunk_size = options['chunk_size']
+        sent = 0
+
+        # Reuse one connection to the mail server for every chunk.
+        with get_connection() as connection:
+            for index in range(0, len(bookings), chunk_size):
+                chunk = bookings[index:index + chunk_size]
+                sent += connection.send_messages(
+                    [build_reminder_email(booking) for booking in chunk]) or 0
+                # Record the chunk as sent straight away so a failure
+                # part way through does not resend these reminders.
+                Booking.objects.filter(
+                    id__in=[booking.id for booking in chunk]).update(
+                        reminder_sent=True)
+
+        elapsed = time.perf_counter() - started
+        rate = sent / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Sent {sent} reminders for {day} in {elapsed:.2f}s '
+            f'({rate:.1f} emails/s).')
@@ -0,0 +1,39 @@
+""" Fill the shared caches after a deploy or restart. """
+import time
+from django.core.management.base import BaseCommand
+
+from bookings.warmup import warm_restaurants, warm_slots
+
+
+class Command(BaseCommand):
+    """
+    Load the restaurants and work out the booking slots free for each
+    party size over the coming days into the shared cache, so the first
+    visitors after a deploy do not all search the tables at once. Run
+    it after the deploy when the cache is shared, such as Redis. With
+    the default local memory cache each worker has its own, which the
+    gunicorn post_fork hook fills when WARM_CACHES is set.
+    """
+    help = 'Warm the restaurant and availability caches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=14,
+            help='Number of days from today to cache the slots of.')
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Most restaurants loaded at the same time.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        for label, warm in (
+                ('restaurants', warm_restaurants),
+                ('restaurant days of slots', lambda: warm_slots(
+                    options['days'], options['workers']))):
+            step_started = time.perf_counter()
+            entries = warm()
+            self.stdout.write(
+                f'Cached {entries} {label} in '
+                f'{time.perf_counter() - step_started:.2f}s.')
+        self.stdout.write(
+            f'Warmed the caches in {time.perf_counter() - started:.2f}s.')
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-19 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='reminder_sent',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 3.2 on 2026-10-19 13:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_restaurants(apps, schema_editor):
+    """
+    Give existing bookings the restaurant of their tables. Anything
+    without tables belongs to the original restaurant.
+    """
+    Restaurant = apps.get_model('restaurant', 'Restaurant')
+    original = Restaurant.objects.order_by('id').first()
+    if original is None:
+        return
+    for model_name in ('Booking', 'ArchivedBooking'):
+        model = apps.get_model('bookings', model_name)
+        for restaurant_id in Restaurant.objects.values_list('id', flat=True):
+            model.objects.filter(
+                restaurant__isnull=True,
+                tables__restaurant_id=restaurant_id).update(
+                    restaurant_id=restaurant_id)
+        model.objects.filter(restaurant__isnull=True).update(
+            restaurant=original)
+    apps.get_model('bookings', 'WaitlistEntry').objects.update(
+        restaurant=original)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0003_restaurant_slug_host'),
+        ('bookings', '0004_archivedbooking'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='waitlistentry',
+            name='waitlist_date_size_idx',
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='restaurant',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to='restaurant.restaurant'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='restaurant',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='restaurant.restaurant'),
+        ),
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='restaurant',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='restaurant.restaurant'),
+        ),
+        migrations.RunPython(set_restaurants, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['restaurant', 'date'], name='booking_restaurant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waitlistentry',
+            index=models.Index(fields=['restaurant', 'date', 'party_size'], name='waitlist_restaurant_date_idx'),
+        ),
+    ]
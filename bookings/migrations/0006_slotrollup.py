@@ -0,0 +1,35 @@
+# Generated by Django 3.2 on 2026-10-19 13:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0003_restaurant_slug_host'),
+        ('bookings', '0005_booking_restaurant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('parties', models.PositiveIntegerField(default=0)),
+                ('covers', models.PositiveIntegerField(default=0)),
+                ('seats_booked', models.PositiveIntegerField(default=0)),
+                ('tables_used', models.PositiveIntegerField(default=0)),
+                ('restaurant', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='slot_rollups', to='restaurant.restaurant')),
+            ],
+            options={
+                'ordering': ['date', 'slot'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='slotrollup',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'date', 'slot'), name='rollup_restaurant_date_slot'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-19 13:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_slotrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingSearchGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_grams', to='bookings.booking')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='bookingsearchgram',
+            index=models.Index(fields=['gram', 'booking'], name='search_gram_booking_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-19 13:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0003_restaurant_slug_host'),
+        ('bookings', '0007_bookingsearchgram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_id', models.PositiveBigIntegerField()),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('cancelled', 'Cancelled')], max_length=10)),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('restaurant', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='booking_events', to='restaurant.restaurant')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
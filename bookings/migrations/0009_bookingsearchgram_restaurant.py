@@ -0,0 +1,38 @@
+# Generated by Django 3.2 on 2026-10-19 14:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_restaurants(apps, schema_editor):
+    """ Give the indexed pieces the restaurant of their booking. """
+    Booking = apps.get_model('bookings', 'Booking')
+    BookingSearchGram = apps.get_model('bookings', 'BookingSearchGram')
+    BookingSearchGram.objects.update(restaurant_id=models.Subquery(
+        Booking.objects.filter(id=models.OuterRef('booking_id')).values(
+            'restaurant_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0004_table_adjacent'),
+        ('bookings', '0008_bookingevent'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bookingsearchgram',
+            name='search_gram_booking_idx',
+        ),
+        migrations.AddField(
+            model_name='bookingsearchgram',
+            name='restaurant',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='restaurant.restaurant'),
+        ),
+        migrations.RunPython(set_restaurants, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='bookingsearchgram',
+            index=models.Index(fields=['restaurant', 'gram', 'booking'], name='search_restaurant_gram_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2 on 2026-10-19 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_bookingsearchgram_restaurant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingSubmission',
+            fields=[
+                ('key', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('booking_id', models.PositiveBigIntegerField(null=True)),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
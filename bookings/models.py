@@ -1,9 +1,10 @@
 """ Models for the bookings app. """
-from datetime import datetime, date, time, timedelta
+from datetime import datetime, date, time
 from django.db import models
 from django.contrib.auth.models import User
 
-from restaurant.models import Table
+from restaurant.models import Restaurant, Table
+from .durations import booking_end_time
 
 
 class Booking(models.Model):
@@ -25,6 +26,14 @@ class Booking(models.Model):
         (8, '8 people'),
     ]
 
+    # Fields which require the tables to be checked again when changed.
+    SLOT_FIELDS = ('date', 'time', 'end_time', 'party_size')
+    # Fields which require the booking to be indexed again when changed.
+    SEARCH_FIELDS = ('name', 'email', 'phone_number')
+
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, null=True,
+        related_name='bookings')
     customer = models.ForeignKey(
         User, on_delete=models.SET_NULL, null=True, blank=True,
         related_name='table_bookings')
@@ -42,20 +51,55 @@ class Booking(models.Model):
     phone_number = models.CharField(max_length=20)
     special_requirements = models.TextField(blank=True)
     updated = models.BooleanField(default=True)
+    reminder_sent = models.BooleanField(default=False, editable=False)
 
     class Meta:
         """
         Set ordering to ensure oldest bookings are displayed first.
+        Bookings are almost always looked up by date, and by restaurant
+        when checking availability.
         """
         ordering = ['date', 'time']
+        indexes = [
+            models.Index(
+                fields=['date', 'time'], name='booking_date_time_idx'),
+            models.Index(
+                fields=['restaurant', 'date'],
+                name='booking_restaurant_date_idx'),
+        ]
 
     def _generate_end_time(self):
         """
-        Calculate the end time of the booking when it is saved.
+        Calculate the end time of the booking when it is saved using
+        the booking duration policy.
+        """
+        return booking_end_time(self.time, self.party_size)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
         """
-        end_time = (
-            datetime.combine(date.today(), self.time)) + timedelta(hours=2)
-        return end_time.time()
+        Remember the saved restaurant, date, time and party size so that
+        signal receivers can tell when a booking has been moved, and the
+        saved details so that they can tell when it needs indexing again.
+        """
+        instance = super().from_db(db, field_names, values)
+        if 'restaurant_id' in field_names:
+            instance.saved_restaurant_id = instance.restaurant_id
+        if all(field in field_names for field in cls.SLOT_FIELDS):
+            instance.saved_slot = instance.slot
+        if all(field in field_names for field in cls.SEARCH_FIELDS):
+            instance.saved_details = instance.details
+        return instance
+
+    @property
+    def slot(self):
+        """ The date, times and party size that the tables are held for. """
+        return tuple(getattr(self, field) for field in self.SLOT_FIELDS)
+
+    @property
+    def details(self):
+        """ The name, email and phone number the booking is found by. """
+        return tuple(getattr(self, field) for field in self.SEARCH_FIELDS)
 
     def save(self, *args, **kwargs):
         """
@@ -63,9 +107,208 @@ class Booking(models.Model):
         """
         self.end_time = self._generate_end_time()
         super().save(*args, **kwargs)
+        self.saved_restaurant_id = self.restaurant_id
+        self.saved_slot = self.slot
+        self.saved_details = self.details
 
     def __str__(self):
         return (
             f"A table of {self.party_size} on "
             f"{datetime.strftime(self.date, '%d-%m-%Y')}"
-            )
\ No newline at end of file
+            )
+
+
+class ArchivedBooking(models.Model):
+    """
+    A past booking moved out of the Booking table by the
+    archive_bookings command to keep the live table small.
+    """
+    original_id = models.BigIntegerField(unique=True)
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, null=True,
+        related_name='archived_bookings')
+    customer = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='archived_table_bookings')
+    date = models.DateField()
+    time = models.TimeField()
+    end_time = models.TimeField()
+    party_size = models.IntegerField(choices=Booking.PARTY_SIZE_CHOICES)
+    tables = models.ManyToManyField(
+        Table, related_name='archived_bookings', blank=True)
+    table_numbers = models.CharField(max_length=50, blank=True)
+    name = models.CharField(max_length=50)
+    email = models.EmailField(max_length=254)
+    phone_number = models.CharField(max_length=20)
+    special_requirements = models.TextField(blank=True)
+    archived = models.DateTimeField(auto_now_add=True)
+
+    # Fields copied from the live booking when it is archived.
+    COPIED_FIELDS = (
+        'restaurant_id', 'customer_id', 'date', 'time', 'end_time',
+        'party_size', 'table_numbers', 'name', 'email', 'phone_number',
+        'special_requirements')
+
+    class Meta:
+        """ Match the ordering and date index of the live bookings. """
+        ordering = ['date', 'time']
+        indexes = [
+            models.Index(
+                fields=['date', 'time'], name='archived_date_time_idx'),
+        ]
+
+    def __str__(self):
+        return (
+            f"An archived table of {self.party_size} on "
+            f"{datetime.strftime(self.date, '%d-%m-%Y')}"
+            )
+
+
+class WaitlistEntry(models.Model):
+    """
+    A customer waiting for a table to become free on a date
+    between the earliest and latest times they can arrive.
+    """
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, null=True,
+        related_name='waitlist_entries')
+    customer = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='waitlist_entries')
+    date = models.DateField(default=date.today)
+    earliest_time = models.TimeField(default=time(18, 00))
+    latest_time = models.TimeField(default=time(20, 00))
+    party_size = models.IntegerField(
+        choices=Booking.PARTY_SIZE_CHOICES, default=2)
+    name = models.CharField(max_length=50)
+    email = models.EmailField(max_length=254)
+    phone_number = models.CharField(max_length=20)
+    created = models.DateTimeField(auto_now_add=True)
+    offered = models.BooleanField(default=False)
+
+    class Meta:
+        """
+        Entries are offered tables on a first come first served basis.
+        The index allows only the entries that could use freed tables
+        to be checked.
+        """
+        ordering = ['created']
+        verbose_name_plural = 'waitlist entries'
+        indexes = [
+            models.Index(
+                fields=['restaurant', 'date', 'party_size'],
+                name='waitlist_restaurant_date_idx'),
+        ]
+
+    def __str__(self):
+        return (
+            f"Waiting for a table of {self.party_size} on "
+            f"{datetime.strftime(self.date, '%d-%m-%Y')}"
+            )
+
+
+class SlotRollup(models.Model):
+    """
+    The bookings held in one 15 minute slot of a day at a restaurant,
+    kept up to date as bookings change so that reports over many
+    months need not read every booking. Only slots with bookings are
+    stored.
+    """
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, null=True,
+        related_name='slot_rollups')
+    date = models.DateField()
+    slot = models.PositiveSmallIntegerField()
+    parties = models.PositiveIntegerField(default=0)
+    covers = models.PositiveIntegerField(default=0)
+    seats_booked = models.PositiveIntegerField(default=0)
+    tables_used = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        """ Reports read a restaurant's slots over a range of dates. """
+        ordering = ['date', 'slot']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['restaurant', 'date', 'slot'],
+                name='rollup_restaurant_date_slot'),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.covers} covers in slot {self.slot} on "
+            f"{datetime.strftime(self.date, '%d-%m-%Y')}"
+            )
+
+
+class BookingSearchGram(models.Model):
+    """
+    One three character piece of the normalised name, email or phone
+    number of a booking. Bookings are searched by the pieces they share
+    with the search, which finds parts of words and survives typos
+    without scanning every booking.
+    """
+    booking = models.ForeignKey(
+        Booking, on_delete=models.CASCADE, related_name='search_grams')
+    # The booking's restaurant, so that searching one restaurant's
+    # bookings reads none of the pieces of other restaurants.
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, null=True, related_name='+')
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        """
+        Searches count the bookings of a restaurant with each of a set
+        of pieces.
+        """
+        indexes = [
+            models.Index(
+                fields=['restaurant', 'gram', 'booking'],
+                name='search_restaurant_gram_idx'),
+        ]
+
+    def __str__(self):
+        return self.gram
+
+
+class BookingSubmission(models.Model):
+    """
+    A submission of the booking form, recorded in the database when the
+    workers share no cache so that a repeat reaching another worker is
+    still recognised. The booking id is empty while it is processed.
+    """
+    key = models.CharField(max_length=32, primary_key=True)
+    booking_id = models.PositiveBigIntegerField(null=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.key
+
+
+class BookingEvent(models.Model):
+    """
+    A change to a booking, read by every worker streaming changes to
+    the owner's dashboard. The booking id is kept rather than a link
+    so that the events of cancelled bookings remain.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    CANCELLED = 'cancelled'
+    KINDS = [
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, null=True,
+        related_name='booking_events')
+    booking_id = models.PositiveBigIntegerField()
+    kind = models.CharField(max_length=10, choices=KINDS)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        """ Streams read a restaurant's events after the last one sent. """
+        ordering = ['id']
+
+    def __str__(self):
+        return f"Booking {self.booking_id} {self.kind}"
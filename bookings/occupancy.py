@@ -0,0 +1,305 @@
+""" Table occupancy for a day in 15 minute slots. """
+import heapq
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from datetime import time, timedelta
+from functools import cached_property, lru_cache
+from django.db.models import F, Q
+from restaurant.models import Table
+from .models import Booking
+from .durations import default_duration
+from .intervals import IntervalIndex, minutes
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+# The table search combines at most 4 tables for a party.
+MAX_COMBINED_TABLES = 4
+
+
+@lru_cache(maxsize=None)
+def load_numpy():
+    """
+    Return NumPy, or None when it is not installed. It is imported when
+    first needed as it takes longer to import than the rest of the site.
+    """
+    try:
+        import numpy  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    return numpy
+
+
+def table_adjacency(table_ids):
+    """
+    Return the ids of the neighbouring tables of each of the tables,
+    or None when their restaurant has no floor plan and any of its
+    tables can be combined.
+    """
+    edges = Table.adjacent.through.objects.filter(
+        from_table__restaurant__in=Table.objects.filter(
+            id__in=table_ids).values('restaurant')).values_list(
+                'from_table_id', 'to_table_id')
+    adjacency = {table_id: set() for table_id in table_ids}
+    has_plan = False
+    for from_id, to_id in edges:
+        has_plan = True
+        if from_id in adjacency:
+            adjacency[from_id].add(to_id)
+    return adjacency if has_plan else None
+
+
+def table_bookings(days):
+    """
+    Return the condition for the table bookings held on the days, which
+    includes those of the day before each running past midnight.
+    """
+    return Q(booking__date__in=days) | Q(
+        booking__date__in=[day - timedelta(days=1) for day in days],
+        booking__end_time__gt=time.min,
+        booking__end_time__lt=F('booking__time'))
+
+
+def held_days(day, start, end):
+    """
+    Return the days a booking on a day from start to end holds its
+    tables, which includes the day after when it runs past midnight.
+    """
+    if start is not None and end is not None and time.min < end < start:
+        return [day, day + timedelta(days=1)]
+    return [day]
+
+
+def booked_intervals(rows):
+    """
+    Return the (table_id, start, end) times tables are booked on each
+    day from rows of (date, table_id, start, end). A booking running
+    past midnight also books its table from midnight on the day after.
+    """
+    intervals = defaultdict(list)
+    for day, table_id, start, end in rows:
+        intervals[day].append((table_id, start, end))
+        if time.min < end < start:
+            intervals[day + timedelta(days=1)].append(
+                (table_id, time.min, end))
+    return intervals
+
+
+def slot_index(value, round_up=False):
+    """
+    Return the index of the slot a time falls in, or with round_up
+    the index of the first slot starting at or after it.
+    """
+    minutes = value.hour * 60 + value.minute
+    if round_up:
+        if value.second or value.microsecond:
+            minutes += 1
+        return -(-minutes // SLOT_MINUTES)
+    return minutes // SLOT_MINUTES
+
+
+def slot_time(index):
+    """ Return the start time of a slot. """
+    minutes = index * SLOT_MINUTES
+    return time(minutes // 60, minutes % 60)
+
+
+def duration_slots(duration):
+    """ Return the number of slots covered by a booking duration. """
+    return -(-int(duration.total_seconds()) // (SLOT_MINUTES * 60))
+
+
+def slot_range(start, end):
+    """
+    Return the first slot and the slot after the last one covered by
+    the start and end times. An end at or before the start means the
+    booking runs past midnight, so it is cut at the end of the day.
+    """
+    first = slot_index(start)
+    if end <= start:
+        return first, SLOTS_PER_DAY
+    return first, max(slot_index(end, round_up=True), first + 1)
+
+
+class DayOccupancy(ABC):
+    """
+    Which tables are booked at each time of a day. The day's bookings
+    are loaded with one query and kept in an interval index, to find the
+    tables free at any time, and as a tables by slots matrix so that
+    questions about every slot need no further queries. Subclasses
+    store the matrix with or without NumPy.
+    """
+    def __init__(self, tables, intervals):
+        """
+        Tables are (id, size) pairs and intervals are the (table_id,
+        start, end) times each table is booked.
+        """
+        self.table_ids = [table_id for table_id, _ in tables]
+        self.sizes = [size for _, size in tables]
+        rows = {table_id: row for row, table_id in enumerate(self.table_ids)}
+        intervals = [
+            interval for interval in intervals if interval[0] in rows]
+        self.index = IntervalIndex(
+            minutes(start, end) + (table_id,)
+            for table_id, start, end in intervals)
+        self.build([
+            (rows[table_id],) + slot_range(start, end)
+            for table_id, start, end in intervals])
+
+    @classmethod
+    def load(cls, day, booking_id='', restaurant=None):
+        """
+        Load the tables and the bookings on a day, including those of
+        the day before running past midnight, of one restaurant when
+        given. When updating a booking its own tables are left free.
+        """
+        tables = Table.objects.order_by('id')
+        bookings = Booking.tables.through.objects.filter(
+            table_bookings([day]))
+        if restaurant is not None:
+            tables = tables.filter(restaurant=restaurant)
+            bookings = bookings.filter(booking__restaurant=restaurant)
+        tables = list(tables.values_list('id', 'size'))
+        if booking_id:
+            bookings = bookings.exclude(booking_id=booking_id)
+        intervals = booked_intervals(bookings.values_list(
+            'booking__date', 'table_id', 'booking__time',
+            'booking__end_time'))
+        return cls(tables, intervals[day])
+
+    def free_tables(self, start, end):
+        """
+        Return the (id, size) of the tables free for the whole of the
+        time from start to end.
+        """
+        booked = set(self.index.overlapping(*minutes(start, end)))
+        return [
+            (table_id, size)
+            for table_id, size in zip(self.table_ids, self.sizes)
+            if table_id not in booked]
+
+    def free_seats(self, start, end):
+        """ Return the seats at the tables free from start to end. """
+        return sum(size for _, size in self.free_tables(start, end))
+
+    @cached_property
+    def adjacency(self):
+        """
+        The neighbouring tables of each table, or None when any tables
+        can be combined. It is loaded when first needed, and days with
+        the same tables can be given the adjacency loaded for one.
+        """
+        return table_adjacency(self.table_ids)
+
+    @abstractmethod
+    def max_party(self, length=None):
+        """
+        Return for each slot the seats at the largest tables which
+        could be combined for a booking of length slots starting then,
+        by default the length of a booking without a duration rule.
+        A party of this size or smaller can be seated at that time, or
+        on a floor plan at most this size, as the largest tables may
+        not be next to each other.
+        """
+
+    @abstractmethod
+    def utilisation(self):
+        """ Return for each slot the fraction of seats booked. """
+
+    @abstractmethod
+    def build(self, intervals):
+        """ Store the (row, first, last) slots each table is booked. """
+
+    @abstractmethod
+    def free_mask(self, first, last):
+        """ Return whether each table is free from slot first to last. """
+
+
+class PythonDayOccupancy(DayOccupancy):
+    """
+    Occupancy with the booked slots of each table held as the bits
+    of an integer.
+    """
+    def build(self, intervals):
+        self.busy = [0] * len(self.table_ids)
+        for row, first, last in intervals:
+            self.busy[row] |= (1 << last) - (1 << first)
+
+    def free_mask(self, first, last):
+        window = (1 << last) - (1 << first)
+        return [not busy & window for busy in self.busy]
+
+    def max_party(self, length=None):
+        length = length or duration_slots(default_duration())
+        seats = []
+        for first in range(SLOTS_PER_DAY):
+            free_sizes = [
+                size for size, free in zip(
+                    self.sizes, self.free_mask(first, first + length))
+                if free]
+            seats.append(sum(heapq.nlargest(MAX_COMBINED_TABLES, free_sizes)))
+        return seats
+
+    def utilisation(self):
+        total = sum(self.sizes)
+        if not total:
+            return [0.0] * SLOTS_PER_DAY
+        return [
+            sum(size for size, busy in zip(self.sizes, self.busy)
+                if busy >> slot & 1) / total
+            for slot in range(SLOTS_PER_DAY)]
+
+
+class NumpyDayOccupancy(DayOccupancy):
+    """
+    Occupancy held as a NumPy boolean matrix so that each question is
+    answered for every table and slot at once.
+    """
+    def build(self, intervals):
+        numpy = load_numpy()
+        # Mark where each booking starts and ends then a running total
+        # along each row gives the slots booked.
+        changes = numpy.zeros(
+            (len(self.table_ids), SLOTS_PER_DAY + 1), dtype=numpy.int32)
+        if intervals:
+            rows, firsts, lasts = numpy.array(intervals).T
+            numpy.add.at(changes, (rows, firsts), 1)
+            numpy.add.at(changes, (rows, lasts), -1)
+        self.busy = changes.cumsum(axis=1)[:, :SLOTS_PER_DAY] > 0
+        self.size_array = numpy.array(self.sizes, dtype=numpy.int32)
+
+    def free_mask(self, first, last):
+        return (~self.busy[:, first:last].any(axis=1)).tolist()
+
+    def max_party(self, length=None):
+        numpy = load_numpy()
+        length = length or duration_slots(default_duration())
+        # Count the booked slots in every window of length slots, with
+        # the slots after midnight counted as free.
+        booked = numpy.zeros(
+            (len(self.table_ids), SLOTS_PER_DAY + length + 1),
+            dtype=numpy.int32)
+        booked[:, 1:SLOTS_PER_DAY + 1] = self.busy
+        booked = booked.cumsum(axis=1)
+        free = (booked[:, length:length + SLOTS_PER_DAY] -
+                booked[:, :SLOTS_PER_DAY]) == 0
+        free_sizes = numpy.where(free, self.size_array[:, None], 0)
+        free_sizes.sort(axis=0)
+        return free_sizes[-MAX_COMBINED_TABLES:].sum(axis=0).tolist()
+
+    def utilisation(self):
+        total = self.size_array.sum()
+        if not total:
+            return [0.0] * SLOTS_PER_DAY
+        return (self.size_array @ self.busy / total).tolist()
+
+
+def default_backend():
+    """ Return the occupancy class using NumPy when it is installed. """
+    return NumpyDayOccupancy if load_numpy() else PythonDayOccupancy
+
+
+def load_occupancy(day, booking_id='', backend=None, restaurant=None):
+    """
+    Load the occupancy of a day with NumPy when it is installed.
+    """
+    return (backend or default_backend()).load(day, booking_id, restaurant)
@@ -0,0 +1,390 @@
+""" Keep the per slot totals used by the owner reports up to date. """
+import calendar
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import ExtractIsoWeekDay
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from restaurant.models import Table
+from .models import ArchivedBooking, Booking, SlotRollup
+from .occupancy import SLOTS_PER_DAY, slot_range, slot_time
+
+# Whether the bookings deleted in each thread are being archived.
+archive = threading.local()
+
+
+def day_bookings(model, dates):
+    """
+    Yield the restaurant, date, times, party size and table sizes of
+    each booking of a model, live or archived, on the dates.
+    """
+    table_sizes = defaultdict(list)
+    links = model.tables.through.objects.filter(
+        **{f'{model._meta.model_name}__date__in': dates}).values_list(
+            f'{model._meta.model_name}_id', 'table__size')
+    for booking_id, size in links:
+        table_sizes[booking_id].append(size)
+    bookings = model.objects.filter(date__in=dates).order_by().values_list(
+        'id', 'restaurant_id', 'date', 'time', 'end_time', 'party_size')
+    for booking_id, restaurant_id, day, start, end, party_size in bookings:
+        yield restaurant_id, day, start, end, party_size, table_sizes[
+            booking_id]
+
+
+def build_rollups(dates):
+    """
+    Return the unsaved slot rollups of every restaurant on the dates
+    from their live and archived bookings.
+    """
+    totals = {}
+    for model in (Booking, ArchivedBooking):
+        for restaurant_id, day, start, end, party_size, sizes in (
+                day_bookings(model, dates)):
+            day_totals = totals.setdefault(
+                (restaurant_id, day),
+                [[0] * SLOTS_PER_DAY for _ in range(4)])
+            first, last = slot_range(start, end)
+            for slot in range(first, last):
+                day_totals[0][slot] += 1
+                day_totals[1][slot] += party_size
+                day_totals[2][slot] += sum(sizes)
+                day_totals[3][slot] += len(sizes)
+    return [
+        SlotRollup(
+            restaurant_id=restaurant_id, date=day, slot=slot,
+            parties=parties[slot], covers=covers[slot],
+            seats_booked=seats[slot], tables_used=tables[slot])
+        for (restaurant_id, day), (parties, covers, seats, tables)
+        in totals.items()
+        for slot in range(SLOTS_PER_DAY) if parties[slot]]
+
+
+def refresh_rollups(dates):
+    """ Replace the slot rollups of the dates. """
+    dates = sorted(set(dates))
+    with transaction.atomic():
+        SlotRollup.objects.filter(date__in=dates).delete()
+        SlotRollup.objects.bulk_create(build_rollups(dates))
+
+
+def refresh_slots(restaurant_id, day, first, last):
+    """
+    Bring the rollups of the slots from first up to last on a date at a
+    restaurant up to date with its live and archived bookings, writing
+    only the slots whose totals have changed.
+    """
+    totals = {slot: [0, 0, 0, 0] for slot in range(first, last)}
+    for model in (Booking, ArchivedBooking):
+        # One row for each table of each booking, or one row with no
+        # size for a booking without tables.
+        rows = defaultdict(list)
+        for booking_id, start, end, party_size, size in (
+                model.objects.filter(restaurant_id=restaurant_id, date=day)
+                .order_by().values_list(
+                    'id', 'time', 'end_time', 'party_size', 'tables__size')):
+            rows[booking_id, start, end, party_size].append(size)
+        for (_, start, end, party_size), sizes in rows.items():
+            sizes = [size for size in sizes if size is not None]
+            booked_first, booked_last = slot_range(start, end)
+            for slot in range(
+                    max(first, booked_first), min(last, booked_last)):
+                slot_totals = totals[slot]
+                slot_totals[0] += 1
+                slot_totals[1] += party_size
+                slot_totals[2] += sum(sizes)
+                slot_totals[3] += len(sizes)
+
+    with transaction.atomic():
+        saved = {
+            rollup.slot: rollup for rollup in SlotRollup.objects.filter(
+                restaurant_id=restaurant_id, date=day,
+                slot__gte=first, slot__lt=last)}
+        created, updated, emptied = [], [], []
+        for slot, (parties, covers, seats, tables) in totals.items():
+            rollup = saved.get(slot)
+            if not parties:
+                if rollup is not None:
+                    emptied.append(rollup.id)
+            elif rollup is None:
+                created.append(SlotRollup(
+                    restaurant_id=restaurant_id, date=day, slot=slot,
+                    parties=parties, covers=covers, seats_booked=seats,
+                    tables_used=tables))
+            elif (rollup.parties, rollup.covers, rollup.seats_booked,
+                  rollup.tables_used) != (parties, covers, seats, tables):
+                rollup.parties = parties
+                rollup.covers = covers
+                rollup.seats_booked = seats
+                rollup.tables_used = tables
+                updated.append(rollup)
+        if emptied:
+            SlotRollup.objects.filter(id__in=emptied).delete()
+        if created:
+            SlotRollup.objects.bulk_create(created)
+        if updated:
+            SlotRollup.objects.bulk_update(
+                updated, ['parties', 'covers', 'seats_booked', 'tables_used'])
+
+
+def add_booking(deltas, restaurant_id, slot, sizes=(), parties=1, sign=1):
+    """
+    Add the change made to each slot held by a booking's date, times and
+    party to the deltas, keyed by restaurant, date and slot. A booking
+    adds one party and its covers and table sizes, a sign of -1 takes
+    them away, and tables given to or taken from a booking are counted
+    with no parties. Returns the deltas.
+    """
+    day, start, end, party_size = slot
+    if day is None or start is None or end is None:
+        return deltas
+    change = (
+        sign * parties, sign * parties * party_size,
+        sign * sum(sizes), sign * len(sizes))
+    for slot_number in range(*slot_range(start, end)):
+        totals = deltas.setdefault(
+            (restaurant_id, day, slot_number), [0, 0, 0, 0])
+        for index, value in enumerate(change):
+            totals[index] += value
+    return deltas
+
+
+def apply_deltas(deltas):
+    """
+    Add the deltas to the slot rollups, creating the rollups of slots
+    booked for the first time and deleting those left with no parties.
+    The changed slots of a day whose rollups do not match its bookings,
+    which would leave a total below zero, are counted again from the
+    bookings instead.
+    """
+    days = defaultdict(dict)
+    for (restaurant_id, day, slot), change in deltas.items():
+        if any(change):
+            days[restaurant_id, day][slot] = change
+    for (restaurant_id, day), changes in days.items():
+        try:
+            with transaction.atomic():
+                apply_day(restaurant_id, day, changes)
+        except (IntegrityError, ValueError):
+            refresh_slots(
+                restaurant_id, day, min(changes), max(changes) + 1)
+
+
+def apply_day(restaurant_id, day, changes):
+    """ Add the changes to the rollups of the slots of one day. """
+    saved = {
+        rollup.slot: rollup for rollup in SlotRollup.objects.filter(
+            restaurant_id=restaurant_id, date=day,
+            slot__in=list(changes)).select_for_update()}
+    created, updated, emptied = [], [], []
+    for slot, change in changes.items():
+        rollup = saved.get(slot) or SlotRollup(
+            restaurant_id=restaurant_id, date=day, slot=slot)
+        totals = [
+            rollup.parties + change[0], rollup.covers + change[1],
+            rollup.seats_booked + change[2], rollup.tables_used + change[3]]
+        if min(totals) < 0 or (any(totals) and not totals[0]):
+            raise ValueError(f'Rollups of {day} out of date.')
+        rollup.parties, rollup.covers, rollup.seats_booked, \
+            rollup.tables_used = totals
+        if not rollup.parties:
+            if rollup.id is not None:
+                emptied.append(rollup.id)
+        elif rollup.id is None:
+            created.append(rollup)
+        else:
+            updated.append(rollup)
+    if emptied:
+        SlotRollup.objects.filter(id__in=emptied).delete()
+    if created:
+        SlotRollup.objects.bulk_create(created)
+    if updated:
+        SlotRollup.objects.bulk_update(
+            updated, ['parties', 'covers', 'seats_booked', 'tables_used'])
+
+
+def change_rollups(deltas):
+    """
+    Add the deltas to the rollups once the current transaction commits.
+    Each change registers a commit callback of its own, so Django drops
+    the changes of a savepoint which is rolled back.
+    """
+    if deltas:
+        transaction.on_commit(lambda: apply_deltas(deltas))
+
+
+@contextmanager
+def archiving():
+    """
+    Leave the rollups as they are while bookings are deleted, as the
+    bookings being archived are still counted.
+    """
+    archive.active = True
+    try:
+        yield
+    finally:
+        archive.active = False
+
+
+def table_sizes(booking):
+    """ Return the sizes of the tables of a saved booking. """
+    return list(booking.tables.values_list('size', flat=True))
+
+
+def backfill_rollups(start=None, end=None, batch_size=30):
+    """
+    Rebuild the rollups of every date with bookings between the start
+    and end dates (inclusive), batch_size dates at a time. Returns the
+    number of dates refreshed.
+    """
+    # Dates which no longer have bookings are cleared too.
+    dates = set()
+    for model in (Booking, ArchivedBooking, SlotRollup):
+        rows = model.objects.order_by()
+        if start:
+            rows = rows.filter(date__gte=start)
+        if end:
+            rows = rows.filter(date__lte=end)
+        dates.update(rows.values_list('date', flat=True).distinct())
+    dates = sorted(dates)
+    for index in range(0, len(dates), batch_size):
+        refresh_rollups(dates[index:index + batch_size])
+    return len(dates)
+
+
+def opening_slots(restaurant):
+    """ Return the slots in which a restaurant is open. """
+    first, last = slot_range(restaurant.opening_time, restaurant.closing_time)
+    return range(first, last)
+
+
+def utilisation_report(restaurant, start, end):
+    """
+    Return the mean covers and share of seats booked in each slot of
+    each weekday, and the peak covers and share of seats booked on
+    each date, between the start and end dates (inclusive).
+    """
+    capacity = sum(restaurant.tables.values_list('size', flat=True)) or 1
+    slots = opening_slots(restaurant)
+    rollups = SlotRollup.objects.filter(
+        restaurant=restaurant, date__range=(start, end)).order_by()
+
+    # The number of each weekday in the range, Monday first.
+    weekdays = [0] * 7
+    for offset in range((end - start).days + 1):
+        weekdays[(start + timedelta(days=offset)).weekday()] += 1
+    totals = {
+        (row['weekday'] - 1, row['slot']): row
+        for row in rollups.annotate(weekday=ExtractIsoWeekDay('date'))
+        .values('weekday', 'slot')
+        .annotate(covers=Sum('covers'), seats=Sum('seats_booked'))}
+    empty = {'covers': 0, 'seats': 0}
+    heatmap = []
+    for weekday, days in enumerate(weekdays):
+        days = days or 1
+        heatmap.append({
+            'weekday': calendar.day_name[weekday],
+            'slots': [{
+                'time': slot_time(slot).strftime('%H:%M'),
+                'covers': round(totals.get(
+                    (weekday, slot), empty)['covers'] / days, 2),
+                'utilisation': round(totals.get(
+                    (weekday, slot), empty)['seats'] / days / capacity, 3),
+            } for slot in slots],
+        })
+
+    trend = [
+        {
+            'date': row['date'].isoformat(),
+            'peak_covers': row['peak_covers'],
+            'utilisation': round(
+                row['seats'] / (capacity * len(slots) or 1), 3),
+        }
+        for row in rollups.filter(
+            slot__gte=slots.start, slot__lt=slots.stop)
+        .values('date').order_by('date')
+        .annotate(peak_covers=Max('covers'), seats=Sum('seats_booked'))]
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'heatmap': heatmap,
+        'trend': trend,
+    }
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, **kwargs):
+    """
+    Count a booking made, and move the counts of a booking moved from
+    the slots it was saved with to its new slots. Other changes to a
+    booking leave the rollups as they are.
+    """
+    if created:
+        # Tables can only be given to a booking once it is saved.
+        change_rollups(add_booking(
+            {}, instance.restaurant_id, instance.slot))
+        return
+    previous = getattr(instance, 'saved_slot', None)
+    previous_restaurant = getattr(
+        instance, 'saved_restaurant_id', instance.restaurant_id)
+    if (previous == instance.slot and
+            previous_restaurant == instance.restaurant_id):
+        return
+    if previous is None:
+        # Without the saved slot there is nothing to take the booking
+        # from, so its day is counted again from the bookings.
+        restaurant_id, day = instance.restaurant_id, instance.date
+        transaction.on_commit(lambda: refresh_slots(
+            restaurant_id, day, 0, SLOTS_PER_DAY))
+        return
+    # The tables only need counting when the booking holds other slots.
+    moved = (
+        previous_restaurant != instance.restaurant_id or
+        previous[0] != instance.date or
+        slot_range(*previous[1:3]) != slot_range(
+            instance.time, instance.end_time))
+    sizes = table_sizes(instance) if moved else []
+    deltas = add_booking(
+        {}, previous_restaurant, previous, sizes, sign=-1)
+    change_rollups(add_booking(
+        deltas, instance.restaurant_id, instance.slot, sizes))
+
+
+@receiver(pre_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    """
+    Take away the counts of a cancelled booking, before its tables are
+    deleted with it. Archived bookings are still counted.
+    """
+    if getattr(archive, 'active', False):
+        return
+    change_rollups(add_booking(
+        {}, getattr(instance, 'saved_restaurant_id', instance.restaurant_id),
+        getattr(instance, 'saved_slot', None) or instance.slot,
+        table_sizes(instance), sign=-1))
+
+
+@receiver(m2m_changed, sender=Booking.tables.through)
+def booking_tables_changed(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """
+    Count the tables given to or taken from a booking in the slots it
+    is saved with, as tables can be changed before a move is saved.
+    """
+    if reverse or action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if action == 'pre_clear':
+        sizes = table_sizes(instance)
+    elif pk_set:
+        sizes = list(Table.objects.filter(
+            id__in=pk_set).values_list('size', flat=True))
+    else:
+        return
+    change_rollups(add_booking(
+        {}, getattr(instance, 'saved_restaurant_id', instance.restaurant_id),
+        getattr(instance, 'saved_slot', None) or instance.slot, sizes,
+        parties=0, sign=1 if action == 'post_add' else -1))
@@ -0,0 +1,267 @@
+""" Search bookings by part of a name, email or phone number. """
+import math
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from restaurant.models import Restaurant
+from .models import Booking, BookingSearchGram
+
+# Searches first look for the words as typed in this many of the newest
+# bookings, which finds a common name, or any booking of a restaurant
+# with fewer bookings, more quickly than the index.
+SCAN_BOOKINGS = 5000
+# Share of the pieces of a search a booking must have to be a candidate.
+MIN_GRAM_SHARE = 0.2
+# Share of the pieces a booking must have to be listed by the admin
+# search, which lists every such booking rather than scoring them.
+LIST_GRAM_SHARE = 0.5
+# The candidates sharing the most pieces which are scored in full.
+MAX_CANDIDATES = 200
+# Bookings scoring less than this against the search are not returned.
+MIN_SCORE = 0.6
+# Searches of phone numbers may include spaces, brackets and dashes.
+PHONE_SEARCH = re.compile(r'^[\d\s()+-]+$')
+WORD = re.compile(r'[a-z0-9]+')
+
+
+def normalise(value):
+    """
+    Return the lower case letters and digits of each word of a value,
+    with accents removed.
+    """
+    value = (value or '').lower()
+    if not value.isascii():
+        value = unicodedata.normalize('NFKD', value)
+        value = ''.join(
+            char for char in value if not unicodedata.combining(char))
+    return WORD.findall(value)
+
+
+def phone_digits(value):
+    """ Return the digits of a phone number. """
+    return re.sub(r'\D', '', value or '')
+
+
+def word_grams(word):
+    """
+    Return the three character pieces of a word. Padding the word with
+    spaces adds pieces marking its start and end, so words of one or
+    two characters have pieces too.
+    """
+    word = f' {word} '
+    return {word[index:index + 3] for index in range(len(word) - 2)}
+
+
+def booking_words(name, email, phone_number):
+    """ Return the words of a booking which can be searched. """
+    words = normalise(name) + normalise(email)
+    digits = phone_digits(phone_number)
+    if digits:
+        words.append(digits)
+    return words
+
+
+def search_words(query):
+    """
+    Return the words of a search. A search of only digits and phone
+    number punctuation is searched as one phone number.
+    """
+    if PHONE_SEARCH.match(query) and phone_digits(query):
+        return [phone_digits(query)]
+    return normalise(query)
+
+
+def index_bookings(bookings):
+    """
+    Replace the search pieces of the bookings, given as Booking
+    instances or (id, restaurant_id, name, email, phone_number) rows.
+    """
+    rows = [
+        (booking.id, booking.restaurant_id, *booking.details)
+        if isinstance(booking, Booking) else booking
+        for booking in bookings]
+    with transaction.atomic():
+        BookingSearchGram.objects.filter(
+            booking_id__in=[row[0] for row in rows]).delete()
+        BookingSearchGram.objects.bulk_create([
+            BookingSearchGram(
+                booking_id=booking_id, restaurant_id=restaurant_id, gram=gram)
+            for booking_id, restaurant_id, name, email, phone_number in rows
+            for gram in set().union(*(
+                word_grams(word)
+                for word in booking_words(name, email, phone_number)))
+        ], batch_size=5000)
+
+
+def reindex_bookings(batch_size=5000):
+    """
+    Index the search pieces of every booking, batch_size at a time.
+    Returns the number of bookings indexed.
+    """
+    bookings = Booking.objects.order_by('id').values_list(
+        'id', 'restaurant_id', *Booking.SEARCH_FIELDS)
+    last_id = 0
+    total = 0
+    while True:
+        batch = list(bookings.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return total
+        index_bookings(batch)
+        last_id = batch[-1][0]
+        total += len(batch)
+
+
+def score(matchers, targets):
+    """
+    Return how closely the search words, given as a SequenceMatcher of
+    each, match the words of a booking, from 0 to 1. Each search word
+    is given its best match: 1 when it is part of a booking word, or
+    otherwise how similar the two are.
+    """
+    if not targets:
+        return 0
+    total = 0
+    for matcher in matchers:
+        word = matcher.b
+        best = 0
+        for target in targets:
+            if word in target:
+                best = 1
+                break
+            # The quick ratios are upper bounds of the full ratio, so
+            # most words are passed over without comparing them in full.
+            matcher.set_seq1(target)
+            if (matcher.real_quick_ratio() > best and
+                    matcher.quick_ratio() > best):
+                best = max(best, matcher.ratio())
+        total += best
+    return total / len(matchers)
+
+
+def search_grams(words):
+    """
+    Return the pieces of the search words. A part of a word, such as
+    the middle of a phone number, shares every piece with the word but
+    those marking its start and end.
+    """
+    return set().union(*(word_grams(word) for word in words))
+
+
+def restaurant_grams(restaurant=None):
+    """
+    Return the indexed pieces of a restaurant's bookings, or of every
+    restaurant's, so that the index is read by restaurant either way.
+    """
+    if restaurant is not None:
+        return BookingSearchGram.objects.filter(restaurant=restaurant)
+    return BookingSearchGram.objects.filter(
+        Q(restaurant__in=Restaurant.objects.all()) |
+        Q(restaurant__isnull=True))
+
+
+def candidates(grams, restaurant=None, share=MIN_GRAM_SHARE):
+    """
+    Return the ids of the bookings, of a restaurant when given, sharing
+    at least a share of the pieces of a search, with the number they
+    share.
+    """
+    return restaurant_grams(restaurant).filter(gram__in=grams).values(
+        'booking_id').annotate(shared=Count('id')).filter(
+            shared__gte=max(1, math.floor(len(grams) * share)))
+
+
+def matching_ids(query, restaurant=None):
+    """
+    Return a subquery of the ids of every booking, of a restaurant when
+    given, sharing LIST_GRAM_SHARE of the pieces of the search, for
+    filtering a queryset.
+    """
+    grams = search_grams(search_words(query))
+    if not grams:
+        return Booking.objects.none().values('id')
+    return candidates(grams, restaurant, LIST_GRAM_SHARE).values(
+        'booking_id')
+
+
+def exact_matches(query, bookings, limit):
+    """
+    Return up to limit of the newest SCAN_BOOKINGS of the bookings with
+    every word of the search, as typed, in their name, email or phone
+    number, and whether those were all of the bookings.
+    """
+    condition = Q()
+    for word in query.split():
+        condition &= (
+            Q(name__icontains=word) | Q(email__icontains=word) |
+            Q(phone_number__icontains=word))
+    older = list(bookings.order_by('-id').values_list('id', flat=True)[
+        SCAN_BOOKINGS:SCAN_BOOKINGS + 1])
+    if older:
+        bookings = bookings.filter(id__gt=older[0])
+    return list(bookings.filter(condition).order_by('-id')[:limit]), not older
+
+
+def search_bookings(query, restaurant=None, limit=20):
+    """
+    Return up to limit bookings, of a restaurant when given, whose name,
+    email or phone number best match the search, with their scores.
+    Bookings with every word of the search score 1 and are returned on
+    their own, and the closest bookings are only returned when none do.
+
+    The newest bookings are scanned for the words as typed first, which
+    answers the search when they hold enough matches, or when they are
+    every booking and hold any. Otherwise only the bookings sharing the
+    most pieces with the search are read and scored.
+    """
+    words = search_words(query)
+    grams = search_grams(words)
+    if not grams:
+        return []
+
+    bookings = Booking.objects.only(
+        'id', 'date', 'time', 'party_size', *Booking.SEARCH_FIELDS)
+    if restaurant is not None:
+        bookings = bookings.filter(restaurant=restaurant)
+    exact, scanned_all = exact_matches(query, bookings, limit)
+    if len(exact) == limit or exact and scanned_all:
+        exact.sort(key=lambda booking: (booking.date, booking.id))
+        return [(booking, 1.0) for booking in exact]
+
+    candidate_ids = [
+        row['booking_id'] for row in candidates(grams, restaurant).order_by(
+            '-shared')[:MAX_CANDIDATES]]
+
+    # Candidates are scored from their rows, and only the bookings
+    # returned are loaded.
+    matchers = [SequenceMatcher(None, b=word) for word in words]
+    scores = []
+    for booking_id, day, *details in Booking.objects.filter(
+            id__in=candidate_ids).values_list(
+                'id', 'date', *Booking.SEARCH_FIELDS):
+        booking_score = score(matchers, booking_words(*details))
+        if booking_score >= MIN_SCORE:
+            scores.append((-round(booking_score, 3), day, booking_id))
+    scores.sort()
+    if scores and scores[0][0] == -1:
+        scores = [result for result in scores if result[0] == -1]
+    found = bookings.in_bulk(
+        [booking_id for _, _, booking_id in scores[:limit]])
+    return [(found[booking_id], -booking_score)
+            for booking_score, _, booking_id in scores[:limit]]
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, **kwargs):
+    """
+    Index the name, email and phone number of a booking when they or
+    its restaurant are new or changed.
+    """
+    if (getattr(instance, 'saved_details', None) != instance.details or
+            getattr(instance, 'saved_restaurant_id', None) !=
+            instance.restaurant_id):
+        index_bookings([instance])
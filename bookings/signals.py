@@ -0,0 +1,62 @@
+""" Signals sent when bookings change. """
+import datetime
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import Signal, receiver
+
+from .models import Booking
+
+# Sent with the date, start and end time of a slot in which tables have
+# been released by a booking being cancelled, moved or resized, and the
+# id of the restaurant the tables belong to.
+tables_freed = Signal()
+
+
+def send_tables_freed(freed_date, start, end, restaurant=None):
+    """
+    Send the tables freed signal once the change is committed so that
+    receivers checking availability see the released tables.
+    """
+    transaction.on_commit(lambda: tables_freed.send(
+        sender=Booking, date=freed_date, start=start, end=end,
+        restaurant=restaurant))
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, **kwargs):
+    """
+    Release the tables of the previous slot when a booking is moved
+    or the party size changes.
+    """
+    # The saved slot is updated once the save has finished.
+    previous = getattr(instance, 'saved_slot', None)
+    if not created and previous and previous != instance.slot:
+        freed_date, start, end, _ = previous
+        send_tables_freed(
+            freed_date, start, end, instance.restaurant_id)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    """
+    Release the tables of a cancelled booking. Past bookings being
+    archived do not free any tables that can still be booked.
+    """
+    if instance.date >= datetime.date.today():
+        send_tables_freed(
+            instance.date, instance.time, instance.end_time,
+            instance.restaurant_id)
+
+
+@receiver(m2m_changed, sender=Booking.tables.through)
+def booking_tables_changed(sender, instance, action, reverse, **kwargs):
+    """
+    Release tables removed from a booking which has not been moved.
+    Moved bookings are handled when the booking is saved.
+    """
+    if reverse or action not in ('post_remove', 'post_clear'):
+        return
+    if getattr(instance, 'saved_slot', None) == instance.slot:
+        send_tables_freed(
+            instance.date, instance.time, instance.end_time,
+            instance.restaurant_id)
@@ -0,0 +1,166 @@
+""" Cache the booking slots with tables free for each party size. """
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from restaurant.models import Restaurant, Table
+from .models import Booking
+from .check_availability import create_booking_slots, largest_parties
+from .durations import booking_duration
+from .occupancy import booked_intervals, default_backend, duration_slots, \
+    held_days, load_occupancy, slot_index, table_adjacency, table_bookings
+
+# Changed whenever tables or opening times change, which makes every
+# cached day out of date at once.
+GENERATION_KEY = 'slots-generation'
+
+
+def generation():
+    """ Return the current generation of the cached days. """
+    current = cache.get(GENERATION_KEY)
+    if current is None:
+        # Another worker may have started a generation at the same time.
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        current = cache.get(GENERATION_KEY)
+    return current
+
+
+def day_key(restaurant_id, day, current=None):
+    """ Return the cache key of a restaurant's slots on a day. """
+    return f'slots:{current or generation()}:{restaurant_id}:{day}'
+
+
+def day_slots(restaurant, occupancy):
+    """
+    Return the booking slots with tables free for each party size from
+    a day's occupancy. Each length of booking is checked once for every
+    party size, with the tables the table search would combine.
+    """
+    max_party = {}
+    slots = {}
+    for party_size, _ in Booking.PARTY_SIZE_CHOICES:
+        slots[party_size] = []
+        for slot, label in create_booking_slots(
+                restaurant.opening_time, restaurant.closing_time):
+            length = duration_slots(booking_duration(party_size, slot))
+            if length not in max_party:
+                max_party[length] = largest_parties(occupancy, length)
+            if max_party[length][slot_index(slot)] >= party_size:
+                slots[party_size].append(label)
+    return slots
+
+
+def available_slots(restaurant, day, party_size):
+    """
+    Return the booking slots on a date with tables for the party size,
+    from the cache when the day's slots have been worked out already.
+    """
+    key = day_key(getattr(restaurant, 'id', None), day)
+    slots = cache.get(key)
+    if slots is None:
+        slots = day_slots(restaurant, load_occupancy(
+            day, restaurant=restaurant))
+        cache.set(key, slots, settings.SLOT_CACHE_TIMEOUT)
+    return slots[party_size]
+
+
+def load_days(restaurant, days):
+    """
+    Return the occupancy of each of the days at a restaurant, loading
+    the tables, their floor plan and the bookings of every day with one
+    query each.
+    """
+    tables = list(Table.objects.filter(restaurant=restaurant).order_by(
+        'id').values_list('id', 'size'))
+    adjacency = table_adjacency([table_id for table_id, _ in tables])
+    intervals = booked_intervals(
+        Booking.tables.through.objects.filter(
+            table_bookings(days), booking__restaurant=restaurant)
+        .values_list(
+            'booking__date', 'table_id', 'booking__time',
+            'booking__end_time'))
+    backend = default_backend()
+    occupancies = {day: backend(tables, intervals[day]) for day in days}
+    for occupancy in occupancies.values():
+        occupancy.adjacency = adjacency
+    return occupancies
+
+
+def warm_days(restaurant, days):
+    """
+    Work out and cache a restaurant's slots on each of the days.
+    Returns the number of days cached.
+    """
+    current = generation()
+    cache.set_many({
+        day_key(restaurant.id, day, current): day_slots(restaurant, occupancy)
+        for day, occupancy in load_days(restaurant, days).items()
+    }, settings.SLOT_CACHE_TIMEOUT)
+    return len(days)
+
+
+def forget_day(restaurant_id, day):
+    """
+    Remove a restaurant's cached slots on a day now and again once the
+    current transaction commits, in case they were read in between.
+    """
+    key = day_key(restaurant_id, day)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def forget_booking(restaurant_id, slot):
+    """
+    Forget a restaurant's cached slots on the days a booking's slot
+    holds its tables, which includes the day after when it runs past
+    midnight.
+    """
+    for day in held_days(*slot[:3]):
+        forget_day(restaurant_id, day)
+
+
+def forget_all():
+    """ Make every cached day out of date. """
+    cache.set(GENERATION_KEY, uuid.uuid4().hex, None)
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, **kwargs):
+    """ Forget the slots of a booking's days and the days it moved from. """
+    forget_booking(instance.restaurant_id, instance.slot)
+    previous = getattr(instance, 'saved_slot', None)
+    if previous and previous[:3] != instance.slot[:3]:
+        forget_booking(instance.restaurant_id, previous)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    """ Forget the slots of a cancelled booking's days. """
+    forget_booking(instance.restaurant_id, instance.slot)
+
+
+@receiver(m2m_changed, sender=Booking.tables.through)
+def booking_tables_changed(sender, instance, action, reverse, **kwargs):
+    """ Forget the slots of a day when its bookings change tables. """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        forget_all()
+    else:
+        forget_booking(instance.restaurant_id, instance.slot)
+
+
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+@receiver(m2m_changed, sender=Table.adjacent.through)
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def floor_changed(sender, **kwargs):
+    """
+    Forget every cached day when tables, the floor plan or opening
+    times change.
+    """
+    forget_all()
@@ -0,0 +1,62 @@
+""" Template filters for rendering the booking forms. """
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from crispy_forms.templatetags.crispy_forms_filters import as_crispy_field
+from django import forms, template
+from django.conf import settings
+
+register = template.Library()
+
+# The most rendered fields kept by each process.
+RENDERED_FIELDS_LIMIT = 1024
+# Widgets whose values are picked from a small set rather than typed,
+# so their rendering is worth keeping for each value.
+CHOSEN_VALUE_WIDGETS = (forms.Select, forms.DateInput, forms.NumberInput)
+
+rendered_fields = OrderedDict()
+rendered_fields_lock = Lock()
+
+
+def field_key(bound_field):
+    """
+    Return a key for everything the rendering of a field depends on:
+    its name, label, widget and choices, which follow the restaurant
+    settings, and its value. Fields typed by customers are only given
+    a key while empty so their details are never kept.
+    """
+    field = bound_field.field
+    widget = field.widget
+    value = bound_field.value()
+    if value not in (None, '') and not isinstance(
+            widget, CHOSEN_VALUE_WIDGETS):
+        return None
+    parts = (
+        settings.CRISPY_TEMPLATE_PACK, bound_field.html_name,
+        bound_field.auto_id, str(bound_field.label), str(field.help_text),
+        field.required, type(widget).__name__, sorted(widget.attrs.items()),
+        list(getattr(widget, 'choices', ())), value)
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+@register.filter
+def as_cached_crispy_field(bound_field):
+    """
+    Render a field like as_crispy_field, reusing the HTML of an earlier
+    rendering with the same settings and value. Fields with errors are
+    always rendered afresh.
+    """
+    key = None if bound_field.errors else field_key(bound_field)
+    if key is None:
+        return as_crispy_field(bound_field)
+    with rendered_fields_lock:
+        html = rendered_fields.get(key)
+        if html is not None:
+            rendered_fields.move_to_end(key)
+            return html
+    html = as_crispy_field(bound_field)
+    with rendered_fields_lock:
+        rendered_fields[key] = html
+        if len(rendered_fields) > RENDERED_FIELDS_LIMIT:
+            rendered_fields.popitem(last=False)
+    return html
@@ -0,0 +1,65 @@
+""" Testcases for the bookings admin. """
+import datetime
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from restaurant.models import Restaurant, Table
+from .admin import EstimatedCountPaginator
+from .models import Booking
+
+
+class TestBookingAdmin(TestCase):
+    """ Tests for the booking list in the admin. """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
+        self.table = Table.objects.create(restaurant=self.restaurant, size=4)
+        self.owner = User.objects.create_superuser(
+            'owner', 'owner@email.com', 'ownerpassword')
+        for day in range(3):
+            booking = Booking.objects.create(
+                restaurant=self.restaurant, customer=self.owner,
+                date=datetime.date(2030, 1, 4 + day),
+                time=datetime.time(18, 00), party_size=4, name='Test Name',
+                email='test@email.com', phone_number='01234567890')
+            booking.tables.add(self.table)
+        self.client.login(username='owner', password='ownerpassword')
+
+    # The session and user come from a shared cache, as in production.
+    @override_settings(
+        SHARED_CACHE=True,
+        SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_changelist_browses_by_date_without_full_count(self):
+        """
+        Test the booking list offers the date hierarchy, leaves out the
+        full count and makes the same queries however many bookings.
+        """
+        response = self.client.get(
+            '/admin/bookings/booking/', {'date__year': 2030})
+        self.assertContains(response, 'date__month=1')
+        self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertIsNone(response.context['cl'].full_result_count)
+        self.assertEqual(response.context['cl'].paginator.count, 3)
+
+        with self.assertNumQueries(5):
+            self.client.get('/admin/bookings/booking/')
+        Booking.objects.create(
+            restaurant=self.restaurant, customer=User.objects.create_user(
+                'john', 'john@email.com', 'johnpassword'),
+            date=datetime.date(2030, 1, 4), time=datetime.time(20, 00),
+            party_size=2, name='Test Name', email='test@email.com',
+            phone_number='01234567890')
+        with self.assertNumQueries(5):
+            self.client.get('/admin/bookings/booking/')
+
+    def test_paginator_counts_exactly_without_estimates(self):
+        """ Test the paginator counts rows when it cannot estimate them. """
+        paginator = EstimatedCountPaginator(Booking.objects.all(), 100)
+        self.assertEqual(paginator.count, 3)
+
+    def test_deleting_from_changelist(self):
+        """ Test bookings loaded for the list can still be deleted. """
+        booking = Booking.objects.first()
+        response = self.client.post('/admin/bookings/booking/', {
+            'action': 'delete_selected', '_selected_action': [booking.id],
+            'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Booking.objects.filter(id=booking.id).exists())
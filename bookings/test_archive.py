@@ -0,0 +1,61 @@
+""" Testcases for archiving past bookings. """
+import datetime
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from restaurant.models import Restaurant, Table
+from .models import Booking, ArchivedBooking
+from .archive import archive_bookings, booking_history
+
+
+class TestArchive(TestCase):
+    """ Tests for the booking archive. """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
+        self.table1 = Table.objects.create(restaurant=self.restaurant, size=4)
+        self.table2 = Table.objects.create(restaurant=self.restaurant, size=2)
+        self.today = datetime.date.today()
+        self.old = []
+        for days in (400, 200, 100):
+            booking = Booking.objects.create(
+                date=self.today - datetime.timedelta(days=days),
+                time=datetime.time(18, 00), party_size=6,
+                name=f'{days} days ago', email='test@email.com',
+                phone_number='01234567890')
+            booking.tables.set([self.table1, self.table2])
+            self.old.append(booking)
+        self.future = Booking.objects.create(
+            date=self.today, time=datetime.time(18, 00), party_size=2,
+            name='Today', email='test@email.com', phone_number='01234567890')
+        self.future.tables.add(self.table2)
+
+    def test_old_bookings_archived_with_tables_in_batches(self):
+        """
+        Test bookings before the cutoff are moved to the archive with
+        their tables and the recent bookings are left in place.
+        """
+        cutoff = self.today - datetime.timedelta(days=90)
+        self.assertEqual(archive_bookings(cutoff, batch_size=2), 3)
+
+        self.assertEqual(list(Booking.objects.all()), [self.future])
+        archived = ArchivedBooking.objects.get(original_id=self.old[0].id)
+        self.assertEqual(archived.name, '400 days ago')
+        self.assertEqual(
+            set(archived.tables.all()), {self.table1, self.table2})
+
+    def test_history_includes_live_and_archived_bookings(self):
+        """ Test the history reads from both tables in date order. """
+        archive_bookings(self.today - datetime.timedelta(days=150))
+        history = list(booking_history(
+            self.today - datetime.timedelta(days=250), self.today))
+        self.assertEqual(
+            [(row['name'], row['is_archived']) for row in history],
+            [('200 days ago', True), ('100 days ago', False),
+             ('Today', False)])
+        self.assertEqual(history[0]['booking_id'], self.old[1].id)
+
+    def test_archive_command_reports_count(self):
+        """ Test the archive management command. """
+        out = StringIO()
+        call_command('archive_bookings', days=150, stdout=out)
+        self.assertIn('Archived 2 bookings', out.getvalue())
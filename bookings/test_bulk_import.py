@@ -0,0 +1,167 @@
+""" Testcases for the bulk booking import. """
+import datetime
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import Max
+from django.db.models.signals import post_save
+from django.test import TestCase
+from restaurant.models import Restaurant, Table
+from .models import Booking, BookingEvent, BookingSearchGram, SlotRollup
+from .bulk_import import import_bookings
+
+
+def make_row(day, time, party_size, name='Test Name'):
+    """ Return an import row for a booking. """
+    return {
+        'date': day, 'time': time, 'party_size': party_size,
+        'name': name, 'email': 'test@email.com',
+        'phone_number': '01234567890'}
+
+
+class TestBulkImport(TestCase):
+    """ Tests for importing bookings in bulk. """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
+        self.table1 = Table.objects.create(restaurant=self.restaurant, size=4)
+        self.table2 = Table.objects.create(restaurant=self.restaurant, size=2)
+        self.existing = Booking.objects.create(
+            restaurant=self.restaurant,
+            date=datetime.date(2030, 1, 4), time=datetime.time(18, 00),
+            party_size=4, name='Test Name', email='test@email.com',
+            phone_number='01234567890')
+        self.existing.tables.add(self.table1)
+
+    def test_rows_checked_in_time_order_against_saved_bookings(self):
+        """
+        Test that each day's rows are allocated in time order and that
+        rows without a free table are rejected.
+        """
+        rows = [
+            make_row('2030-01-04', '18:45', 2, 'Late'),
+            make_row('2030-01-04', '17:00', 2, 'Early'),
+            make_row('2030-01-04', '18:30', 4, 'Full'),
+            make_row('2030-01-05', '18:00', 6, 'Next Day'),
+            make_row('not a date', '18:00', 2, 'Invalid'),
+        ]
+        report = import_bookings(rows)
+
+        statuses = [row['status'] for row in report['rows']]
+        self.assertEqual(
+            statuses,
+            ['rejected', 'accepted', 'rejected', 'accepted', 'rejected'])
+        self.assertIn('date', report['rows'][4]['errors'])
+        self.assertEqual(report['accepted'], 2)
+
+        early = Booking.objects.get(name='Early')
+        self.assertEqual(report['rows'][1]['booking_id'], early.id)
+        self.assertEqual(list(early.tables.all()), [self.table2])
+        self.assertEqual(early.end_time, datetime.time(19, 00))
+        next_day = Booking.objects.get(name='Next Day')
+        self.assertEqual(next_day.tables.count(), 2)
+
+    def test_past_dates_rejected(self):
+        """ Test bookings can only be imported for today or later. """
+        today = datetime.date.today()
+        rows = [
+            make_row((today - datetime.timedelta(days=1)).isoformat(),
+                     '12:00', 2, 'Yesterday'),
+            make_row(today.isoformat(), '12:00', 2, 'Today'),
+        ]
+        report = import_bookings(rows, restaurant=self.restaurant)
+        self.assertEqual(
+            [row['status'] for row in report['rows']],
+            ['rejected', 'accepted'])
+        self.assertIn('date', report['rows'][0]['errors'])
+        self.assertFalse(Booking.objects.filter(name='Yesterday').exists())
+
+    def test_day_saved_in_bulk_without_signals(self):
+        """
+        Test a day's bookings are created in bulk with their ids and
+        tables, and that the search index, dashboard events and rollups
+        are brought up to date without a signal per booking.
+        """
+        saved = []
+
+        def booking_saved(sender, instance, **kwargs):
+            saved.append(instance)
+        post_save.connect(booking_saved, sender=Booking)
+        self.addCleanup(post_save.disconnect, booking_saved, sender=Booking)
+
+        rows = [make_row('2030-01-05', f'{hour}:00', 2, f'Name {hour}')
+                for hour in range(12, 18, 2)]
+        with self.captureOnCommitCallbacks(execute=True):
+            report = import_bookings(rows, restaurant=self.restaurant)
+        self.assertEqual(report['accepted'], 3)
+        self.assertEqual(saved, [])
+
+        for row in report['rows']:
+            booking = Booking.objects.get(id=row['booking_id'])
+            self.assertEqual(booking.restaurant, self.restaurant)
+            self.assertEqual(list(booking.tables.all()), [self.table2])
+        booking_ids = {row['booking_id'] for row in report['rows']}
+        self.assertEqual(
+            set(BookingSearchGram.objects.exclude(
+                booking=self.existing).values_list('booking_id', flat=True)),
+            booking_ids)
+        self.assertEqual(
+            set(BookingEvent.objects.filter(
+                kind=BookingEvent.CREATED).values_list(
+                    'booking_id', flat=True)),
+            booking_ids)
+        self.assertEqual(
+            SlotRollup.objects.filter(
+                restaurant=self.restaurant,
+                date=datetime.date(2030, 1, 5)).aggregate(
+                    Max('parties'))['parties__max'],
+            1)
+
+    def test_emails_sent_over_one_connection_when_requested(self):
+        """ Test confirmation emails are optional. """
+        rows = [make_row('2030-01-05', '12:00', 2),
+                make_row('2030-01-05', '15:00', 2)]
+        report = import_bookings(rows)
+        self.assertEqual(report['emails_sent'], 0)
+        self.assertEqual(len(mail.outbox), 0)
+
+        rows = [make_row('2030-01-06', '12:00', 2),
+                make_row('2030-01-06', '15:00', 2)]
+        report = import_bookings(rows, send_emails=True)
+        self.assertEqual(report['emails_sent'], 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_import_view_returns_report(self):
+        """ Test the owner can upload a file of bookings. """
+        User.objects.create_superuser(
+            'admin', 'admin@email.com', 'adminpassword')
+        self.client.login(username='admin', password='adminpassword')
+        upload = SimpleUploadedFile(
+            'bookings.csv',
+            b'date,time,party_size,name,email,phone_number\n'
+            b'2030-01-07,18:00,2,Phone,test@email.com,01234567890\n')
+        response = self.client.post(
+            '/bookings/import_bookings', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['accepted'], 1)
+        self.assertTrue(Booking.objects.filter(name='Phone').exists())
+
+    def test_jsonl_lines_which_are_not_objects_rejected(self):
+        """ Test lines holding other JSON values are rejected per line. """
+        User.objects.create_superuser(
+            'admin', 'admin@email.com', 'adminpassword')
+        self.client.login(username='admin', password='adminpassword')
+        upload = SimpleUploadedFile(
+            'bookings.jsonl',
+            b'[1, 2]\n"x"\n'
+            b'{"date": "2030-01-07", "time": "18:00", "party_size": 2, '
+            b'"name": "Phone", "email": "test@email.com", '
+            b'"phone_number": "01234567890"}\n')
+        response = self.client.post(
+            '/bookings/import_bookings', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['accepted'], 1)
+        self.assertEqual(
+            [row['status'] for row in report['rows']],
+            ['rejected', 'rejected', 'accepted'])
+        self.assertIn('__all__', report['rows'][0]['errors'])
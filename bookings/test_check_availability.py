@@ -3,13 +3,15 @@ import datetime
 from django.test import TestCase
 from restaurant.models import Restaurant, Table
 from .models import Booking
-from .check_availability import find_tables
+from .check_availability import combine_tables, find_tables, \
+    select_single_table, TableSnapshot
+from .test_occupancy import python_occupancy
 
 
 class TestCheckAvailability(TestCase):
     """ Tests for the available table searches. """
     def setUp(self):
-        self.restaurant = Restaurant.objects.create(name='Il oro d'Italia')
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
         self.table1 = Table.objects.create(restaurant=self.restaurant, size=4)
         self.table2 = Table.objects.create(restaurant=self.restaurant, size=4)
         self.table3 = Table.objects.create(restaurant=self.restaurant, size=2)
@@ -163,3 +165,152 @@ class TestCheckAvailability(TestCase):
             datetime.time(21, 00), 8, booking1.id)
         self.assertIsNotNone(selected_table)
 
+    def test_search_returns_table_instances(self):
+        """
+        Test the search runs on table snapshots and only the chosen
+        tables are loaded as Table instances, in the order chosen.
+        """
+        selected_tables = find_tables(
+            datetime.date.today(), datetime.time(18, 00),
+            datetime.time(20, 00), 6, '')
+        self.assertEqual(selected_tables, [self.table1, self.table3])
+
+        snapshots = [
+            TableSnapshot(table.id, table.size)
+            for table in (self.table1, self.table3, self.table4)]
+        self.assertIs(select_single_table(snapshots, 2), snapshots[1])
+        self.assertEqual(
+            select_single_table(snapshots, 6), snapshots[:2])
+
+    def test_combined_tables_are_the_first_of_each_size(self):
+        """
+        Test that combining tables prefers an exact fit with the fewest
+        tables, then the least leftover spaces, and takes the first
+        tables in order with the chosen sizes.
+        """
+        snapshots = [
+            TableSnapshot(table_id, size)
+            for table_id, size in enumerate((2, 4, 2, 4, 2))]
+        self.assertEqual(
+            combine_tables(snapshots, 7), [snapshots[1], snapshots[3]])
+        self.assertEqual(
+            combine_tables(snapshots, 10),
+            [snapshots[0], snapshots[1], snapshots[3]])
+        self.assertEqual(
+            combine_tables(snapshots, 6), [snapshots[0], snapshots[1]])
+        self.assertIsNone(combine_tables(snapshots, 15))
+
+    def test_only_neighbouring_tables_combined_on_floor_plan(self):
+        """
+        Test that once a floor plan is set only tables next to each
+        other are combined, and tables with no neighbours only seat
+        parties on their own.
+        """
+        self.table1.adjacent.add(self.table3)
+        self.table3.adjacent.add(self.table4)
+        self.table4.adjacent.add(self.table2)
+
+        # Tables 1 and 2 would fit 8 exactly but are apart.
+        self.assertEqual(
+            find_tables(
+                datetime.date.today(), datetime.time(18, 00),
+                datetime.time(20, 00), 8, ''),
+            [self.table1, self.table3, self.table4])
+        self.assertEqual(
+            find_tables(
+                datetime.date.today(), datetime.time(18, 00),
+                datetime.time(20, 00), 5, ''),
+            [self.table1, self.table3])
+
+        booking = Booking.objects.create(
+            date=datetime.date.today(), time=datetime.time(18, 00),
+            party_size=2, name='Test Name', email='test@email.com',
+            phone_number='01234567890')
+        booking.tables.add(self.table4)
+        self.assertIsNone(find_tables(
+            datetime.date.today(), datetime.time(18, 00),
+            datetime.time(20, 00), 8, ''))
+
+        # A booking made smaller keeps the tables of its own still joined.
+        booking = Booking.objects.create(
+            date=datetime.date.today(), time=datetime.time(21, 00),
+            party_size=8, name='Test Name', email='test@email.com',
+            phone_number='01234567890')
+        booking.tables.set([self.table3, self.table4, self.table2])
+        self.assertEqual(
+            find_tables(
+                datetime.date.today(), datetime.time(21, 00),
+                datetime.time(23, 00), 6, booking.id),
+            [self.table2, self.table4])
+
+    def test_floor_plan_search_matches_brute_force_when_all_adjacent(self):
+        """
+        Test the neighbouring table search chooses the same tables as
+        combining any tables when every table is next to every other.
+        """
+        snapshots = [
+            TableSnapshot(table_id, size)
+            for table_id, size in enumerate((4, 2, 4, 2, 2))]
+        adjacency = {
+            snapshot.id: {other.id for other in snapshots} - {snapshot.id}
+            for snapshot in snapshots}
+        for party_size in range(5, 12):
+            self.assertEqual(
+                select_single_table(snapshots, party_size, adjacency),
+                select_single_table(snapshots, party_size),
+                f'Party of {party_size}')
+
+    def test_updated_booking_keeps_tables_which_still_suit_it(self):
+        """
+        Test a booking being updated keeps the fewest seats of its tables
+        which seat the party, has tables added to those still free when
+        they are too few, and is only given new tables when none of its
+        own are free.
+        """
+        booking = Booking.objects.create(
+            date=datetime.date.today(), time=datetime.time(18, 00),
+            party_size=6, name='Test Name', email='test@email.com',
+            phone_number='01234567890')
+        booking.tables.set([self.table2, self.table5])
+
+        # The best new tables for 5 would be table1 and table3.
+        self.assertEqual(
+            find_tables(
+                datetime.date.today(), datetime.time(19, 00),
+                datetime.time(21, 00), 5, booking.id),
+            [self.table2, self.table5])
+        # Table2 alone seats a party of 4.
+        self.assertEqual(
+            find_tables(
+                datetime.date.today(), datetime.time(19, 00),
+                datetime.time(21, 00), 4, booking.id),
+            self.table2)
+        self.assertEqual(
+            find_tables(
+                datetime.date.today(), datetime.time(19, 00),
+                datetime.time(21, 00), 2, booking.id),
+            self.table5)
+
+        other = Booking.objects.create(
+            date=datetime.date.today(), time=datetime.time(21, 00),
+            party_size=2, name='Test Name', email='test@email.com',
+            phone_number='01234567890')
+        other.tables.add(self.table5)
+        # Table2 is kept, with the smallest free table added.
+        self.assertEqual(
+            find_tables(
+                datetime.date.today(), datetime.time(20, 00),
+                datetime.time(22, 00), 6, booking.id),
+            [self.table2, self.table3])
+
+        other.tables.add(self.table2)
+        self.assertEqual(
+            find_tables(
+                datetime.date.today(), datetime.time(20, 00),
+                datetime.time(22, 00), 6, booking.id),
+            [self.table1, self.table3])
+
+
+@python_occupancy
+class TestCheckAvailabilityWithoutNumpy(TestCheckAvailability):
+    """ The table search tests with the pure Python occupancy. """
@@ -0,0 +1,65 @@
+""" Testcases for the booking duration policy. """
+import datetime
+from django.test import TestCase, override_settings
+from restaurant.models import Restaurant, Table
+from .models import Booking
+from .check_availability import find_tables
+from .durations import booking_duration, longest_duration
+
+RULES = [
+    {'until': '15:00', 'minutes': 90},
+    {'min_party': 7, 'minutes': 180},
+]
+
+
+@override_settings(BOOKING_DURATION_RULES=RULES)
+class TestDurations(TestCase):
+    """ Tests for bookings of different lengths. """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
+        self.table = Table.objects.create(restaurant=self.restaurant, size=4)
+
+    def book(self, start, party_size):
+        """ Book the table for a party at the start time. """
+        booking = Booking.objects.create(
+            restaurant=self.restaurant, date=datetime.date(2030, 1, 4),
+            time=start, party_size=party_size, name='Test Name',
+            email='test@email.com', phone_number='01234567890')
+        booking.tables.add(self.table)
+        return booking
+
+    def test_first_matching_rule_used(self):
+        """ Test the duration depends on the time and party size. """
+        self.assertEqual(
+            booking_duration(8, datetime.time(12, 00)),
+            datetime.timedelta(minutes=90))
+        self.assertEqual(
+            booking_duration(8, datetime.time(19, 00)),
+            datetime.timedelta(minutes=180))
+        self.assertEqual(
+            booking_duration(2, datetime.time(19, 00)),
+            datetime.timedelta(minutes=120))
+        self.assertEqual(longest_duration(), datetime.timedelta(minutes=180))
+
+    def test_booking_end_time_uses_policy(self):
+        """ Test the saved end time of a lunch booking. """
+        booking = self.book(datetime.time(12, 00), 4)
+        self.assertEqual(booking.end_time, datetime.time(13, 30))
+
+    def test_shorter_booking_inside_search_blocks_table(self):
+        """
+        Test a lunch booking starting and ending within a longer
+        booking's time stops the table from being offered.
+        """
+        self.book(datetime.time(12, 30), 4)
+        search = (
+            datetime.date(2030, 1, 4), datetime.time(12, 00),
+            datetime.time(15, 00))
+        self.assertIsNone(find_tables(*search, 4, '', self.restaurant))
+
+        # The table is free once the lunch has finished.
+        self.assertEqual(
+            find_tables(
+                datetime.date(2030, 1, 4), datetime.time(14, 00),
+                datetime.time(16, 00), 4, '', self.restaurant),
+            self.table)
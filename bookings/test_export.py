@@ -0,0 +1,118 @@
+""" Testcases for the bookings export. """
+import csv
+import datetime
+import json
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from restaurant.models import Restaurant, Table
+from .archive import archive_bookings
+from .models import Booking
+from .export import generate_export
+
+
+class TestExport(TestCase):
+    """ Tests for the streaming booking export. """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
+        self.table1 = Table.objects.create(restaurant=self.restaurant, size=4)
+        self.table2 = Table.objects.create(restaurant=self.restaurant, size=2)
+        self.user = User.objects.create_user(
+            'john', 'john@email.com', 'johnpassword')
+        for day in range(1, 4):
+            booking = Booking.objects.create(
+                restaurant=self.restaurant,
+                date=datetime.date(2022, 5, day), time=datetime.time(18, 00),
+                party_size=6, name=f'Name {day}', email='test@email.com',
+                phone_number='01234567890', customer=self.user)
+            booking.tables.set([self.table1, self.table2])
+
+    def test_csv_export_includes_tables_and_customer(self):
+        """ Test the CSV export contains the bookings in the range. """
+        lines = generate_export(
+            datetime.date(2022, 5, 1), datetime.date(2022, 5, 2), 'csv',
+            chunk_size=1)
+        rows = list(csv.DictReader(''.join(lines).splitlines()))
+        self.assertEqual([row['name'] for row in rows], ['Name 1', 'Name 2'])
+        self.assertEqual(
+            rows[0]['tables'],
+            f'{self.table1.id}:4 {self.table2.id}:2')
+        self.assertEqual(rows[0]['customer'], 'john')
+        self.assertEqual(rows[0]['restaurant'], self.restaurant.slug)
+
+    def test_jsonl_export_prefetches_tables_per_chunk(self):
+        """
+        Test the JSON Lines export and that tables are loaded with
+        one query per chunk rather than one per booking.
+        """
+        # The archive, then bookings and customers with one tables
+        # query per chunk of 2.
+        with self.assertNumQueries(4):
+            lines = list(generate_export(
+                datetime.date(2022, 5, 1), datetime.date(2022, 5, 3),
+                'jsonl', chunk_size=2))
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(
+            rows[2]['tables'],
+            [{'id': self.table1.id, 'size': 4},
+             {'id': self.table2.id, 'size': 2}])
+
+    def test_live_and_archived_bookings_merged_in_date_order(self):
+        """
+        Test a live booking older than the archived bookings is
+        exported in date order rather than after the archive.
+        """
+        archive_bookings(datetime.date(2022, 5, 3))
+        Booking.objects.create(
+            restaurant=self.restaurant, date=datetime.date(2022, 4, 30),
+            time=datetime.time(18, 00), party_size=2, name='Imported Name',
+            email='test@email.com', phone_number='01234567890')
+        lines = generate_export(
+            datetime.date(2022, 4, 1), datetime.date(2022, 5, 31), 'jsonl',
+            chunk_size=1)
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [row['name'] for row in rows],
+            ['Imported Name', 'Name 1', 'Name 2', 'Name 3'])
+        self.assertEqual(
+            [row['date'] for row in rows],
+            ['2022-04-30', '2022-05-01', '2022-05-02', '2022-05-03'])
+
+    def test_export_view_streams_for_superuser_only(self):
+        """
+        Test the export view streams a download of the restaurant's
+        bookings to the owner.
+        """
+        other = Restaurant.objects.create(name='Other Restaurant')
+        Booking.objects.create(
+            restaurant=other, date=datetime.date(2022, 5, 1),
+            time=datetime.time(18, 00), party_size=2, name='Other Name',
+            email='test@email.com', phone_number='01234567890')
+        response = self.client.get('/bookings/export_bookings')
+        self.assertEqual(response.status_code, 302)
+
+        User.objects.create_superuser(
+            'admin', 'admin@email.com', 'adminpassword')
+        self.client.login(username='admin', password='adminpassword')
+        response = self.client.get(
+            '/bookings/export_bookings',
+            {'start': '2022-05-01', 'end': '2022-05-31', 'format': 'jsonl'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [row['name'] for row in rows], ['Name 1', 'Name 2', 'Name 3'])
+
+        response = self.client.get(
+            '/bookings/export_bookings', {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_command_writes_to_stdout(self):
+        """ Test the export management command. """
+        out = StringIO()
+        call_command(
+            'export_bookings', '2022-05-03', '2022-05-03', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
@@ -1,21 +1,24 @@
 """ Testcases for the bookings app forms. """
 import datetime
+from django.template import Context, Template
 from django.test import TestCase
 from restaurant.models import Restaurant, Table
 from .models import Booking
 from .check_availability import create_booking_slots
 from .forms import BookingForm
+from .templatetags.booking_forms import rendered_fields
 
 
 class TestBookingForm(TestCase):
     """ Tests for the booking form. """
     def setUp(self):
-        self.restaurant = Restaurant.objects.create(name='Il oro d'Italia')
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
         self.table = Table.objects.create(restaurant=self.restaurant, size=2)
         self.slots = create_booking_slots(
             self.restaurant.opening_time, self.restaurant.closing_time)
         self.booking_id = ''
         self.booking = Booking.objects.create(
+            restaurant=self.restaurant,
             date=datetime.date.today(), time=datetime.time(18, 00),
             party_size=2, name='Test Name', email='test@email.com',
             phone_number='01234567890')
@@ -44,3 +47,55 @@ class TestBookingForm(TestCase):
         self.assertEqual(
             form.errors['__all__'][0],
             'Sorry no tables available at that time!')
+
+
+class TestCachedFormRendering(TestCase):
+    """ Tests for reusing the rendered booking form fields. """
+    def setUp(self):
+        rendered_fields.clear()
+        self.slots = create_booking_slots(
+            datetime.time(12, 00), datetime.time(22, 00))
+
+    def render(self, field, field_filter, **kwargs):
+        """ Render a field of a booking form with a crispy filter. """
+        form = BookingForm(self.slots, '', **kwargs)
+        return Template(
+            '{% load crispy_forms_tags booking_forms %}'
+            f'{{{{ form.{field} | {field_filter} }}}}'
+        ).render(Context({'form': form}))
+
+    def test_cached_field_matches_crispy_rendering(self):
+        """
+        Test the reused rendering is the same as crispy forms gives,
+        including the selected time which differs between requests.
+        """
+        for time in ('18:00', '19:30', '18:00'):
+            self.assertHTMLEqual(
+                self.render(
+                    'time', 'as_cached_crispy_field',
+                    initial={'time': time}),
+                self.render(
+                    'time', 'as_crispy_field', initial={'time': time}))
+        self.assertEqual(len(rendered_fields), 2)
+
+        # Different opening hours give different options.
+        self.slots = create_booking_slots(
+            datetime.time(17, 00), datetime.time(22, 00))
+        html = self.render(
+            'time', 'as_cached_crispy_field', initial={'time': '18:00'})
+        self.assertNotIn('12:00', html)
+
+    def test_typed_values_and_errors_not_cached(self):
+        """
+        Test fields with a customer's details or errors are rendered
+        afresh each time.
+        """
+        html = self.render(
+            'name', 'as_cached_crispy_field', initial={'name': 'Test Name'})
+        self.assertIn('Test Name', html)
+        html = self.render(
+            'party_size', 'as_cached_crispy_field',
+            data={'date': '2030-01-04', 'time': '18:00',
+                  'party_size': 'many'})
+        self.assertIn('is not one of the available choices', html)
+        self.assertEqual(rendered_fields, {})
@@ -0,0 +1,34 @@
+""" Testcases for the booked interval index. """
+import datetime
+from django.test import SimpleTestCase
+from .intervals import IntervalIndex, minutes
+
+
+class TestIntervalIndex(SimpleTestCase):
+    """ Tests for finding overlapping bookings. """
+    def test_minutes_past_midnight(self):
+        """ Test bookings ending after midnight end on the next day. """
+        self.assertEqual(
+            minutes(datetime.time(18, 30), datetime.time(20, 00)),
+            (1110, 1200))
+        self.assertEqual(
+            minutes(datetime.time(23, 00), datetime.time(1, 00)),
+            (1380, 1500))
+
+    def test_overlapping_intervals_of_any_length(self):
+        """
+        Test short and long intervals overlapping the query are found
+        and those only touching it are not.
+        """
+        index = IntervalIndex([
+            (600, 900, 'long'), (1000, 1060, 'short'), (1060, 1240, 'late'),
+            (1300, 1500, 'midnight')])
+        self.assertEqual(index.overlapping(870, 1010), ['long', 'short'])
+        self.assertEqual(index.overlapping(900, 1000), [])
+        self.assertEqual(index.overlapping(1020, 1030), ['short'])
+        self.assertEqual(index.overlapping(1400, 1440), ['midnight'])
+
+        index.add(880, 1100, 'added')
+        self.assertEqual(len(index), 5)
+        self.assertEqual(
+            index.overlapping(900, 1000), ['added'])
@@ -0,0 +1,227 @@
+""" Testcases for streaming booking changes to the dashboard. """
+import datetime
+import json
+from io import StringIO
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from il_oro_ditalia.asgi import StreamingASGIHandler
+from restaurant.models import Restaurant, Table
+from .models import Booking, BookingEvent
+from . import live
+
+
+def stream_messages(response):
+    """ Return the data of each booking event sent by a stream. """
+    content = b''.join(response.streaming_content).decode()
+    return [
+        json.loads(line[len('data: '):])
+        for line in content.splitlines() if line.startswith('data: ')]
+
+
+@override_settings(BOOKING_STREAM_SECONDS=0)
+class TestBookingEvents(TestCase):
+    """ Tests for sending booking changes to open dashboards. """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
+        self.table = Table.objects.create(restaurant=self.restaurant, size=4)
+        self.owner = User.objects.create_superuser(
+            'owner', 'owner@email.com', 'ownerpassword')
+        self.client.login(username='owner', password='ownerpassword')
+
+    def make_booking(self, restaurant=None, **details):
+        """ Make a booking with a table, sending its event. """
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                restaurant=restaurant or self.restaurant,
+                date=details.get('date', datetime.date.today()),
+                time=datetime.time(18, 00), party_size=4, name='Test Name',
+                email='test@email.com', phone_number='01234567890')
+            booking.tables.add(self.table)
+        return booking
+
+    def test_one_event_per_change(self):
+        """
+        Test a booking made and given tables together is one event, and
+        later changes and cancellations are each recorded.
+        """
+        booking = self.make_booking()
+        booking_id = booking.id
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.updated = False
+            booking.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.delete()
+        self.assertEqual(
+            list(BookingEvent.objects.values_list('booking_id', 'kind')),
+            [(booking_id, 'created'), (booking_id, 'updated'),
+             (booking_id, 'cancelled')])
+
+    def test_rolled_back_changes_not_sent(self):
+        """
+        Test the changes of a transaction rolled back are not recorded,
+        while those made before it in the same commit are.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            kept = Booking.objects.create(
+                restaurant=self.restaurant, date=datetime.date.today(),
+                time=datetime.time(18, 00), party_size=4, name='Kept',
+                email='kept@email.com', phone_number='01234567890')
+            try:
+                with transaction.atomic():
+                    kept.tables.add(self.table)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(
+            list(BookingEvent.objects.values_list('booking_id', 'kind')),
+            [(kept.id, 'created')])
+
+    @override_settings(BOOKING_STREAMS=1, BOOKING_STREAM_BUSY_RETRY=5)
+    def test_busy_stream_ends_at_once(self):
+        """
+        Test a stream opened while the worker holds as many as it may
+        sends the changes waiting and asks the browser to come back later.
+        """
+        booking = self.make_booking()
+        held = live.event_stream(None, self.restaurant, 0)
+        next(held)
+        try:
+            response = self.client.get(
+                '/bookings/booking_events', {'after': 0})
+            content = b''.join(response.streaming_content).decode()
+        finally:
+            held.close()
+        self.assertTrue(content.startswith('retry: 5000\n\n'))
+        self.assertIn(f'"id": {booking.id}', content)
+        self.assertEqual(live.open_streams, 0)
+
+    def test_stream_sends_changed_cards(self):
+        """
+        Test the stream sends each changed booking's card once, with
+        cancelled bookings to be removed.
+        """
+        kept = self.make_booking()
+        cancelled = self.make_booking()
+        cancelled_id = cancelled.id
+        with self.captureOnCommitCallbacks(execute=True):
+            kept.table_numbers = '7'
+            kept.save()
+            cancelled.delete()
+        self.make_booking(Restaurant.objects.create(name='Other Restaurant'))
+
+        response = self.client.get('/bookings/booking_events', {'after': 0})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        messages = stream_messages(response)
+        self.assertEqual(
+            [(message['id'], message['kind']) for message in messages],
+            [(kept.id, 'updated'), (cancelled_id, 'cancelled')])
+        self.assertIn(f'id="booking-{kept.id}"', messages[0]['html'])
+        self.assertIn('<p class="mb-1">7</p>', messages[0]['html'])
+
+    def test_stream_resumes_after_last_event(self):
+        """
+        Test a reconnecting browser is only sent the changes it missed,
+        and bookings moved before today are removed.
+        """
+        first = self.make_booking()
+        seen = BookingEvent.objects.last().id
+        second = self.make_booking()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.date = datetime.date.today() - datetime.timedelta(days=1)
+            first.save()
+
+        response = self.client.get(
+            '/bookings/booking_events', HTTP_LAST_EVENT_ID=str(seen))
+        self.assertEqual(
+            [(message['id'], message['kind'])
+             for message in stream_messages(response)],
+            [(second.id, 'created'), (first.id, 'cancelled')])
+
+    def test_bulk_changes_are_streamed(self):
+        """
+        Test bookings marked as seen or given table numbers together are
+        sent to the dashboards, though updating them sends no signals.
+        """
+        first = self.make_booking()
+        second = self.make_booking()
+        seen = BookingEvent.objects.last().id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/bookings/mark_bookings_seen', {
+                'booking_id': [first.id, second.id]})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/bookings/assign_table_numbers', {
+                'booking_id': [second.id], 'table_numbers': ['12']})
+
+        messages = stream_messages(self.client.get(
+            '/bookings/booking_events', {'after': seen}))
+        self.assertEqual(
+            [(message['id'], message['kind']) for message in messages],
+            [(first.id, 'updated'), (second.id, 'updated')])
+        self.assertNotIn('manage-updated', messages[0]['html'])
+        self.assertIn('<p class="mb-1">12</p>', messages[1]['html'])
+
+    def test_dashboard_streams_from_page_read(self):
+        """ Test the dashboard asks for the changes after it was read. """
+        self.make_booking()
+        response = self.client.get('/bookings/manage_bookings')
+        self.assertContains(
+            response, '/bookings/booking_events?after='
+            f'{BookingEvent.objects.last().id}')
+
+    def test_stream_for_owner_only(self):
+        """ Test customers cannot follow the restaurant's bookings. """
+        User.objects.create_user('john', 'john@email.com', 'johnpassword')
+        self.client.login(username='john', password='johnpassword')
+        response = self.client.get('/bookings/booking_events')
+        self.assertRedirects(response, '/')
+
+    def test_stream_served_from_event_loop_under_asgi(self):
+        """
+        Test the ASGI application streams the changes from an async
+        iterator, with no limit to the streams open in the worker.
+        """
+        booking = self.make_booking()
+        self.async_client.force_login(self.owner)
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def stream():
+            response = await self.async_client.get(
+                '/bookings/booking_events?after=0')
+            await StreamingASGIHandler().send_response(response, send)
+
+        with override_settings(BOOKING_STREAMS=0):
+            async_to_sync(stream)()
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn(
+            (b'Content-Type', b'text/event-stream'), sent[0]['headers'])
+        content = b''.join(
+            message.get('body', b'') for message in sent[1:]).decode()
+        self.assertTrue(content.startswith('retry: 1000\n\n'))
+        self.assertIn(f'"id": {booking.id}', content)
+        self.assertEqual(sent[-1], {'type': 'http.response.body'})
+
+    def test_old_events_pruned_by_command(self):
+        """
+        Test the command deletes the events older than the streams ask
+        for, which the streams themselves never write.
+        """
+        self.make_booking()
+        BookingEvent.objects.update(
+            created=timezone.now() - datetime.timedelta(hours=1))
+        recent = self.make_booking()
+        self.client.get('/bookings/booking_events', {'after': 0})
+        self.assertEqual(BookingEvent.objects.count(), 2)
+
+        out = StringIO()
+        call_command('prune_booking_events', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Deleted 1 booking events.')
+        self.assertEqual(
+            list(BookingEvent.objects.values_list('booking_id', flat=True)),
+            [recent.id])
@@ -0,0 +1,179 @@
+""" Testcases for the day occupancy matrix. """
+import datetime
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from restaurant.models import Restaurant, Table
+from .models import Booking
+from .check_availability import find_tables
+from .occupancy import DayOccupancy, PythonDayOccupancy, \
+    NumpyDayOccupancy, load_occupancy, slot_index
+from .slot_cache import load_days
+
+# NumPy is a requirement, so both backends are always tested.
+BACKENDS = [PythonDayOccupancy, NumpyDayOccupancy]
+
+
+def python_occupancy(test_case):
+    """
+    Run the tests of a test case with the pure Python occupancy, which
+    is used in place of NumPy's when it cannot be imported.
+    """
+    for target in ('bookings.occupancy', 'bookings.slot_cache'):
+        test_case = mock.patch(
+            f'{target}.default_backend', lambda: PythonDayOccupancy)(
+                test_case)
+    return test_case
+
+
+class TestOccupancy(TestCase):
+    """ Tests for the occupancy of each table through a day. """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
+        self.table1 = Table.objects.create(restaurant=self.restaurant, size=4)
+        self.table2 = Table.objects.create(restaurant=self.restaurant, size=2)
+        self.table3 = Table.objects.create(restaurant=self.restaurant, size=2)
+        self.date = datetime.date(2022, 5, 1)
+        self.booking = self.book(datetime.time(18, 00), [self.table1], 4)
+        self.book(datetime.time(19, 30), [self.table2], 2)
+
+    def book(self, start, tables, party_size):
+        """ Make a booking on the test date using the tables. """
+        booking = Booking.objects.create(
+            restaurant=self.restaurant,
+            date=self.date, time=start, party_size=party_size,
+            name='Name', email='test@email.com', phone_number='01234567890')
+        booking.tables.set(tables)
+        return booking
+
+    def test_free_tables(self):
+        """ Test the tables free for a whole booking are returned. """
+        for backend in BACKENDS:
+            with self.subTest(backend=backend.__name__):
+                day = load_occupancy(self.date, backend=backend)
+                self.assertEqual(
+                    day.free_tables(
+                        datetime.time(17, 00), datetime.time(19, 00)),
+                    [(self.table2.id, 2), (self.table3.id, 2)])
+                self.assertEqual(
+                    day.free_tables(
+                        datetime.time(20, 00), datetime.time(22, 00)),
+                    [(self.table1.id, 4), (self.table3.id, 2)])
+                self.assertEqual(
+                    day.free_seats(
+                        datetime.time(18, 30), datetime.time(20, 30)), 2)
+
+    def test_updated_booking_tables_left_free(self):
+        """ Test a booking being updated does not block its tables. """
+        for backend in BACKENDS:
+            with self.subTest(backend=backend.__name__):
+                day = load_occupancy(
+                    self.date, self.booking.id, backend=backend)
+                self.assertEqual(
+                    day.free_seats(
+                        datetime.time(18, 00), datetime.time(19, 00)), 8)
+
+    def test_max_party_and_utilisation_per_slot(self):
+        """
+        Test the largest party per slot and the share of seats booked
+        agree between the backends.
+        """
+        results = []
+        for backend in BACKENDS:
+            day = load_occupancy(self.date, backend=backend)
+            max_party = day.max_party()
+            utilisation = day.utilisation()
+            self.assertEqual(max_party[slot_index(datetime.time(12, 00))], 8)
+            # Only table 3 is free for two hours from 18:00.
+            self.assertEqual(max_party[slot_index(datetime.time(18, 00))], 2)
+            self.assertEqual(max_party[slot_index(datetime.time(21, 30))], 8)
+            self.assertEqual(
+                utilisation[slot_index(datetime.time(18, 00))], 0.5)
+            self.assertEqual(
+                utilisation[slot_index(datetime.time(19, 45))], 0.75)
+            results.append((max_party, utilisation))
+        self.assertTrue(all(result == results[0] for result in results))
+
+    def test_booking_past_midnight_cut_at_end_of_day(self):
+        """ Test a late booking books its table to the end of the day. """
+        self.book(datetime.time(23, 00), [self.table3], 2)
+        for backend in BACKENDS:
+            with self.subTest(backend=backend.__name__):
+                day = load_occupancy(self.date, backend=backend)
+                self.assertEqual(
+                    day.free_tables(
+                        datetime.time(23, 30), datetime.time(0, 30)),
+                    [(self.table1.id, 4), (self.table2.id, 2)])
+
+    def test_booking_past_midnight_holds_next_morning(self):
+        """
+        Test a late booking also books its table from midnight on the
+        day after, for the table search and the cached slots.
+        """
+        self.book(datetime.time(23, 00), [self.table3], 2)
+        next_day = self.date + datetime.timedelta(days=1)
+        occupancies = [
+            load_occupancy(next_day, backend=backend)
+            for backend in BACKENDS]
+        occupancies.append(load_days(self.restaurant, [next_day])[next_day])
+        for day in occupancies:
+            with self.subTest(backend=type(day).__name__):
+                self.assertEqual(
+                    day.free_tables(
+                        datetime.time(0, 00), datetime.time(0, 30)),
+                    [(self.table1.id, 4), (self.table2.id, 2)])
+                self.assertEqual(
+                    day.free_seats(
+                        datetime.time(1, 00), datetime.time(3, 00)), 8)
+                self.assertEqual(day.max_party(2)[0], 6)
+        self.assertEqual(
+            find_tables(
+                next_day, datetime.time(0, 00), datetime.time(2, 00), 4,
+                ''),
+            self.table1)
+
+    def test_numpy_used_by_default(self):
+        """ Test the occupancy is held by NumPy, which is required. """
+        self.assertIsInstance(
+            load_occupancy(self.date), NumpyDayOccupancy)
+
+    def test_backend_must_implement_every_matrix_method(self):
+        """ Test a backend missing a method cannot be created. """
+        class PartialOccupancy(DayOccupancy):
+            """ A backend without free_mask. """
+            def build(self, intervals):
+                self.busy = []
+
+            def max_party(self, length=None):
+                return []
+
+            def utilisation(self):
+                return []
+
+        with self.assertRaises(TypeError):
+            PartialOccupancy([(1, 2)], [])
+
+    def test_available_slots_and_owner_report(self):
+        """
+        Test the availability endpoint lists the slots for a party and
+        the owner occupancy report.
+        """
+        response = self.client.get(
+            '/bookings/availability',
+            {'date': self.date.isoformat(), 'party_size': 6})
+        slots = response.json()['slots']
+        self.assertIn('16:00', slots)
+        self.assertNotIn('16:15', slots)
+        self.assertIn('20:00', slots)
+
+        response = self.client.get('/bookings/occupancy')
+        self.assertEqual(response.status_code, 302)
+        User.objects.create_superuser(
+            'admin', 'admin@email.com', 'adminpassword')
+        self.client.login(username='admin', password='adminpassword')
+        response = self.client.get(
+            '/bookings/occupancy', {'date': self.date.isoformat()})
+        report = {slot['time']: slot for slot in response.json()['slots']}
+        self.assertEqual(
+            report['18:00'], {
+                'time': '18:00', 'utilisation': 0.5, 'max_party': 2})
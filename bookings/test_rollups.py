@@ -0,0 +1,173 @@
+""" Testcases for the slot rollups and utilisation report. """
+import datetime
+from django.contrib.auth.models import User
+from django.test import TestCase
+from restaurant.models import Restaurant, Table
+from .archive import archive_bookings
+from .models import Booking, SlotRollup
+from .occupancy import slot_index
+from .rollups import backfill_rollups
+
+
+class TestRollups(TestCase):
+    """ Tests for keeping the slot rollups up to date. """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
+        self.table1 = Table.objects.create(restaurant=self.restaurant, size=4)
+        self.table2 = Table.objects.create(restaurant=self.restaurant, size=2)
+        # A Monday.
+        self.date = datetime.date(2022, 5, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking = Booking.objects.create(
+                restaurant=self.restaurant, date=self.date,
+                time=datetime.time(18, 00), party_size=5, name='Name',
+                email='test@email.com', phone_number='01234567890')
+            self.booking.tables.set([self.table1, self.table2])
+
+    def totals(self, day):
+        """ Return the rollup totals of each slot on a day. """
+        return {
+            rollup.slot: (rollup.parties, rollup.covers,
+                          rollup.seats_booked, rollup.tables_used)
+            for rollup in SlotRollup.objects.filter(date=day)}
+
+    def test_rollups_follow_booking_changes(self):
+        """
+        Test the slots of a booking are counted when it is made and
+        removed when it is moved or cancelled.
+        """
+        totals = self.totals(self.date)
+        self.assertEqual(
+            sorted(totals),
+            list(range(slot_index(datetime.time(18, 00)),
+                       slot_index(datetime.time(20, 00)))))
+        self.assertEqual(
+            totals[slot_index(datetime.time(19, 00))], (1, 5, 6, 2))
+
+        moved = self.date + datetime.timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.date = moved
+            self.booking.save()
+        self.assertEqual(self.totals(self.date), {})
+        self.assertEqual(len(self.totals(moved)), 8)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.delete()
+        self.assertFalse(SlotRollup.objects.exists())
+
+    def test_changes_added_to_saved_rollups(self):
+        """
+        Test a change adds to the saved totals of the booking's own
+        slots at its own restaurant rather than counting them again,
+        and changes which do not move it leave the rollups as they are.
+        """
+        other = Restaurant.objects.create(name='Other Restaurant')
+        SlotRollup.objects.create(
+            restaurant=other, date=self.date, slot=10, parties=9)
+        SlotRollup.objects.create(
+            restaurant=self.restaurant, date=self.date, slot=10, parties=9)
+        seven = slot_index(datetime.time(19, 00))
+        SlotRollup.objects.filter(
+            restaurant=self.restaurant, slot=seven).update(covers=99)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.special_requirements = 'Window seat'
+            self.booking.save()
+        self.assertEqual(self.totals(self.date)[seven][1], 99)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.time = datetime.time(18, 30)
+            self.booking.save()
+        totals = self.totals(self.date)
+        # The slot held before and after the move is unchanged.
+        self.assertEqual(totals[seven], (1, 99, 6, 2))
+        self.assertNotIn(slot_index(datetime.time(18, 00)), totals)
+        self.assertEqual(
+            totals[slot_index(datetime.time(20, 00))], (1, 5, 6, 2))
+        self.assertEqual(
+            SlotRollup.objects.filter(slot=10, parties=9).count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True), \
+                self.assertNumQueries(1):
+            self.booking.party_size = 6
+            self.booking.save()
+        self.assertEqual(self.totals(self.date)[seven], (1, 100, 6, 2))
+
+    def test_table_changes_counted(self):
+        """
+        Test tables taken from and given to a booking change the seats
+        and tables of its slots, including tables removed before a move.
+        """
+        seven = slot_index(datetime.time(19, 00))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.tables.remove(self.table2)
+        self.assertEqual(self.totals(self.date)[seven], (1, 5, 4, 1))
+
+        moved = self.date + datetime.timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.tables.clear()
+            self.booking.date = moved
+            self.booking.save()
+            self.booking.tables.add(self.table2)
+        self.assertEqual(self.totals(self.date), {})
+        self.assertEqual(self.totals(moved)[seven], (1, 5, 2, 1))
+
+    def test_out_of_date_rollups_counted_again(self):
+        """
+        Test a change which would take a total below zero counts the
+        changed slots again from the bookings.
+        """
+        SlotRollup.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.tables.remove(self.table2)
+        totals = self.totals(self.date)
+        self.assertEqual(len(totals), 8)
+        self.assertEqual(
+            totals[slot_index(datetime.time(19, 00))], (1, 5, 4, 1))
+
+    def test_archived_bookings_still_counted(self):
+        """ Test archiving a booking keeps its rollups. """
+        with self.captureOnCommitCallbacks(execute=True):
+            archive_bookings(self.date + datetime.timedelta(days=1))
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(len(self.totals(self.date)), 8)
+
+    def test_backfill_rebuilds_rollups(self):
+        """ Test the backfill restores missing and clears stale rollups. """
+        SlotRollup.objects.all().delete()
+        SlotRollup.objects.create(
+            restaurant=self.restaurant, date=datetime.date(2022, 1, 1),
+            slot=10, parties=1, covers=2)
+        self.assertEqual(backfill_rollups(batch_size=1), 2)
+        self.assertEqual(self.totals(datetime.date(2022, 1, 1)), {})
+        self.assertEqual(len(self.totals(self.date)), 8)
+
+    def test_utilisation_report(self):
+        """
+        Test the owner report gives the mean covers per weekday slot
+        and the peak covers per date.
+        """
+        User.objects.create_superuser(
+            'owner', 'owner@email.com', 'ownerpassword')
+        self.client.login(username='owner', password='ownerpassword')
+        response = self.client.get(
+            '/bookings/utilisation',
+            {'start': '2022-05-02', 'end': '2022-05-15'})
+        report = response.json()
+
+        monday = report['heatmap'][0]
+        self.assertEqual(monday['weekday'], 'Monday')
+        slot = next(
+            slot for slot in monday['slots'] if slot['time'] == '18:00')
+        # One booking over two Mondays.
+        self.assertEqual(slot['covers'], 2.5)
+        self.assertEqual(slot['utilisation'], 0.5)
+        self.assertEqual(
+            report['trend'], [{
+                'date': '2022-05-02', 'peak_covers': 5,
+                'utilisation': round(6 * 8 / 6 / len(monday['slots']), 3),
+            }])
+
+        response = self.client.get(
+            '/bookings/utilisation', {'start': 'soon'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,171 @@
+""" Testcases for searching bookings. """
+import datetime
+from django.contrib.auth.models import User
+from django.test import TestCase
+from restaurant.models import Restaurant
+from .models import Booking, BookingSearchGram
+from .search import reindex_bookings, search_bookings
+
+
+class TestSearchBookings(TestCase):
+    """ Tests for finding bookings by name, email and phone number. """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
+        self.other = Restaurant.objects.create(name='Other Restaurant')
+        self.smith = self.make_booking(
+            'John Smith', 'john.smith@email.com', '07700 900123')
+        self.ricci = self.make_booking(
+            'Giulia Ricci', 'giulia@ricci.it', '+44 (0)20 7946 0958')
+        self.other_smith = self.make_booking(
+            'Jane Smith', 'jane@email.com', '01234567890', self.other)
+
+    def make_booking(self, name, email, phone_number, restaurant=None):
+        """ Return a new booking for a customer. """
+        return Booking.objects.create(
+            restaurant=restaurant or self.restaurant,
+            date=datetime.date(2030, 1, 4), time=datetime.time(18, 00),
+            party_size=2, name=name, email=email, phone_number=phone_number)
+
+    def found(self, query, restaurant=None):
+        """ Return the bookings found by a search. """
+        return [
+            booking for booking, _ in search_bookings(query, restaurant)]
+
+    def test_finds_parts_of_names_and_emails(self):
+        """ Test a search finds bookings by part of any of their words. """
+        self.assertEqual(self.found('Ricci'), [self.ricci])
+        self.assertEqual(self.found('giul'), [self.ricci])
+        self.assertEqual(self.found('john.smith@')[0], self.smith)
+        self.assertCountEqual(
+            self.found('smith'), [self.smith, self.other_smith])
+        self.assertEqual(self.found('Zanetti'), [])
+
+    def test_finds_names_with_typos_and_accents(self):
+        """ Test misspelt and accented searches still find the booking. """
+        self.assertEqual(self.found('Jhon Smiht')[0], self.smith)
+        self.assertEqual(self.found('Giúlia'), [self.ricci])
+
+    def test_finds_phone_numbers_however_written(self):
+        """ Test phone numbers are matched by their digits alone. """
+        self.assertEqual(self.found('900 123'), [self.smith])
+        self.assertEqual(self.found('(020) 7946-0958'), [self.ricci])
+        self.assertEqual(self.found('79460958'), [self.ricci])
+
+    def test_search_within_restaurant(self):
+        """ Test a search only returns bookings of the restaurant given. """
+        self.assertEqual(self.found('smith', self.restaurant), [self.smith])
+        self.assertEqual(self.found('smiht', self.restaurant), [self.smith])
+
+        # Moving a booking moves its pieces to the other restaurant.
+        self.other_smith.restaurant = self.restaurant
+        self.other_smith.save()
+        self.assertCountEqual(
+            self.found('smiht', self.restaurant),
+            [self.smith, self.other_smith])
+        self.assertEqual(self.found('smiht', self.other), [])
+
+    def test_common_words_found_without_index(self):
+        """
+        Test a search filled by the newest bookings with the words as
+        typed is returned without reading the index.
+        """
+        with self.assertNumQueries(2):
+            results = search_bookings('Smith', limit=1)
+        self.assertEqual(results, [(self.other_smith, 1.0)])
+
+    def test_close_matches_only_without_exact_matches(self):
+        """
+        Test bookings with every word of the search are returned on
+        their own, found by scanning when there are few bookings.
+        """
+        smyth = self.make_booking('Anna Smyth', 'anna@smyth.it', '0123')
+        with self.assertNumQueries(2):
+            self.assertCountEqual(
+                self.found('smith'), [self.smith, self.other_smith])
+        self.assertEqual(self.found('Smyth'), [smyth])
+        self.assertCountEqual(
+            self.found('smeth'), [self.smith, self.other_smith, smyth])
+
+    def test_index_follows_changes(self):
+        """ Test bookings are indexed again when their details change. """
+        self.smith.name = 'John Esposito'
+        self.smith.email = 'john@esposito.it'
+        self.smith.save()
+        self.assertEqual(self.found('espozito'), [self.smith])
+        self.assertEqual(self.found('smiht'), [self.other_smith])
+
+        # Saving other fields leaves the index as it was.
+        self.smith.party_size = 4
+        with self.assertNumQueries(1):
+            self.smith.save()
+        self.assertEqual(self.found('espozito'), [self.smith])
+
+    def test_reindex_rebuilds_every_booking(self):
+        """ Test the backfill indexes bookings saved without signals. """
+        BookingSearchGram.objects.all().delete()
+        self.assertEqual(self.found('smiht'), [])
+        self.assertEqual(reindex_bookings(batch_size=2), 3)
+        self.assertCountEqual(
+            self.found('smiht'), [self.smith, self.other_smith])
+
+
+class TestSearchPages(TestCase):
+    """ Tests for the owner's booking search and the admin search. """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
+        self.booking = Booking.objects.create(
+            restaurant=self.restaurant, date=datetime.date(2030, 1, 4),
+            time=datetime.time(18, 00), party_size=2, name='John Smith',
+            email='john.smith@email.com', phone_number='07700 900123')
+        Booking.objects.create(
+            restaurant=Restaurant.objects.create(name='Other Restaurant'),
+            date=datetime.date(2030, 1, 4), time=datetime.time(18, 00),
+            party_size=2, name='Jane Smith', email='jane@email.com',
+            phone_number='01234567890')
+        User.objects.create_superuser(
+            'owner', 'owner@email.com', 'ownerpassword')
+        self.client.login(username='owner', password='ownerpassword')
+
+    def test_search_page_lists_restaurant_bookings(self):
+        """ Test the owner finds only their restaurant's bookings. """
+        response = self.client.get('/bookings/search_bookings', {'q': 'smiht'})
+        results = response.json()['results']
+        self.assertEqual([result['id'] for result in results],
+                         [self.booking.id])
+        self.assertEqual(results[0]['phone_number'], '07700 900123')
+        self.assertEqual(results[0]['time'], '18:00')
+
+        response = self.client.get('/bookings/search_bookings', {'q': ' '})
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_page_for_owner_only(self):
+        """ Test customers are turned away from the search. """
+        User.objects.create_user('john', 'john@email.com', 'johnpassword')
+        self.client.login(username='john', password='johnpassword')
+        response = self.client.get('/bookings/search_bookings', {'q': 'smith'})
+        self.assertRedirects(response, '/')
+
+    def test_admin_search_lists_every_match(self):
+        """ Test the admin lists every match, a page at a time. """
+        Booking.objects.bulk_create([
+            Booking(restaurant=self.restaurant, date=datetime.date(2030, 1, 5),
+                    time=datetime.time(12, 00),
+                    end_time=datetime.time(13, 30), party_size=2,
+                    name=f'Guest {number}', email='guest@email.com',
+                    phone_number='07700 900456')
+            for number in range(120)])
+        reindex_bookings()
+        response = self.client.get(
+            '/admin/bookings/booking/', {'q': 'guest'})
+        self.assertEqual(response.context['cl'].result_count, 120)
+        self.assertEqual(len(response.context['cl'].result_list), 100)
+
+    def test_admin_search_uses_index(self):
+        """ Test the admin booking list is searched with typos allowed. """
+        response = self.client.get(
+            '/admin/bookings/booking/', {'q': 'smiht'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        response = self.client.get(
+            '/admin/bookings/booking/', {'q': '900123'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.booking])
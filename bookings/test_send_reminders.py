@@ -0,0 +1,55 @@
+""" Testcases for the reminder emails command. """
+import datetime
+from io import StringIO
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from restaurant.models import Restaurant
+from .models import Booking
+
+
+class TestSendReminders(TestCase):
+    """ Tests for the send reminders management command. """
+    def setUp(self):
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        for hour in (12, 13, 14):
+            Booking.objects.create(
+                date=tomorrow, time=datetime.time(hour, 00), party_size=2,
+                name=f'Name {hour}', email=f'{hour}@email.com',
+                phone_number='01234567890')
+        Booking.objects.create(
+            date=datetime.date.today(), time=datetime.time(12, 00),
+            party_size=2, name='Today', email='today@email.com',
+            phone_number='01234567890')
+
+    def test_reminders_sent_once_for_tomorrows_bookings(self):
+        """
+        Test only tomorrow's bookings are reminded and that running
+        the command again does not send them twice.
+        """
+        out = StringIO()
+        with self.assertNumQueries(3):
+            call_command('send_reminders', chunk_size=2, stdout=out)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].to, ['12@email.com'])
+        self.assertIn('Sent 3 reminders', out.getvalue())
+        self.assertEqual(
+            Booking.objects.filter(reminder_sent=True).count(), 3)
+
+        call_command('send_reminders', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_reminder_names_the_restaurant_and_day(self):
+        """ Test reminders for another day name its restaurant and date. """
+        restaurant = Restaurant.objects.create(name="Il oro d'Italia Soho")
+        Booking.objects.create(
+            restaurant=restaurant, date=datetime.date(2030, 1, 4),
+            time=datetime.time(18, 00), party_size=2, name='Later',
+            email='later@email.com', phone_number='01234567890')
+        call_command('send_reminders', date='2030-01-04', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("Il oro d'Italia Soho", mail.outbox[0].subject)
+        self.assertIn(
+            "at Il oro d'Italia Soho on Friday 4 January.",
+            mail.outbox[0].body)
+        self.assertNotIn('tomorrow', mail.outbox[0].body)
@@ -0,0 +1,108 @@
+""" Testcases for caching the booking slots free on each day. """
+import datetime
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from restaurant.models import Restaurant, Table
+from .forms import BookingForm
+from .models import Booking
+from .check_availability import find_tables, largest_parties
+from .occupancy import load_numpy, load_occupancy, slot_index
+from .slot_cache import available_slots
+from .templatetags.booking_forms import rendered_fields
+from .test_occupancy import python_occupancy
+from .warmup import WARM_TEMPLATES, warm_process, warm_slots
+
+
+class TestSlotCache(TestCase):
+    """ Tests for the cached slots and for warming the caches. """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(
+            name="Il oro d'Italia", opening_time=datetime.time(18, 00),
+            closing_time=datetime.time(21, 00))
+        self.table = Table.objects.create(restaurant=self.restaurant, size=4)
+        self.day = datetime.date.today() + datetime.timedelta(days=1)
+
+    def test_slots_cached_until_day_changes(self):
+        """
+        Test a day's slots are worked out once and worked out again when
+        a booking on that day changes.
+        """
+        slots = available_slots(self.restaurant, self.day, 4)
+        self.assertEqual(slots[0], '18:00')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                available_slots(self.restaurant, self.day, 2), slots)
+
+        booking = Booking.objects.create(
+            restaurant=self.restaurant, date=self.day,
+            time=datetime.time(18, 00), party_size=4, name='Test Name',
+            email='test@email.com', phone_number='01234567890')
+        booking.tables.add(self.table)
+        self.assertNotIn('18:00', available_slots(
+            self.restaurant, self.day, 4))
+
+        # A new table makes every cached day out of date.
+        Table.objects.create(restaurant=self.restaurant, size=4)
+        self.assertIn('18:00', available_slots(self.restaurant, self.day, 4))
+
+    def test_only_neighbouring_tables_offered_on_floor_plan(self):
+        """
+        Test a slot is only offered to a party the table search would
+        seat, which on a floor plan means tables next to each other.
+        """
+        apart = Table.objects.create(restaurant=self.restaurant, size=4)
+        beside = Table.objects.create(restaurant=self.restaurant, size=2)
+        self.table.adjacent.add(beside)
+        self.assertEqual(available_slots(self.restaurant, self.day, 8), [])
+        self.assertIsNone(find_tables(
+            self.day, datetime.time(18, 00), datetime.time(20, 00), 8, '',
+            self.restaurant))
+        self.assertIn('18:00', available_slots(self.restaurant, self.day, 6))
+        self.assertEqual(
+            largest_parties(load_occupancy(
+                self.day, restaurant=self.restaurant))[
+                    slot_index(datetime.time(18, 00))], 6)
+
+        # Warming the days loads the floor plan once for every day.
+        self.assertEqual(warm_slots(days=3, workers=1), 3)
+        self.assertEqual(available_slots(self.restaurant, self.day, 8), [])
+
+        # Changing the floor plan makes every cached day out of date.
+        apart.adjacent.add(beside)
+        self.assertIn('18:00', available_slots(self.restaurant, self.day, 8))
+
+    def test_warmed_days_need_no_queries(self):
+        """ Test warming caches the slots of each of the coming days. """
+        self.assertEqual(warm_slots(days=3, workers=1), 3)
+        with self.assertNumQueries(0):
+            for offset in range(3):
+                available_slots(
+                    self.restaurant,
+                    datetime.date.today() + datetime.timedelta(days=offset),
+                    8)
+        self.assertGreater(warm_process(), 0)
+
+    def test_warm_process_counts_cached_fields(self):
+        """
+        Test only the fields kept in the cache are counted, which leaves
+        out the form's hidden key and fields cached already.
+        """
+        rendered_fields.clear()
+        others = len(WARM_TEMPLATES) + int(load_numpy() is not None)
+        self.assertEqual(warm_process(), others + len(rendered_fields))
+        self.assertLess(len(rendered_fields), len(BookingForm(
+            [], '', restaurant=self.restaurant).fields))
+        self.assertEqual(warm_process(), others)
+
+    def test_warm_caches_command_reports_entries(self):
+        """ Test the command reports what it cached. """
+        out = StringIO()
+        call_command('warm_caches', days=2, workers=1, stdout=out)
+        self.assertIn('Cached 1 restaurants', out.getvalue())
+        self.assertIn('Cached 2 restaurant days of slots', out.getvalue())
+
+
+@python_occupancy
+class TestSlotCacheWithoutNumpy(TestSlotCache):
+    """ The slot cache tests with the pure Python occupancy. """
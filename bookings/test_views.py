@@ -1,6 +1,8 @@
 """ Testcases for the bookings app views. """
 import datetime
-from django.test import TestCase
+from django.core.cache import cache
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
 from django.test.client import Client
 from django.contrib.auth.models import User
 from restaurant.models import Restaurant, Table
@@ -16,10 +18,11 @@ class TestViews(TestCase):
         self.user = User.objects.create_user(
             'john', 'john@email.com', 'johnpassword')
 
-        self.restaurant = Restaurant.objects.create(name='Il oro d'Italia')
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
         self.table = Table.objects.create(restaurant=self.restaurant, size=2)
         self.table = Table.objects.create(restaurant=self.restaurant, size=4)
         self.booking = Booking.objects.create(
+            restaurant=self.restaurant,
             date=datetime.date.today(), time=datetime.time(18, 00),
             party_size=2, name='Test Name', email='test@email.com',
             phone_number='01234567890')
@@ -111,6 +114,68 @@ class TestViews(TestCase):
         updated_booking = Booking.objects.get(id=self.booking.id)
         self.assertEqual(updated_booking.table_numbers, '20')
 
+    def test_can_mark_bookings_seen_together(self):
+        """
+        Test that several bookings are marked as seen in one request and
+        that unknown bookings and those of other restaurants are reported.
+        """
+        other = Booking.objects.create(
+            restaurant=self.restaurant,
+            date=datetime.date.today(), time=datetime.time(20, 00),
+            party_size=2, name='Test Name', email='test@email.com',
+            phone_number='01234567890')
+        elsewhere = Booking.objects.create(
+            restaurant=Restaurant.objects.create(name='Other Restaurant'),
+            date=datetime.date.today(), time=datetime.time(20, 00),
+            party_size=2, name='Test Name', email='test@email.com',
+            phone_number='01234567890')
+        self.client.login(username='admin', password='adminpassword')
+        response = self.client.post('/bookings/mark_bookings_seen', {
+            'booking_id': [self.booking.id, other.id, elsewhere.id]})
+        self.assertEqual(response.json(), {
+            'updated': [self.booking.id, other.id],
+            'missing': [elsewhere.id]})
+        self.assertFalse(Booking.objects.filter(
+            restaurant=self.restaurant, updated=True).exists())
+        self.assertTrue(Booking.objects.get(id=elsewhere.id).updated)
+
+        # Bookings already seen are left as they are.
+        response = self.client.post(
+            '/bookings/mark_bookings_seen', {'booking_id': [other.id]})
+        self.assertEqual(response.json()['updated'], [])
+
+        response = self.client.post(
+            '/bookings/mark_bookings_seen', {'booking_id': ['x']})
+        self.assertEqual(response.status_code, 400)
+
+    def test_can_assign_table_numbers_together(self):
+        """
+        Test that the table numbers of several bookings are set in one
+        request from pairs of booking ids and table numbers.
+        """
+        other = Booking.objects.create(
+            restaurant=self.restaurant,
+            date=datetime.date.today(), time=datetime.time(20, 00),
+            party_size=2, name='Test Name', email='test@email.com',
+            phone_number='01234567890')
+        self.client.login(username='admin', password='adminpassword')
+        response = self.client.post('/bookings/assign_table_numbers', {
+            'booking_id': [self.booking.id, other.id, 0],
+            'table_numbers': ['1, 2', '7', '9']})
+        self.assertEqual(response.json(), {
+            'updated': [self.booking.id, other.id], 'missing': [0]})
+        self.assertEqual(
+            Booking.objects.get(id=self.booking.id).table_numbers, '1, 2')
+        self.assertEqual(Booking.objects.get(id=other.id).table_numbers, '7')
+
+        response = self.client.post('/bookings/assign_table_numbers', {
+            'booking_id': [self.booking.id, other.id],
+            'table_numbers': ['1']})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/bookings/assign_table_numbers', {
+            'booking_id': [self.booking.id], 'table_numbers': ['1' * 51]})
+        self.assertEqual(response.status_code, 400)
+
     def test_the_restaurant_owner_areas_redirect_standard_users(self):
         """
         Test that views that only allow access by a superuser
@@ -262,6 +327,44 @@ class TestViews(TestCase):
         updated_booking = Booking.objects.get(id=self.booking.id)
         self.assertFalse(updated_booking.updated)
 
+    def test_update_keeps_tables_which_still_suit_booking(self):
+        """
+        Test moving a booking keeps its tables and table numbers when
+        they are free at the new time, and changes only the tables
+        needed when they are not.
+        """
+        self.booking.table_numbers = '12'
+        self.booking.save()
+        self.client.login(username='admin', password='adminpassword')
+        booking_data = {
+            'date': self.booking.date,
+            'time': datetime.time(19, 00),
+            'party_size': 4,
+            'name': self.booking.name,
+            'email': self.booking.email,
+            'phone_number': self.booking.phone_number,
+        }
+        self.client.post(
+            f'/bookings/update_booking/{self.booking.id}', booking_data)
+        booking = Booking.objects.get(id=self.booking.id)
+        self.assertEqual(booking.time, datetime.time(19, 00))
+        self.assertEqual(list(booking.tables.all()), [self.table])
+        self.assertEqual(booking.table_numbers, '12')
+
+        other = Booking.objects.create(
+            restaurant=self.restaurant,
+            date=self.booking.date, time=datetime.time(21, 00),
+            party_size=2, name='Test Name', email='test@email.com',
+            phone_number='01234567890')
+        other.tables.add(self.table)
+        booking_data.update(time=datetime.time(20, 00), party_size=2)
+        self.client.post(
+            f'/bookings/update_booking/{self.booking.id}', booking_data)
+        booking = Booking.objects.get(id=self.booking.id)
+        self.assertEqual(booking.party_size, 2)
+        self.assertEqual(booking.table_numbers, '')
+        self.assertNotIn(self.table, booking.tables.all())
+
     def test_error_message_generated_when_booking_form_not_valid(self):
         """
         Test the make booking and update booking post views to
@@ -299,4 +402,122 @@ class TestViews(TestCase):
         message2 = list(response2.context.get('messages'))[0]
         self.assertEqual(
             message2.message,
-            'Failed to update the booking. Please check the form.')
\ No newline at end of file
+            'Failed to update the booking. Please check the form.')
+
+    def test_my_bookings_redirects_anonymous_user_to_login(self):
+        """ Test the async my bookings view requires a logged in user. """
+        response = self.client.get('/bookings/my_bookings')
+        self.assertRedirects(
+            response, '/accounts/login/?next=/bookings/my_bookings',
+            fetch_redirect_response=False)
+
+    def test_availability_returns_json_result(self):
+        """ Test the availability view reports free and booked slots. """
+        response = self.client.get(
+            '/bookings/availability',
+            {'date': datetime.date.today(), 'time': '12:00',
+             'party_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'available': True})
+
+        # Both tables are taken by the existing booking and a new one.
+        booking = Booking.objects.create(
+            restaurant=self.restaurant,
+            date=datetime.date.today(), time=datetime.time(18, 00),
+            party_size=2, name='Test Name', email='test@email.com',
+            phone_number='01234567890')
+        booking.tables.add(Table.objects.exclude(id=self.table.id)[0])
+        response = self.client.get(
+            '/bookings/availability',
+            {'date': datetime.date.today(), 'time': '18:30',
+             'party_size': 2})
+        self.assertEqual(response.json(), {'available': False})
+
+    def test_availability_rejects_invalid_query(self):
+        """ Test the availability view validates the query string. """
+        response = self.client.get(
+            '/bookings/availability', {'date': 'tomorrow'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_repeated_booking_submission_returns_original_booking(self):
+        """
+        Test that submitting the same booking form twice makes one
+        booking and redirects the repeat to the original booking.
+        """
+        form_data = {
+            'idempotency_key': 'a' * 32,
+            'date': datetime.date.today(),
+            'time': datetime.time(12, 00),
+            'party_size': 2,
+            'name': 'Repeat Name',
+            'email': 'test@email.com',
+            'phone_number': '01234567890',
+        }
+        response = self.client.post('/bookings/make_booking', form_data)
+        booking = Booking.objects.get(name='Repeat Name')
+        self.assertRedirects(
+            response, f'/bookings/booking_confirmed/{booking.id}')
+
+        # The repeat does not search for tables or save anything.
+        with self.assertNumQueries(0):
+            response2 = self.client.post(
+                '/bookings/make_booking', form_data)
+        self.assertRedirects(
+            response2, f'/bookings/booking_confirmed/{booking.id}')
+        self.assertEqual(
+            Booking.objects.filter(name='Repeat Name').count(), 1)
+
+    def test_repeated_submission_to_another_worker_recognised(self):
+        """
+        Test a repeat handled by a worker with a cache of its own is
+        recognised from the submission recorded in the database.
+        """
+        form_data = {
+            'idempotency_key': 'c' * 32,
+            'date': datetime.date.today(),
+            'time': datetime.time(12, 00),
+            'party_size': 2,
+            'name': 'Repeat Name',
+            'email': 'test@email.com',
+            'phone_number': '01234567890',
+        }
+        self.client.post('/bookings/make_booking', form_data)
+        booking = Booking.objects.get(name='Repeat Name')
+        cache.clear()
+        response = self.client.post('/bookings/make_booking', form_data)
+        self.assertRedirects(
+            response, f'/bookings/booking_confirmed/{booking.id}')
+        self.assertEqual(
+            Booking.objects.filter(name='Repeat Name').count(), 1)
+
+    def test_failed_booking_submission_can_be_retried(self):
+        """
+        Test that a submission failing part way through is not saved and
+        does not leave its key waiting, so the retry makes the booking.
+        """
+        form_data = {
+            'idempotency_key': 'b' * 32,
+            'date': datetime.date.today(),
+            'time': datetime.time(12, 00),
+            'party_size': 2,
+            'name': 'Retry Name',
+            'email': 'test@email.com',
+            'phone_number': '01234567890',
+        }
+
+        def fail(sender, **kwargs):
+            raise RuntimeError('Database unavailable')
+
+        post_save.connect(fail, sender=Booking)
+        try:
+            with self.assertRaises(RuntimeError):
+                self.client.post('/bookings/make_booking', form_data)
+        finally:
+            post_save.disconnect(fail, sender=Booking)
+        self.assertFalse(Booking.objects.filter(name='Retry Name').exists())
+
+        response = self.client.post('/bookings/make_booking', form_data)
+        booking = Booking.objects.get(name='Retry Name')
+        self.assertRedirects(
+            response, f'/bookings/booking_confirmed/{booking.id}')
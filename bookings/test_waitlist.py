@@ -0,0 +1,95 @@
+""" Testcases for the waitlist. """
+import datetime
+from django.core import mail
+from django.test import TestCase, override_settings
+from restaurant.models import Restaurant, Table
+from .models import Booking, WaitlistEntry
+
+
+@override_settings(BOOKING_EMAIL_ASYNC=False)
+class TestWaitlist(TestCase):
+    """ Tests for offering freed tables to the waitlist. """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
+        self.table = Table.objects.create(restaurant=self.restaurant, size=4)
+        self.booking = Booking.objects.create(
+            restaurant=self.restaurant,
+            date=datetime.date(2030, 1, 4), time=datetime.time(18, 00),
+            party_size=4, name='Test Name', email='test@email.com',
+            phone_number='01234567890')
+        self.booking.tables.add(self.table)
+
+    def add_entry(self, earliest, latest, party_size=4, name='Waiting'):
+        """ Add an entry to the waitlist for the booking date. """
+        return WaitlistEntry.objects.create(
+            restaurant=self.restaurant, date=datetime.date(2030, 1, 4),
+            earliest_time=earliest, latest_time=latest,
+            party_size=party_size, name=name, email='wait@email.com',
+            phone_number='01234567890')
+
+    def test_cancelled_booking_offered_to_first_matching_entry(self):
+        """
+        Test that cancelling a booking emails the first entry whose
+        window and party size fit the freed tables.
+        """
+        too_big = self.add_entry(
+            datetime.time(18, 00), datetime.time(19, 00), 6, 'Too Big')
+        too_late = self.add_entry(
+            datetime.time(20, 30), datetime.time(21, 00), 2, 'Too Late')
+        first = self.add_entry(
+            datetime.time(17, 00), datetime.time(19, 00), 4, 'First')
+        second = self.add_entry(
+            datetime.time(18, 00), datetime.time(19, 00), 2, 'Second')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.delete()
+
+        first.refresh_from_db()
+        self.assertTrue(first.offered)
+        for entry in (too_big, too_late, second):
+            entry.refresh_from_db()
+            self.assertFalse(entry.offered)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['wait@email.com'])
+        self.assertIn('time=18%3A00%3A00', mail.outbox[0].body)
+
+    def test_moved_booking_frees_original_slot(self):
+        """
+        Test that moving a booking offers its original slot
+        but not while the tables are still held.
+        """
+        entry = self.add_entry(datetime.time(18, 00), datetime.time(18, 00))
+
+        booking = Booking.objects.get(id=self.booking.id)
+        booking.special_requirements = 'Window seat'
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save()
+        entry.refresh_from_db()
+        self.assertFalse(entry.offered)
+
+        booking.time = datetime.time(21, 00)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save()
+        entry.refresh_from_db()
+        self.assertTrue(entry.offered)
+
+    def test_can_join_waitlist(self):
+        """ Test the join waitlist view saves an entry. """
+        response = self.client.get(
+            '/bookings/join_waitlist', {'date': '2030-01-04'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'bookings/join_waitlist.html')
+
+        response = self.client.post(
+            '/bookings/join_waitlist',
+            {
+                'date': '2030-01-04',
+                'earliest_time': datetime.time(18, 00),
+                'latest_time': datetime.time(19, 00),
+                'party_size': 4,
+                'name': 'Waiting',
+                'email': 'wait@email.com',
+                'phone_number': '01234567890',
+            })
+        self.assertRedirects(response, '/')
+        self.assertTrue(WaitlistEntry.objects.filter(name='Waiting').exists())
@@ -7,7 +7,15 @@ urlpatterns = [
     path(
         'booking_confirmed/<booking_id>',
         views.booking_confirmed, name='booking_confirmed'),
+    path('availability', views.availability, name='availability'),
+    path('join_waitlist', views.join_waitlist, name='join_waitlist'),
+    path('occupancy', views.occupancy, name='occupancy'),
+    path('utilisation', views.utilisation, name='utilisation'),
     path('manage_bookings', views.manage_bookings, name='manage_bookings'),
+    path('booking_events', views.booking_events, name='booking_events'),
+    path('search_bookings', views.search_bookings, name='search_bookings'),
+    path('export_bookings', views.export_bookings, name='export_bookings'),
+    path('import_bookings', views.import_bookings, name='import_bookings'),
     path('my_bookings', views.my_bookings, name='my_bookings'),
     path(
         'booking_detail/<booking_id>', views.booking_detail,
@@ -16,6 +24,12 @@ urlpatterns = [
     path(
         'toggle_updated/<booking_id>', views.toggle_updated,
         name='toggle_updated'),
+    path(
+        'mark_bookings_seen', views.mark_bookings_seen,
+        name='mark_bookings_seen'),
+    path(
+        'assign_table_numbers', views.assign_table_numbers,
+        name='assign_table_numbers'),
     path(
         'delete_booking/<booking_id>', views.delete_booking,
         name='delete_booking'),
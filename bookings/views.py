@@ -1,21 +1,52 @@
 """ Views for the bookings app. """
 import datetime
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, reverse, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-
-from restaurant.models import Restaurant
-from .models import Booking
-from .forms import BookingForm
-from .check_availability import create_booking_slots
-from .confirmation_email import send_confirmation_email
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+
+from il_oro_ditalia.asynchronous import AsyncStreamingHttpResponse, \
+    arender, async_login_required
+from il_oro_ditalia.routers import read_from_replica
+from .models import Booking, BookingEvent
+from .forms import BookingForm, WaitlistForm
+from .live import aevent_stream, event_stream, last_event_id, \
+    publish_bookings
+from .check_availability import create_booking_slots, find_tables, \
+    largest_parties
+from .confirmation_email import dispatch_confirmation_email
+from .durations import booking_end_time
+from .occupancy import load_occupancy, slot_index
+from .rollups import utilisation_report
+from .search import search_bookings as run_search
+from .slot_cache import available_slots
+from . import idempotency
+from .export import EXPORT_FORMATS, generate_export
+from .bulk_import import IMPORT_FORMATS, import_bookings as run_import, \
+    read_upload
 
 
 def make_booking(request):
     """
     Display the booking form and make a booking.
     """
-    restaurant = Restaurant.objects.get(name="Il oro d'Italia")
+    # A double click or a retried request sends the same form again.
+    # Return the booking made by the first submission rather than
+    # searching for tables and making a second booking.
+    submission_key = request.POST.get('idempotency_key', '')
+    if (idempotency.is_valid(submission_key) and
+            not idempotency.claim(submission_key)):
+        previous_id = idempotency.previous_booking(submission_key)
+        if previous_id is None:
+            messages.info(request, 'Your booking is being processed.')
+            return redirect('make_booking')
+        messages.success(request, 'Booking successfully made!')
+        return booking_made_redirect(request, previous_id)
+
+    restaurant = request.restaurant
     # Create time slots between restaurant opening and closing
     # for the booking form time selection.
     slots = create_booking_slots(
@@ -26,34 +57,47 @@ def make_booking(request):
     booking_id = ''
 
     if request.method == 'POST':
-        booking_form = BookingForm(slots, booking_id, data=request.POST)
-        if booking_form.is_valid():
-            # Get the selected available table(s)
-            tables = booking_form.cleaned_data['tables']
-            booking = booking_form.save()
+        booking_form = BookingForm(
+            slots, booking_id, data=request.POST, restaurant=restaurant)
+        booking = None
+        try:
+            if booking_form.is_valid():
+                # Get the selected available table(s)
+                tables = booking_form.cleaned_data['tables']
+                booking = booking_form.save(commit=False)
+                if request.user.is_authenticated:
+                    booking.customer = request.user
+                with transaction.atomic():
+                    booking.save()
 
-            # Add the selected table(s) to the booking
-            if isinstance(tables, list):
-                booking.tables.set(tables)
-            else:
-                booking.tables.add(tables)
-            if request.user.is_authenticated:
-                booking.customer = request.user
-                booking.save()
-            send_confirmation_email(booking)
+                    # Add the selected table(s) to the booking
+                    if isinstance(tables, list):
+                        booking.tables.set(tables)
+                    else:
+                        booking.tables.add(tables)
+        except Exception:
+            # Nothing was saved, so let the customer try again rather
+            # than telling them it is processing until the key expires.
+            idempotency.release(submission_key)
+            raise
+
+        if booking is not None:
+            idempotency.complete(submission_key, booking.id)
+            dispatch_confirmation_email(booking)
             messages.success(request, 'Booking successfully made!')
 
-            # Assign the redirect based on who is making the booking
-            if request.user.is_superuser:
-                return redirect('manage_bookings')
-            else:
-                return redirect(reverse(
-                    'booking_confirmed', args=[booking.id]))
-        else:
-            messages.error(
-                request, 'Failed to make the booking. Please check the form.')
+            return booking_made_redirect(request, booking.id)
+        idempotency.release(submission_key)
+        messages.error(
+            request, 'Failed to make the booking. Please check the form.')
     else:
-        booking_form = BookingForm(slots, booking_id)
+        # Fill in a slot offered to a customer on the waitlist.
+        initial = {
+            field: request.GET[field]
+            for field in ('date', 'time', 'party_size')
+            if field in request.GET}
+        booking_form = BookingForm(
+            slots, booking_id, initial=initial, restaurant=restaurant)
 
     context = {
         'booking_form': booking_form,
@@ -62,20 +106,106 @@ def make_booking(request):
     return render(request, 'bookings/make_booking.html', context)
 
 
-def booking_confirmed(request, booking_id):
+def booking_made_redirect(request, booking_id):
+    """
+    Assign the redirect after a booking based on who is making it.
+    """
+    if request.user.is_superuser:
+        return redirect('manage_bookings')
+    return redirect(reverse('booking_confirmed', args=[booking_id]))
+
+
+def join_waitlist(request):
+    """
+    Add the customer to the waitlist for a table when
+    none are available at the time they wanted.
+    """
+    restaurant = request.restaurant
+    slots = create_booking_slots(
+        restaurant.opening_time, restaurant.closing_time)
+
+    if request.method == 'POST':
+        waitlist_form = WaitlistForm(
+            slots, data=request.POST, restaurant=restaurant)
+        if waitlist_form.is_valid():
+            entry = waitlist_form.save(commit=False)
+            if request.user.is_authenticated:
+                entry.customer = request.user
+            entry.save()
+            messages.success(
+                request, 'You are on the waitlist. We will email you if '
+                'a table becomes available.')
+            return redirect('home')
+        messages.error(
+            request, 'Failed to join the waitlist. Please check the form.')
+    else:
+        # Start from the details of the booking that could not be made.
+        initial = {
+            field: request.GET[field]
+            for field in ('date', 'party_size', 'name', 'email',
+                          'phone_number')
+            if field in request.GET}
+        if 'time' in request.GET:
+            initial['earliest_time'] = request.GET['time']
+        waitlist_form = WaitlistForm(slots, initial=initial)
+
+    context = {
+        'waitlist_form': waitlist_form,
+    }
+
+    return render(request, 'bookings/join_waitlist.html', context)
+
+
+async def booking_confirmed(request, booking_id):
     """
     Confirm a successful booking.
     """
-    booking = get_object_or_404(Booking, id=booking_id)
+    booking = await sync_to_async(get_object_or_404)(
+        Booking.objects.select_related('customer', 'restaurant'),
+        id=booking_id)
 
     context = {
         'booking': booking,
     }
 
-    return render(request, 'bookings/booking_confirmed.html', context)
+    return await arender(request, 'bookings/booking_confirmed.html', context)
+
+
+async def availability(request):
+    """
+    Check whether a table is available for the date, time and party size
+    in the query string and return the result as JSON. Without a time
+    the booking slots with a table available on the date are returned.
+    """
+    try:
+        selected_date = datetime.date.fromisoformat(request.GET['date'])
+        selected_time = (
+            datetime.time.fromisoformat(request.GET['time'])
+            if 'time' in request.GET else None)
+        party_size = int(request.GET['party_size'])
+    except (KeyError, ValueError):
+        return JsonResponse(
+            {'error': 'A valid date, time and party_size are required.'},
+            status=400)
+
+    if party_size not in dict(Booking.PARTY_SIZE_CHOICES):
+        return JsonResponse({'error': 'Invalid party size.'}, status=400)
+
+    if selected_time is None:
+        slots = await sync_to_async(available_slots)(
+            request.restaurant, selected_date, party_size)
+        return JsonResponse({'slots': slots})
+
+    end = booking_end_time(selected_time, party_size)
+    tables = await sync_to_async(find_tables)(
+        selected_date, selected_time, end, party_size, '',
+        request.restaurant)
+
+    return JsonResponse({'available': bool(tables)})
 
 
 @login_required
+@read_from_replica
 def manage_bookings(request):
     """
     List current and future bookings for the restaurant owner.
@@ -84,14 +214,212 @@ def manage_bookings(request):
         messages.error(request, 'Sorry this area is for the restaurant owner.')
         return redirect('home')
 
-    bookings = Booking.objects.filter(date__gte=datetime.date.today())
+    bookings = Booking.objects.filter(
+        restaurant=request.restaurant,
+        date__gte=datetime.date.today()).prefetch_related('tables')
     context = {
-        'bookings': bookings
+        'bookings': bookings,
+        # Changes after the page is read are streamed to it.
+        'last_event': last_event_id(),
     }
     return render(request, 'bookings/manage_bookings.html', context)
 
 
+@async_login_required
+async def booking_events(request):
+    """
+    Stream changes to the restaurant's bookings to the owner's
+    dashboard as server sent events, from the event id the page was
+    read at or the last one the browser received. Under ASGI the stream
+    waits for changes in the event loop rather than holding a thread.
+    """
+    if not request.user.is_superuser:
+        messages.error(request, 'Sorry this area is for the restaurant owner.')
+        return redirect('home')
+
+    after = request.headers.get('Last-Event-ID') or request.GET.get('after')
+    try:
+        after = int(after)
+    except (TypeError, ValueError):
+        after = await sync_to_async(last_event_id)()
+
+    if isinstance(request, ASGIRequest):
+        response = AsyncStreamingHttpResponse(
+            aevent_stream(request, request.restaurant, after),
+            content_type='text/event-stream')
+    else:
+        response = StreamingHttpResponse(
+            event_stream(request, request.restaurant, after),
+            content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx holding back the events until the stream ends.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
+@read_from_replica
+def occupancy(request):
+    """
+    Report the share of seats booked and the largest party which can
+    still be seated in each booking slot of a day to the restaurant owner.
+    """
+    if not request.user.is_superuser:
+        messages.error(request, 'Sorry this area is for the restaurant owner.')
+        return redirect('home')
+
+    try:
+        selected_date = datetime.date.fromisoformat(
+            request.GET.get('date', datetime.date.today().isoformat()))
+    except ValueError:
+        return JsonResponse(
+            {'error': 'Dates should be given as YYYY-MM-DD.'}, status=400)
+
+    restaurant = request.restaurant
+    day = load_occupancy(selected_date, restaurant=restaurant)
+    utilisation = day.utilisation()
+    max_party = largest_parties(day)
+    slots = []
+    for slot, label in create_booking_slots(
+            restaurant.opening_time, restaurant.closing_time):
+        index = slot_index(slot)
+        slots.append({
+            'time': label,
+            'utilisation': round(utilisation[index], 3),
+            'max_party': max_party[index],
+        })
+    return JsonResponse({'date': selected_date.isoformat(), 'slots': slots})
+
+
+@login_required
+@read_from_replica
+def utilisation(request):
+    """
+    Report the covers and share of seats booked by weekday and slot,
+    and by date, between two dates to the restaurant owner. The report
+    is read from the slot rollups so months can be covered at once.
+    """
+    if not request.user.is_superuser:
+        messages.error(request, 'Sorry this area is for the restaurant owner.')
+        return redirect('home')
+
+    try:
+        end = datetime.date.fromisoformat(
+            request.GET.get('end', datetime.date.today().isoformat()))
+        start = datetime.date.fromisoformat(
+            request.GET.get(
+                'start', (end - datetime.timedelta(days=182)).isoformat()))
+    except ValueError:
+        return JsonResponse(
+            {'error': 'Dates should be given as YYYY-MM-DD.'}, status=400)
+    if start > end:
+        return JsonResponse(
+            {'error': 'The start date should be before the end.'},
+            status=400)
+
+    return JsonResponse(utilisation_report(request.restaurant, start, end))
+
+
+@login_required
+@read_from_replica
+def search_bookings(request):
+    """
+    Find the restaurant's bookings by part of a name, email or phone
+    number for the restaurant owner, allowing for typos.
+    """
+    if not request.user.is_superuser:
+        messages.error(request, 'Sorry this area is for the restaurant owner.')
+        return redirect('home')
+
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse(
+            {'error': 'Give a name, email or phone number to search for.'},
+            status=400)
+
+    results = run_search(query, request.restaurant)
+    return JsonResponse({'results': [
+        {
+            'id': booking.id,
+            'name': booking.name,
+            'email': booking.email,
+            'phone_number': booking.phone_number,
+            'date': booking.date.isoformat(),
+            'time': booking.time.strftime('%H:%M'),
+            'party_size': booking.party_size,
+            'score': score,
+        }
+        for booking, score in results]})
+
+
+@login_required
+@read_from_replica
+def export_bookings(request):
+    """
+    Stream the restaurant's bookings between two dates to the owner
+    as a CSV or JSON Lines download.
+    """
+    if not request.user.is_superuser:
+        messages.error(request, 'Sorry this area is for the restaurant owner.')
+        return redirect('home')
+
+    export_format = request.GET.get('format', 'csv')
+    try:
+        start = datetime.date.fromisoformat(
+            request.GET.get('start', datetime.date.today().isoformat()))
+        end = datetime.date.fromisoformat(
+            request.GET.get('end', start.isoformat()))
+    except ValueError:
+        return JsonResponse(
+            {'error': 'Dates should be given as YYYY-MM-DD.'}, status=400)
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse(
+            {'error': 'Format should be csv or jsonl.'}, status=400)
+
+    response = StreamingHttpResponse(
+        generate_export(
+            start, end, export_format, restaurant=request.restaurant),
+        content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = (
+        f'attachment; filename="bookings-{start}-{end}.{export_format}"')
+    return response
+
+
+@login_required
+def import_bookings(request):
+    """
+    Import a CSV or JSON Lines file of bookings uploaded by the
+    restaurant owner and return a report for each row as JSON.
+    """
+    if not request.user.is_superuser:
+        messages.error(request, 'Sorry only the restaurant owner can do this.')
+        return redirect('home')
+
+    upload = request.FILES.get('file')
+    if request.method != 'POST' or upload is None:
+        return JsonResponse(
+            {'error': 'POST a file of bookings to import.'}, status=400)
+
+    import_format = request.POST.get(
+        'format', upload.name.rsplit('.', 1)[-1].lower())
+    if import_format not in IMPORT_FORMATS:
+        return JsonResponse(
+            {'error': 'Format should be csv or jsonl.'}, status=400)
+
+    try:
+        rows = read_upload(upload, import_format)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse(
+            {'error': 'The file could not be read.'}, status=400)
+
+    report = run_import(
+        rows, send_emails=request.POST.get('send_emails') == 'on',
+        restaurant=request.restaurant)
+    return JsonResponse(report)
+
+
+@login_required
+@read_from_replica
 def booking_detail(request, booking_id):
     """
     Display the details of an individual booking for the restaurant owner.
@@ -142,20 +470,118 @@ def toggle_updated(request, booking_id):
     return redirect('manage_bookings')
 
 
+def posted_booking_ids(request):
+    """
+    Return the booking ids posted as booking_id values, or None when
+    there are none or any is not a number.
+    """
+    try:
+        ids = [int(value) for value in request.POST.getlist('booking_id')]
+    except ValueError:
+        return None
+    return ids or None
+
+
 @login_required
-def my_bookings(request):
+def mark_bookings_seen(request):
+    """
+    Turn off the updated flag of several bookings at once for the
+    restaurant owner, returning the ids of the bookings changed and of
+    those which could not be found as JSON.
+    """
+    if not request.user.is_superuser:
+        messages.error(request, 'Sorry only the restaurant owner can do this.')
+        return redirect('home')
+
+    booking_ids = posted_booking_ids(request)
+    if request.method != 'POST' or booking_ids is None:
+        return JsonResponse(
+            {'error': 'POST the booking_id of each booking.'}, status=400)
+
+    bookings = Booking.objects.filter(
+        restaurant=request.restaurant, id__in=booking_ids)
+    with transaction.atomic():
+        flags = dict(bookings.select_for_update().values_list(
+            'id', 'updated'))
+        changed = sorted(
+            booking_id for booking_id, updated in flags.items() if updated)
+        Booking.objects.filter(id__in=changed).update(updated=False)
+        # Updating the rows sends no signals to tell the dashboards.
+        publish_bookings(
+            getattr(request.restaurant, 'id', None), changed,
+            BookingEvent.UPDATED)
+    return JsonResponse({
+        'updated': changed,
+        'missing': [
+            booking_id for booking_id in booking_ids
+            if booking_id not in flags],
+    })
+
+
+@login_required
+def assign_table_numbers(request):
+    """
+    Set the table numbers of several bookings at once for the restaurant
+    owner, from booking_id and table_numbers values posted in pairs,
+    returning the ids of the bookings changed and of those which could
+    not be found as JSON.
+    """
+    if not request.user.is_superuser:
+        messages.error(request, 'Sorry only the restaurant owner can do this.')
+        return redirect('home')
+
+    booking_ids = posted_booking_ids(request)
+    table_numbers = request.POST.getlist('table_numbers')
+    max_length = Booking._meta.get_field('table_numbers').max_length
+    if (request.method != 'POST' or booking_ids is None or
+            len(table_numbers) != len(booking_ids)):
+        return JsonResponse(
+            {'error': 'POST a booking_id and table_numbers for each '
+                      'booking.'}, status=400)
+    if any(len(numbers) > max_length for numbers in table_numbers):
+        return JsonResponse(
+            {'error': f'Table numbers can be at most {max_length} '
+                      'characters.'}, status=400)
+
+    assigned = dict(zip(booking_ids, table_numbers))
+    with transaction.atomic():
+        bookings = list(Booking.objects.filter(
+            restaurant=request.restaurant,
+            id__in=booking_ids).select_for_update().only(
+                'id', 'restaurant', 'table_numbers'))
+        for booking in bookings:
+            booking.table_numbers = assigned[booking.id]
+        Booking.objects.bulk_update(bookings, ['table_numbers'])
+        # Bulk updates send no signals to tell the dashboards.
+        publish_bookings(
+            getattr(request.restaurant, 'id', None),
+            [booking.id for booking in bookings], BookingEvent.UPDATED)
+    found = {booking.id for booking in bookings}
+    return JsonResponse({
+        'updated': sorted(found),
+        'missing': [
+            booking_id for booking_id in booking_ids
+            if booking_id not in found],
+    })
+
+
+@async_login_required
+@read_from_replica
+async def my_bookings(request):
     """
     List the current and future bookings created by the logged in user.
     """
     customer_bookings = Booking.objects.filter(
-        customer__isnull=False, customer=request.user.id)
-    bookings = customer_bookings.filter(date__gte=datetime.date.today())
+        customer__isnull=False, customer=request.user.id).select_related(
+            'restaurant')
+    bookings = await sync_to_async(list)(
+        customer_bookings.filter(date__gte=datetime.date.today()))
 
     context = {
         'bookings': bookings
     }
 
-    return render(request, 'bookings/my_bookings.html', context)
+    return await arender(request, 'bookings/my_bookings.html', context)
 
 
 @login_required
@@ -163,65 +589,62 @@ def update_booking(request, booking_id):
     """
     Allow the logged in user to make changes to an existing booking.
     """
-    restaurant = Restaurant.objects.get(name="Il oro d'Italia")
+    # Get the current booking
+    booking = get_object_or_404(Booking, id=booking_id)
+
+    # The booking stays at the restaurant it was made for.
+    restaurant = booking.restaurant or request.restaurant
     # Create time slots between restaurant opening and closing
     # for the booking form time selection.
     slots = create_booking_slots(
         restaurant.opening_time, restaurant.closing_time)
 
-    # Get the current booking
-    booking = get_object_or_404(Booking, id=booking_id)
-
     if request.method == 'POST':
         booking_form = BookingForm(
-            slots, booking_id, data=request.POST, instance=booking)
+            slots, booking_id, data=request.POST, instance=booking,
+            restaurant=restaurant)
         if booking_form.is_valid():
+            # Set the upated flag so the restaurant owner knows the
+            # booking has been changed
+            if not request.user.is_superuser:
+                booking.updated = True
             # If only the customer information has changed
             # save the form without updating the booked tables
             if ('date' not in booking_form.changed_data and
                     'time' not in booking_form.changed_data and
                     'party_size' not in booking_form.changed_data):
                 booking_form.save()
-                # Assign the redirect based on who is making the booking
-                if request.user.is_superuser:
-                    messages.success(request, 'Booking successfully updated.')
-                    return redirect('manage_bookings')
-                else:
-                    # Set the upated flag so the restaurant owner knows the
-                    # booking has been changed
-                    booking.updated = True
-                    booking.save()
-                    messages.success(request, 'Booking successfully updated.')
-                    return redirect('my_bookings')
             else:
-                # If the booking information has changed remove original tables
-                # and add the newly selected tables to the booking
+                # Otherwise only the tables which have changed are removed
+                # and added. The table search keeps the current tables
+                # when they still suit the booking, along with the table
+                # numbers given by the owner. The change is made in one
+                # transaction so that the freed tables are only offered
+                # to the waitlist once it is done.
                 tables = booking_form.cleaned_data['tables']
-                booking.tables.clear()
-                booking.table_numbers = ''
-                if isinstance(tables, list):
+                if not isinstance(tables, list):
+                    tables = [tables]
+                new_ids = {table.id for table in tables}
+                with transaction.atomic():
+                    current_ids = set(
+                        booking.tables.values_list('id', flat=True))
+                    if new_ids != current_ids:
+                        booking.table_numbers = ''
+                        booking.tables.remove(*(current_ids - new_ids))
                     booking_form.save()
-                    booking.tables.set(tables)
-                else:
-                    booking_form.save()
-                    booking.tables.add(tables)
-                # Assign the redirect based on who is making the booking
-                if request.user.is_superuser:
-                    messages.success(request, 'Booking successfully updated.')
-                    return redirect('manage_bookings')
-                else:
-                    # Set the upated flag so the restaurant owner knows the
-                    # booking has been changed
-                    booking.updated = True
-                    booking.save()
-                    messages.success(request, 'Booking successfully updated.')
-                    return redirect('my_bookings')
+                    booking.tables.add(*(new_ids - current_ids))
+            messages.success(request, 'Booking successfully updated.')
+            # Assign the redirect based on who is making the booking
+            if request.user.is_superuser:
+                return redirect('manage_bookings')
+            return redirect('my_bookings')
         else:
             messages.error(
                 request,
                 'Failed to update the booking. Please check the form.')
     else:
-        booking_form = BookingForm(slots, booking_id, instance=booking)
+        booking_form = BookingForm(
+            slots, booking_id, instance=booking, restaurant=restaurant)
 
     context = {
         'booking_form': booking_form,
@@ -0,0 +1,89 @@
+""" Offer tables freed by cancelled or moved bookings to the waitlist. """
+from datetime import datetime, time
+from urllib.parse import urlencode
+from django.contrib.sites.models import Site
+from django.dispatch import receiver
+from django.urls import reverse
+
+from .models import WaitlistEntry
+from .signals import tables_freed
+from .check_availability import select_tables
+from .durations import booking_duration, longest_duration
+from .occupancy import load_occupancy
+from .confirmation_email import build_waitlist_offer_email, dispatch_email
+
+
+def shift_time(base_date, base_time, delta):
+    """
+    Add a timedelta to a time, keeping the result within the same day.
+    """
+    shifted = datetime.combine(base_date, base_time) + delta
+    if shifted.date() < base_date:
+        return time.min
+    if shifted.date() > base_date:
+        return time.max
+    return shifted.time()
+
+
+def booking_url(entry, offer_time):
+    """
+    Return a link to the booking form filled in with the offered slot.
+    """
+    query = urlencode({
+        'date': entry.date.isoformat(),
+        'time': offer_time.strftime('%H:%M:%S'),
+        'party_size': entry.party_size,
+    })
+    # Link to the restaurant the customer is waiting for.
+    kwargs = {}
+    if entry.restaurant_id:
+        kwargs['restaurant_slug'] = entry.restaurant.slug
+    domain = Site.objects.get_current().domain
+    return f"https://{domain}{reverse('make_booking', kwargs=kwargs)}?{query}"
+
+
+def match_waitlist(freed_date, start, end, restaurant=None):
+    """
+    Offer a freed slot to the first waiting customer it can seat.
+    Only the entries for the same restaurant and date, small enough to
+    fit in the free tables and who could arrive while the tables are
+    free are checked. Returns the entry offered the table, if any.
+    """
+    if end <= start:
+        # The freed booking finished at midnight.
+        end = time.max
+    occupancy = load_occupancy(freed_date, restaurant=restaurant)
+    free_seats = occupancy.free_seats(start, end)
+    if not free_seats:
+        return None
+
+    # A booking starting up to the longest booking length before the
+    # freed interval could also use the freed tables.
+    entries = WaitlistEntry.objects.filter(
+        date=freed_date, party_size__lte=free_seats, offered=False,
+        earliest_time__lt=end,
+        latest_time__gt=shift_time(freed_date, start, -longest_duration()))
+    if restaurant is not None:
+        entries = entries.filter(restaurant=restaurant)
+
+    for entry in entries:
+        # Offer the start of the freed interval where the customer
+        # can arrive then, otherwise the nearest time they can.
+        offer_time = min(max(start, entry.earliest_time), entry.latest_time)
+        offer_end = shift_time(
+            freed_date, offer_time,
+            booking_duration(entry.party_size, offer_time))
+        if select_tables(
+                occupancy, offer_time, offer_end, entry.party_size):
+            entry.offered = True
+            entry.save(update_fields=['offered'])
+            dispatch_email(build_waitlist_offer_email(
+                entry, offer_time, booking_url(entry, offer_time)))
+            return entry
+    return None
+
+
+@receiver(tables_freed)
+def offer_freed_tables(sender, date, start, end, restaurant=None, **kwargs):
+    """ Check the waitlist whenever tables are released. """
+    match_waitlist(date, start, end, restaurant)
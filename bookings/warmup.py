@@ -0,0 +1,84 @@
+""" Fill the caches which are empty after a deploy or restart. """
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection
+from django.template.loader import get_template
+
+from restaurant.branches import invalidate_restaurants, restaurants
+from .check_availability import create_booking_slots
+from .forms import BookingForm
+from .occupancy import load_numpy
+from .slot_cache import warm_days
+from .templatetags.booking_forms import as_cached_crispy_field, \
+    rendered_fields
+
+# The pages served most, whose templates are parsed once per worker.
+WARM_TEMPLATES = (
+    'restaurant/index.html',
+    'bookings/make_booking.html',
+    'bookings/booking_confirmed.html',
+    'bookings/my_bookings.html',
+    'bookings/manage_bookings.html',
+    'bookings/includes/booking_card.html',
+)
+
+
+def warm_restaurants():
+    """
+    Reload the restaurants and their slot configuration into the cache.
+    Returns the number of restaurants.
+    """
+    invalidate_restaurants()
+    return len(restaurants())
+
+
+def warm_restaurant_days(restaurant, days):
+    """
+    Cache a restaurant's slots on the days, closing the database
+    connection afterwards when run in a thread of the worker pool.
+    """
+    try:
+        return warm_days(restaurant, days)
+    finally:
+        connection.close()
+
+
+def warm_slots(days=14, workers=4, start=None):
+    """
+    Cache the booking slots free for each party size at every restaurant
+    on each of the days from the start date, by default today. Each
+    restaurant is loaded in bulk by one of at most workers threads.
+    Returns the number of days cached.
+    """
+    start = start or datetime.date.today()
+    dates = [start + datetime.timedelta(days=offset)
+             for offset in range(days)]
+    branches = list(restaurants().values())
+    if workers <= 1:
+        return sum(warm_days(restaurant, dates) for restaurant in branches)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(
+            lambda restaurant: warm_restaurant_days(restaurant, dates),
+            branches))
+
+
+def warm_process():
+    """
+    Fill the caches held by each worker process: NumPy, the templates
+    of the main pages and the rendered fields of each restaurant's new
+    booking form. Returns the number of entries produced, which leaves
+    out fields rendered but never cached, such as those with a value
+    of their own.
+    """
+    entries = int(load_numpy() is not None)
+    for name in WARM_TEMPLATES:
+        get_template(name)
+        entries += 1
+    cached_fields = len(rendered_fields)
+    for restaurant in restaurants().values():
+        form = BookingForm(create_booking_slots(
+            restaurant.opening_time, restaurant.closing_time), '',
+            restaurant=restaurant)
+        for field in form:
+            as_cached_crispy_field(field)
+    return entries + len(rendered_fields) - cached_fields
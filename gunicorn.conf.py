@@ -0,0 +1,64 @@
+""" Gunicorn settings, read when it is started in the project directory. """
+import os
+import threading
+
+wsgi_app = 'il_oro_ditalia.wsgi'
+
+# Load the site once in the master process so that each worker starts
+# as a copy of it rather than importing everything again.
+preload_app = True
+
+# Open dashboards each hold a thread for their stream of booking
+# changes, so workers serve several requests at a time.
+worker_class = 'gthread'
+threads = 8
+
+
+def when_ready(server):
+    """
+    Load the URLs, views and admin, which Django otherwise loads on the
+    first request, before the workers are started.
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.urls import get_resolver
+    # Reading the patterns imports the URLconf, and with it the views
+    # and the admin modules.
+    patterns = get_resolver().url_patterns
+    server.log.info(
+        'Loaded %s URL patterns before starting the workers.', len(patterns))
+
+
+def post_fork(server, worker):
+    """
+    Fill each new worker's caches when WARM_CACHES is set. The caches
+    held by the worker are filled before it serves requests. The
+    restaurants and slots are cached in the background by the first
+    worker, or by every worker when each has its own cache.
+    """
+    if not os.environ.get('WARM_CACHES'):
+        return
+    # pylint: disable=import-outside-toplevel
+    from django.conf import settings
+    from django.db import connection, connections
+    from bookings.warmup import warm_process, warm_restaurants, warm_slots
+    entries = warm_process()
+    # Requests are served by other threads, which open connections of
+    # their own.
+    connections.close_all()
+    server.log.info('Worker %s warmed %s cached entries.', worker.pid, entries)
+
+    local_cache = settings.CACHES['default']['BACKEND'].endswith(
+        'LocMemCache')
+    if local_cache or worker.age == 1:
+        def warm_shared():
+            try:
+                warm_restaurants()
+                days = warm_slots(
+                    int(os.environ.get('WARM_CACHES_DAYS', 14)))
+                server.log.info(
+                    'Worker %s cached %s restaurant days of slots.',
+                    worker.pid, days)
+            finally:
+                connection.close()
+
+        threading.Thread(target=warm_shared, daemon=True).start()
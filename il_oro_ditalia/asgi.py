@@ -9,8 +9,48 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'il_oro_ditalia.settings')
 
-application = get_asgi_application()
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    The Django ASGI handler, which also sends the async content of
+    AsyncStreamingHttpResponse as it is produced.
+    """
+    async def send_response(self, response, send):
+        # pylint: disable=import-outside-toplevel
+        from il_oro_ditalia.asynchronous import AsyncStreamingHttpResponse
+        if not isinstance(response, AsyncStreamingHttpResponse):
+            return await super().send_response(response, send)
+
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()]
+        headers += [
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()]
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        try:
+            async for part in response.async_content:
+                await send({
+                    'type': 'http.response.body',
+                    'body': response.make_bytes(part),
+                    'more_body': True,
+                })
+            await send({'type': 'http.response.body'})
+        finally:
+            await response.async_content.aclose()
+            await sync_to_async(response.close, thread_sensitive=True)()
+        return None
+
+
+django.setup(set_prefix=False)
+application = StreamingASGIHandler()
@@ -0,0 +1,51 @@
+""" Helpers for the async views served by the ASGI application. """
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+
+
+# The Django 3.2 ORM and the template context processors (which read the
+# session and user) can only be used from synchronous code, so they are run
+# in the thread sensitive executor shared with the rest of the request.
+arender = sync_to_async(render)
+
+
+async def aget_user(request):
+    """
+    Load the user for the request outside of the event loop. Once loaded
+    the lazy request.user object can be used freely in async code.
+    """
+    def load_user():
+        # Reading any attribute evaluates the lazy object.
+        getattr(request.user, 'pk', None)
+        return request.user
+
+    return await sync_to_async(load_user)()
+
+
+def async_login_required(view_func):
+    """
+    Async equivalent of the login_required decorator which is not
+    able to wrap coroutine views in Django 3.2.
+    """
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class AsyncStreamingHttpResponse(StreamingHttpResponse):
+    """
+    A streaming response whose content is an async iterator, sent by
+    the ASGI application from the event loop without holding a thread.
+    Django 3.2 only streams sync iterators, which are read in the event
+    loop and would block it while waiting.
+    """
+    def __init__(self, async_content, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.async_content = async_content
@@ -0,0 +1,103 @@
+""" Send the reads of the list and reporting pages to a replica. """
+import asyncio
+import time
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+# Set when the visitor has written recently and holds the time until
+# which their reads stay on the primary.
+STICKY_COOKIE = 'primary_until'
+
+
+class RoutingState:
+    """ How the queries of the current request are routed. """
+    def __init__(self, sticky=False):
+        self.sticky = sticky
+        self.replica = False
+        self.wrote = False
+
+    def read_from(self):
+        """ Return the database alias reads should use, if not default. """
+        if self.replica and not (self.sticky or self.wrote):
+            return settings.DATABASE_REPLICA
+        return None
+
+
+# Holds a mutable state so that writes made in the threads running the
+# synchronous parts of async views are seen by the rest of the request.
+routing_state = ContextVar('routing_state', default=None)
+
+
+class ReplicaRouter:
+    """
+    Route reads made by views decorated with read_from_replica to the
+    replica database, unless the visitor has written recently. All
+    writes go to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        state = routing_state.get()
+        if state is not None:
+            return state.read_from()
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as the primary.
+        return True
+
+
+def read_from_replica(view_func):
+    """
+    Mark a view, sync or async, whose reads can be served by the replica.
+    """
+    def start():
+        state = routing_state.get()
+        if state is not None:
+            state.replica = True
+
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            start()
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        start()
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaStickinessMiddleware(MiddlewareMixin):
+    """
+    Track the writes made by each request. After a visitor writes, a
+    cookie keeps their reads on the primary for REPLICA_STICKY_SECONDS
+    so pages straight after a booking, update or cancellation never
+    miss the change on a lagging replica.
+    """
+    def process_request(self, request):
+        try:
+            sticky = float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            sticky = False
+        # The state is kept for the rest of the request, including
+        # any streamed content, and replaced by the next request.
+        routing_state.set(RoutingState(sticky))
+
+    def process_response(self, request, response):
+        state = routing_state.get()
+        if state is not None and state.wrote and settings.DATABASE_REPLICA:
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(time.time() + settings.REPLICA_STICKY_SECONDS),
+                max_age=settings.REPLICA_STICKY_SECONDS, httponly=True,
+                samesite='Lax')
+        return response
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 import os
+import sys
 from pathlib import Path 
 
 from django.contrib.messages import constants as messages
@@ -18,7 +19,7 @@ if os.path.isfile('env.py'):
     import env
 
 development = os.environ.get('DEVELOPMENT', False)
-testing = os.environ.get('TESTING', False)
+testing = os.environ.get('TESTING', False) or sys.argv[1:2] == ['test']
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -35,12 +36,16 @@ DEBUG = True
 #'DEVELOPMENT' in os.environ
 
 ALLOWED_HOSTS = ["italian-restaurant-website.herokuapp.com", "localhost"]
+# Restaurants served on their own domain names.
+ALLOWED_HOSTS += os.environ.get('RESTAURANT_HOSTS', '').split()
 
 
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # The admin modules are loaded with the URLs rather than at start up
+    # so management commands do not import them.
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -53,16 +58,21 @@ INSTALLED_APPS = [
     'cloudinary_storage',
     'cloudinary',
     'crispy_forms',
+    'accounts',
     'restaurant',
     'bookings',
+    'profiling',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'il_oro_ditalia.routers.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.CachedAuthenticationMiddleware',
+    'restaurant.middleware.RestaurantMiddleware',
+    'profiling.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -104,6 +114,9 @@ EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASS')
 DEFAULT_FROM_EMAIL = os.environ.get('EMAIL_HOST_USER')
+# Send booking emails from a background thread rather than the request.
+# Tests send them straight away so the outbox can be checked reliably.
+BOOKING_EMAIL_ASYNC = not testing
 
 ACCOUNT_AUTHENTICATION_METHOD = 'username_email'
 ACCOUNT_EMAIL_REQUIRED = True
@@ -139,6 +152,82 @@ DATABASES = {
     'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
 }
 
+# The list and reporting pages read from a replica when one is set.
+# Two SQLite files can stand in for the primary and the replica locally.
+if os.environ.get('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = dj_database_url.parse(
+        os.environ.get('DATABASE_REPLICA_URL'))
+# Tests read from the primary, as nothing is copied to a test replica.
+# The replica tests route reads to it themselves.
+DATABASE_REPLICA = (
+    'replica' if 'replica' in DATABASES and not testing else None)
+DATABASE_ROUTERS = ['il_oro_ditalia.routers.ReplicaRouter']
+# How long a visitor's reads stay on the primary after they write,
+# so they see their own changes while the replica catches up.
+REPLICA_STICKY_SECONDS = 15
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Use a shared cache such as Redis or Memcached in production so that
+# every worker sees the same sessions and cache invalidations.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+# The local memory cache is held by each worker process, so a change
+# made through one worker is not seen by the others. Sessions, logged
+# in users and booking submissions are only cached when every worker
+# shares the cache, and are read from the database otherwise.
+SHARED_CACHE = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Sessions are written through to the database and read from the cache.
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cached_db' if SHARED_CACHE
+    else 'django.contrib.sessions.backends.db')
+AUTH_USER_CACHE_TIMEOUT = 60 * 15
+# How long repeated booking form submissions are recognised for.
+BOOKING_IDEMPOTENCY_TTL = 60 * 10
+# How long the restaurants used to route each request are cached for.
+RESTAURANT_CACHE_TIMEOUT = 60 * 15
+# How long the booking slots free on each day are cached for. They are
+# also removed whenever the day's bookings change.
+SLOT_CACHE_TIMEOUT = 60 * 15
+
+# Booking lengths in minutes. The first matching rule is used. Rules can
+# limit the start time with 'from' and 'until' ('HH:MM') and the party
+# size with 'min_party' and 'max_party', for example a 90 minute lunch:
+# {'until': '15:00', 'minutes': 90}
+BOOKING_DEFAULT_DURATION = 120
+BOOKING_DURATION_RULES = []
+
+# Open dashboards are sent booking changes through streams which check
+# for changes every BOOKING_STREAM_POLL seconds and end after
+# BOOKING_STREAM_SECONDS, when the browser reconnects. Changes are kept
+# for BOOKING_EVENT_SECONDS so that reconnecting dashboards miss none,
+# and deleted afterwards by the prune_booking_events command. Under
+# ASGI the streams wait in the event loop. A WSGI worker holds at most
+# BOOKING_STREAMS open, of its 8 threads, and further dashboards are
+# sent the changes waiting and reconnect after BOOKING_STREAM_BUSY_RETRY
+# seconds.
+BOOKING_STREAM_POLL = 1
+BOOKING_STREAM_SECONDS = 30
+BOOKING_STREAMS = 2
+BOOKING_STREAM_BUSY_RETRY = 5
+BOOKING_EVENT_SECONDS = 60 * 10
+
+# Requests profiled by the owner save their call stacks here. Profiling
+# tokens are shown in the admin and last PROFILE_TOKEN_SECONDS.
+PROFILE_DIR = os.environ.get(
+    'PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILE_TOKEN_SECONDS = 60 * 60
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
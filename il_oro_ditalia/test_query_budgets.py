@@ -0,0 +1,166 @@
+""" Query budgets for every page of the bookings and restaurant apps. """
+import datetime
+import json
+import os
+import time
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from restaurant.models import Restaurant, Table
+from restaurant.urls import urlpatterns as restaurant_urls
+from bookings.models import Booking
+from bookings.urls import urlpatterns as booking_urls
+
+# The most queries each page may make, for any visitor and any amount
+# of data, with the method and data used to request it. Pages taking a
+# booking id are given a booking made by the customer.
+QUERY_BUDGETS = {
+    'home': ('get', {}, 1),
+    'make_booking': ('get', {}, 1),
+    'booking_confirmed': ('get', {}, 2),
+    'availability': ('get', {'date': '2030-01-04', 'party_size': 2}, 3),
+    'join_waitlist': ('get', {}, 1),
+    'occupancy': ('get', {'date': '2030-01-04'}, 3),
+    'utilisation': ('get', {}, 4),
+    'manage_bookings': ('get', {}, 4),
+    'booking_events': ('get', {'after': 0}, 3),
+    'search_bookings': ('get', {'q': 'nmae'}, 4),
+    'export_bookings': (
+        'get', {'start': '2030-01-01', 'end': '2030-01-31'}, 4),
+    'import_bookings': ('post', {}, 1),
+    'my_bookings': ('get', {}, 2),
+    'booking_detail': ('get', {}, 3),
+    'add_table_no': ('post', {'table_numbers': '7'}, 3),
+    'toggle_updated': ('get', {}, 3),
+    'mark_bookings_seen': ('post', {'booking_id': [1, 2, 3]}, 4),
+    'assign_table_numbers': (
+        'post', {'booking_id': [1, 2, 3], 'table_numbers': ['1', '2', '3']},
+        4),
+    'delete_booking': ('get', {}, 5),
+    'update_booking': ('get', {}, 3),
+}
+# Numbers of bookings seeded, to show query counts do not grow with data.
+DATASET_SIZES = (2, 200)
+# Pages listing the bookings take longer with more of them, but none
+# may slow down faster than the bookings grow. Times on the smallest
+# dataset are taken as at least this many milliseconds so that timer
+# noise on the quickest pages does not fail the test.
+MIN_PAGE_MS = 1
+VISITORS = ('anonymous', 'customer', 'owner')
+
+
+# The stream of booking changes ends once it has sent those waiting.
+# The budgets are those of production, whose workers share a cache.
+@override_settings(
+    BOOKING_STREAM_SECONDS=0, SHARED_CACHE=True,
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class TestQueryBudgets(TestCase):
+    """
+    Request every named page as each kind of visitor over small and
+    larger sets of bookings. Each page must stay within its query
+    budget and make the same number of queries whatever the amount of
+    data, as a count growing with the bookings is the sign of a query
+    per row, and its time must grow no faster than the bookings. Set
+    QUERY_BUDGET_REPORT to a file name to save the query counts and
+    times of every request as JSON.
+    """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
+        self.tables = [
+            Table.objects.create(restaurant=self.restaurant, size=size)
+            for size in (2, 2, 4, 4, 6)]
+        self.customer = User.objects.create_user(
+            'john', 'john@email.com', 'johnpassword')
+        User.objects.create_superuser(
+            'owner', 'owner@email.com', 'ownerpassword')
+        self.seeded = 0
+
+    def seed(self, count):
+        """ Add bookings until there are count in the restaurant. """
+        for number in range(self.seeded, count):
+            booking = Booking.objects.create(
+                restaurant=self.restaurant,
+                date=datetime.date(2030, 1, 4) + datetime.timedelta(
+                    days=number % 7),
+                time=datetime.time(12 + number % 10, 00), party_size=2,
+                name=f'Name {number}', email='test@email.com',
+                phone_number='01234567890', customer=self.customer,
+                table_numbers=str(number))
+            booking.tables.add(self.tables[number % len(self.tables)])
+        self.seeded = count
+
+    def measure(self, name, visitor):
+        """
+        Request a page as a visitor and return the number of queries
+        and the time taken. The page is requested once beforehand so
+        that only queries made on every request are counted, and the
+        changes made by the requests are rolled back.
+        """
+        self.client.logout()
+        if visitor == 'customer':
+            self.client.login(username='john', password='johnpassword')
+        elif visitor == 'owner':
+            self.client.login(username='owner', password='ownerpassword')
+
+        method, data, _ = QUERY_BUDGETS[name]
+        pattern = next(
+            pattern for pattern in booking_urls + restaurant_urls
+            if pattern.name == name)
+        args = [Booking.objects.filter(customer=self.customer).first().id
+                ] if pattern.pattern.converters else []
+        url = reverse(name, args=args)
+        with transaction.atomic():
+            getattr(self.client, method)(url, data)
+            transaction.set_rollback(True)
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(self.client, method)(url, data)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        return len(queries), elapsed * 1000
+
+    def test_pages_within_query_budgets(self):
+        """
+        Test every page keeps to its budget and to the same number of
+        queries however many bookings there are.
+        """
+        names = {
+            pattern.name for pattern in booking_urls + restaurant_urls}
+        self.assertEqual(
+            names - set(QUERY_BUDGETS), set(),
+            'Every page needs a query budget.')
+
+        report = []
+        counts = {}
+        times = {}
+        for size in DATASET_SIZES:
+            self.seed(size)
+            for name in sorted(names):
+                for visitor in VISITORS:
+                    queries, elapsed = self.measure(name, visitor)
+                    report.append({
+                        'page': name, 'visitor': visitor, 'bookings': size,
+                        'queries': queries, 'ms': round(elapsed, 2)})
+                    counts.setdefault((name, visitor), []).append(queries)
+                    times.setdefault((name, visitor), []).append(elapsed)
+        if os.environ.get('QUERY_BUDGET_REPORT'):
+            with open(os.environ['QUERY_BUDGET_REPORT'], 'w') as file:
+                json.dump(report, file, indent=2)
+
+        for (name, visitor), page_counts in counts.items():
+            with self.subTest(page=name, visitor=visitor):
+                self.assertLessEqual(
+                    max(page_counts), QUERY_BUDGETS[name][2])
+                self.assertEqual(
+                    len(set(page_counts)), 1,
+                    f'Queries grow with the bookings: {page_counts}')
+                page_times = times[name, visitor]
+                growth = DATASET_SIZES[-1] / DATASET_SIZES[0]
+                self.assertLessEqual(
+                    page_times[-1], max(page_times[0], MIN_PAGE_MS) * growth,
+                    f'Time grows faster than the bookings: {page_times}')
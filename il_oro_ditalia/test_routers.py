@@ -0,0 +1,115 @@
+""" Testcases for routing reads to the replica database. """
+import datetime
+import time
+from unittest import skipUnless
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from restaurant.models import Restaurant, Table
+from bookings.models import Booking
+from .routers import ReplicaRouter, RoutingState, STICKY_COOKIE, \
+    routing_state
+
+
+@override_settings(DATABASE_REPLICA='replica')
+class TestReplicaRouter(SimpleTestCase):
+    """ Tests for the database chosen for each query. """
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.token = routing_state.set(None)
+
+    def tearDown(self):
+        routing_state.reset(self.token)
+
+    def test_only_marked_views_read_from_replica(self):
+        """ Test reads outside a request or marked view use the primary. """
+        self.assertIsNone(self.router.db_for_read(Booking))
+        state = RoutingState()
+        routing_state.set(state)
+        self.assertIsNone(self.router.db_for_read(Booking))
+        state.replica = True
+        self.assertEqual(self.router.db_for_read(Booking), 'replica')
+
+    def test_reads_stay_on_primary_after_a_write(self):
+        """
+        Test reads go to the primary after the request writes or when
+        the visitor wrote recently.
+        """
+        state = RoutingState()
+        state.replica = True
+        routing_state.set(state)
+        self.assertEqual(self.router.db_for_write(Booking), 'default')
+        self.assertIsNone(self.router.db_for_read(Booking))
+
+        state = RoutingState(sticky=True)
+        state.replica = True
+        routing_state.set(state)
+        self.assertIsNone(self.router.db_for_read(Booking))
+
+
+@override_settings(DATABASE_REPLICA='replica')
+class TestReplicaStickiness(TestCase):
+    """ Tests for keeping a visitor on the primary after they write. """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name="Il oro d'Italia")
+        Table.objects.create(restaurant=self.restaurant, size=4)
+
+    def test_write_sets_sticky_cookie(self):
+        """ Test making a booking keeps the visitor's reads on the primary. """
+        response = self.client.get('/bookings/availability', {
+            'date': '2030-01-04', 'time': '18:00', 'party_size': 4})
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+        response = self.client.post('/bookings/make_booking', {
+            'date': '2030-01-04',
+            'time': datetime.time(18, 00),
+            'party_size': 4,
+            'name': 'Test Name',
+            'email': 'test@email.com',
+            'phone_number': '01234567890',
+        })
+        cookie = response.cookies[STICKY_COOKIE]
+        self.assertGreater(float(cookie.value), time.time())
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+
+
+@skipUnless(
+    'replica' in settings.DATABASES, 'Set DATABASE_REPLICA_URL to run, for '
+    'example to a second SQLite file.')
+@override_settings(DATABASE_REPLICA='replica')
+class TestReplicaReads(TestCase):
+    """
+    Tests with a separate replica database. Nothing is copied to the
+    replica, which acts as one lagging behind the primary.
+    """
+    # The test runner sets up every database named by the tests,
+    # including those which are skipped.
+    databases = {'default', 'replica' if 'replica' in settings.DATABASES
+                 else 'default'}
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            'john', 'john@email.com', 'johnpassword')
+        self.booking = Booking.objects.create(
+            date=datetime.date.today(), time=datetime.time(18, 00),
+            party_size=2, name='Test Name', email='test@email.com',
+            phone_number='01234567890', customer=self.user)
+        self.client.login(username='john', password='johnpassword')
+        # Forget the login so the next page is read from the replica.
+        self.client.cookies.pop(STICKY_COOKIE, None)
+
+    def test_lists_read_from_replica_until_visitor_writes(self):
+        """
+        Test the customer's booking list comes from the replica unless
+        they have just made a change, when it comes from the primary.
+        """
+        response = self.client.get('/bookings/my_bookings')
+        self.assertEqual(list(response.context['bookings']), [])
+
+        self.client.post(f'/bookings/delete_booking/{self.booking.id}')
+        Booking.objects.create(
+            date=datetime.date.today(), time=datetime.time(20, 00),
+            party_size=2, name='Test Name', email='test@email.com',
+            phone_number='01234567890', customer=self.user)
+        response = self.client.get('/bookings/my_bookings')
+        self.assertEqual(len(response.context['bookings']), 1)
@@ -13,14 +13,27 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from importlib import import_module
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+# Register the models of each app with the admin when the URLs are first
+# needed, rather than whenever Django starts. Only the apps managed in the
+# admin are loaded, so the sites and social account admins never are.
+ADMIN_APPS = (
+    'django.contrib.auth', 'allauth.account', 'restaurant', 'bookings',
+    'profiling')
+for app in ADMIN_APPS:
+    import_module(f'{app}.admin')
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('allauth.urls')),
     path('', include('restaurant.urls'), name='restaurant_urls'),
     path('bookings/', include('bookings.urls'), name='bookings_urls'),
+    # The same pages for one restaurant when there are several.
+    path('<slug:restaurant_slug>/', include('restaurant.urls')),
+    path('<slug:restaurant_slug>/bookings/', include('bookings.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,89 @@
+""" Admin panel set-up for the profiling app. """
+import os
+from django.conf import settings
+from django.contrib import admin, messages
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from .middleware import PROFILE_PARAMETER, profile_token
+from .models import RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """
+    Admin options for the RequestProfile model. Profiles are only
+    made by profiling requests, so they cannot be added or changed.
+    """
+    list_display = (
+        'created', 'method', 'path', 'status_code', 'duration_ms',
+        'query_count', 'user', 'stacks_link')
+    list_filter = ('method', 'status_code')
+    search_fields = ('path',)
+    readonly_fields = (
+        'user', 'created', 'method', 'path', 'status_code', 'duration_ms',
+        'query_count', 'stacks_link', 'details')
+    exclude = ('stacks_file',)
+    # Enable delete action for this model
+    actions = ['delete_selected']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        """ Add a page downloading the sampled stacks of a profile. """
+        return [
+            path(
+                '<int:profile_id>/stacks/',
+                self.admin_site.admin_view(self.download_stacks),
+                name='profiling_requestprofile_stacks'),
+        ] + super().get_urls()
+
+    @admin.display(description='Flame graph stacks')
+    def stacks_link(self, obj):
+        """ Link to the file of sampled stacks of the profile. """
+        return format_html(
+            '<a href="{}">{}</a>',
+            reverse('admin:profiling_requestprofile_stacks', args=[obj.id]),
+            obj.stacks_file)
+
+    def download_stacks(self, request, profile_id):
+        """ Return the file of sampled stacks of a profile. """
+        if not self.has_view_permission(request):
+            raise Http404
+        profile = get_object_or_404(RequestProfile, id=profile_id)
+        stacks_path = os.path.join(settings.PROFILE_DIR, profile.stacks_file)
+        if not os.path.isfile(stacks_path):
+            raise Http404
+        return FileResponse(
+            open(stacks_path, 'rb'), as_attachment=True,
+            filename=profile.stacks_file, content_type='text/plain')
+
+    def changelist_view(self, request, extra_context=None):
+        """ Show a superuser the token to add to pages to profile them. """
+        if request.user.is_superuser:
+            messages.info(
+                request,
+                f'Add ?{PROFILE_PARAMETER}={profile_token(request.user)} '
+                'to the address of a page to profile it. The token lasts '
+                f'{settings.PROFILE_TOKEN_SECONDS // 60} minutes. The '
+                'stacks of async pages include any other requests served '
+                'by the same event loop at the time.')
+        return super().changelist_view(request, extra_context)
+
+    def delete_model(self, request, obj):
+        """ Remove the stacks file along with the profile. """
+        self.delete_queryset(request, RequestProfile.objects.filter(
+            id=obj.id))
+
+    def delete_queryset(self, request, queryset):
+        """ Remove the stacks files along with the profiles. """
+        for stacks_file in queryset.values_list('stacks_file', flat=True):
+            stacks_path = os.path.join(settings.PROFILE_DIR, stacks_file)
+            if os.path.isfile(stacks_path):
+                os.remove(stacks_path)
+        queryset.delete()
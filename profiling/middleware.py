@@ -0,0 +1,122 @@
+""" Profile a request when the owner asks for it. """
+import asyncio
+import os
+import threading
+import uuid
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from .models import RequestProfile
+from .profiler import RequestProfiler
+
+# A request is profiled when it carries a token in this query parameter
+# or header, signed for the superuser making it.
+PROFILE_PARAMETER = 'profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE_TOKEN'
+TOKEN_SALT = 'profiling.request'
+
+
+def profile_token(user):
+    """ Return a token a superuser can add to requests to profile them. """
+    return signing.dumps(user.pk, salt=TOKEN_SALT)
+
+
+def wants_profile(request):
+    """
+    Return whether the request carries a valid, unexpired profiling
+    token for the superuser making it.
+    """
+    token = (request.GET.get(PROFILE_PARAMETER) or
+             request.META.get(PROFILE_HEADER))
+    if not token or not request.user.is_superuser:
+        return False
+    try:
+        return signing.loads(
+            token, salt=TOKEN_SALT,
+            max_age=settings.PROFILE_TOKEN_SECONDS) == request.user.pk
+    except signing.BadSignature:
+        return False
+
+
+def save_profile(request, response, profiler):
+    """
+    Write the sampled stacks to PROFILE_DIR and record the profile.
+    """
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    stacks_file = (
+        f"{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.collapsed")
+    with open(os.path.join(settings.PROFILE_DIR, stacks_file), 'w') as file:
+        file.write(profiler.collapsed_stacks())
+    return RequestProfile.objects.create(
+        user=request.user, method=request.method,
+        path=request.get_full_path()[:500],
+        status_code=response.status_code,
+        duration_ms=round(profiler.duration * 1000, 3),
+        query_count=len(profiler.queries), stacks_file=stacks_file,
+        details={
+            'queries': profiler.queries,
+            'templates': profiler.templates,
+            'table_search': profiler.table_search,
+        })
+
+
+def has_token(request):
+    """
+    Return whether the request has a profiling token to check, from its
+    query string and headers alone.
+    """
+    return (f'{PROFILE_PARAMETER}=' in request.META.get('QUERY_STRING', '')
+            or PROFILE_HEADER in request.META)
+
+
+class ProfilingMiddleware:
+    """
+    Profile the rest of the handling of requests made by a superuser
+    with a profiling token. Other requests only have their query string
+    and headers checked for a token, in the event loop when served by
+    the ASGI application, so that async views are not moved to a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the middleware as a coroutine function, as Django's
+            # MiddlewareMixin does, so that it is awaited.
+            # pylint: disable=protected-access
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not has_token(request) or not wants_profile(request):
+            return self.get_response(request)
+        return self.profiled_response(request, self.get_response)
+
+    async def __acall__(self, request):
+        if not has_token(request) or not await sync_to_async(
+                wants_profile)(request):
+            return await self.get_response(request)
+
+        # The profiler records the queries and functions of a single
+        # thread, so the rest of the request is handled from a thread as
+        # in a sync view, with the view itself sampled in the event loop.
+        loop_thread = threading.get_ident()
+        return await sync_to_async(self.profiled_response)(
+            request, async_to_sync(self.get_response), loop_thread)
+
+    @staticmethod
+    def profiled_response(request, get_response, *other_threads):
+        """
+        Return the response with its handling profiled, sampling the
+        stacks of the other threads given as well.
+        """
+        # Streamed content is produced after the response is returned,
+        # so it is not included.
+        with RequestProfiler(other_threads) as profiler:
+            response = get_response(request)
+        save_profile(request, response, profiler)
+        return response
@@ -0,0 +1,29 @@
+""" Models for the profiling app. """
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class RequestProfile(models.Model):
+    """
+    A request profiled at the owner's request. The sampled call stacks
+    are saved as a file in PROFILE_DIR and the SQL, template and table
+    search timings are kept with the profile.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True,
+        related_name='request_profiles')
+    created = models.DateTimeField(auto_now_add=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    stacks_file = models.CharField(max_length=200)
+    details = models.JSONField(default=dict)
+
+    class Meta:
+        """ Show the latest profiles first. """
+        ordering = ['-created']
+
+    def __str__(self):
+        return f"{self.method} {self.path} in {self.duration_ms:.0f}ms"
@@ -0,0 +1,191 @@
+""" Record where the time of a single request goes. """
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+# Seconds between samples of the request's call stack.
+SAMPLE_INTERVAL = 0.001
+# Modules of the table search whose function timings are reported.
+TABLE_SEARCH_FILES = tuple(
+    os.path.join('bookings', f'{module}.py')
+    for module in ('check_availability', 'occupancy', 'intervals'))
+
+# The profiler of the request being profiled, if any.
+active_profiler = ContextVar('active_profiler', default=None)
+template_timer_lock = threading.Lock()
+template_timer_installed = False
+
+
+def install_template_timer():
+    """
+    Time each template rendered while a request is profiled. Rendering
+    is only wrapped once the first profile is taken, so other requests
+    are unaffected until then and only check for a profiler afterwards.
+    """
+    global template_timer_installed  # pylint: disable=global-statement
+    with template_timer_lock:
+        if template_timer_installed:
+            return
+        original_render = Template.render
+
+        def render(self, context):
+            profiler = active_profiler.get()
+            if profiler is None:
+                return original_render(self, context)
+            started = time.perf_counter()
+            try:
+                return original_render(self, context)
+            finally:
+                profiler.templates.append({
+                    'name': self.origin.template_name or '<string>',
+                    'ms': round((time.perf_counter() - started) * 1000, 3),
+                })
+
+        Template.render = render
+        template_timer_installed = True
+
+
+def frame_name(frame):
+    """ Return the module and function of a stack frame. """
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+def query_origin():
+    """
+    Return the project code, innermost last, which made the current query.
+    """
+    base_dir = str(settings.BASE_DIR)
+    own_dir = os.path.dirname(__file__)
+    origin = []
+    frame = sys._getframe()  # pylint: disable=protected-access
+    while frame is not None and len(origin) < 5:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(base_dir) and
+                not filename.startswith(own_dir) and
+                'site-packages' not in filename):
+            origin.append(
+                f'{os.path.relpath(filename, base_dir)}:{frame.f_lineno} '
+                f'in {frame.f_code.co_name}')
+        frame = frame.f_back
+    return origin[::-1]
+
+
+class StackSampler(threading.Thread):
+    """
+    Count the call stacks of threads sampled every SAMPLE_INTERVAL.
+    """
+    def __init__(self, thread_ids):
+        super().__init__(daemon=True)
+        self.thread_ids = thread_ids
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            # pylint: disable=protected-access
+            frames = sys._current_frames()
+            for thread_id in self.thread_ids:
+                frame = frames.get(thread_id)
+                names = []
+                while frame is not None:
+                    names.append(frame_name(frame))
+                    frame = frame.f_back
+                if names:
+                    self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        """ Stop sampling and wait for the last sample. """
+        self.stopped.set()
+        self.join()
+
+
+class RequestProfiler:
+    """
+    Profile the code run within it on the current thread: its call
+    stacks are sampled for a flame graph, its SQL queries are timed
+    with the code which made them, its templates are timed, and the
+    functions of the table search are profiled call by call.
+
+    The stacks of other threads can be sampled as well, such as the
+    event loop running an async view. The event loop also runs the other
+    requests being served, whose stacks are included with the view's.
+    """
+    def __init__(self, other_threads=()):
+        self.queries = []
+        self.templates = []
+        self.table_search = []
+        self.duration = 0
+        self.sampler = StackSampler(
+            (threading.get_ident(), *other_threads))
+        self.profile = cProfile.Profile()
+        self.exit_stack = ExitStack()
+        self.started = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        """ Time a query and note where it was made. """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'database': context['connection'].alias,
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+                'origin': query_origin(),
+            })
+
+    def __enter__(self):
+        install_template_timer()
+        for connection in connections.all():
+            self.exit_stack.enter_context(
+                connection.execute_wrapper(self.record_query))
+        self.exit_stack.callback(
+            active_profiler.reset, active_profiler.set(self))
+        self.sampler.start()
+        self.started = time.perf_counter()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+        self.duration = time.perf_counter() - self.started
+        self.sampler.stop()
+        self.exit_stack.close()
+        self.table_search = self.table_search_stats()
+
+    def table_search_stats(self):
+        """
+        Return the calls and times of the table search functions, the
+        slowest first.
+        """
+        rows = []
+        stats = pstats.Stats(self.profile).stats
+        for (filename, _, function), (_, calls, own, total, _) in (
+                stats.items()):
+            if filename.endswith(TABLE_SEARCH_FILES):
+                module = os.path.splitext(os.path.basename(filename))[0]
+                rows.append({
+                    'function': f'{module}.{function}',
+                    'calls': calls,
+                    'own_ms': round(own * 1000, 3),
+                    'total_ms': round(total * 1000, 3),
+                })
+        return sorted(rows, key=lambda row: -row['total_ms'])
+
+    def collapsed_stacks(self):
+        """
+        Return the sampled stacks in the collapsed format read by
+        flamegraph.pl and speedscope, one stack and its count per line.
+        """
+        return ''.join(
+            f'{stack} {count}\n'
+            for stack, count in self.sampler.stacks.most_common())
@@ -0,0 +1,166 @@
+""" Testcases for profiling requests. """
+import asyncio
+import datetime
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.handlers.base import BaseHandler
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from restaurant.models import Restaurant, Table
+from .middleware import ProfilingMiddleware, profile_token
+from .models import RequestProfile
+
+
+class TestProfilingMiddleware(TestCase):
+    """ Tests for profiling the requests of the restaurant owner. """
+    def setUp(self):
+        self.profile_dir = tempfile.TemporaryDirectory()
+        settings = override_settings(PROFILE_DIR=self.profile_dir.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(self.profile_dir.cleanup)
+
+        restaurant = Restaurant.objects.create(name="Il oro d'Italia")
+        Table.objects.create(restaurant=restaurant, size=4)
+        self.owner = User.objects.create_superuser(
+            'owner', 'owner@email.com', 'ownerpassword')
+        self.user = User.objects.create_user(
+            'john', 'john@email.com', 'johnpassword')
+
+    def test_only_owner_with_valid_token_profiled(self):
+        """
+        Test requests are only profiled with a token signed for the
+        superuser making them.
+        """
+        self.client.login(username='john', password='johnpassword')
+        self.client.get(
+            '/bookings/make_booking', {'profile': profile_token(self.user)})
+        self.client.login(username='owner', password='ownerpassword')
+        self.client.get('/bookings/make_booking')
+        self.client.get('/bookings/make_booking', {'profile': 'forged'})
+        self.client.get(
+            '/bookings/make_booking', {'profile': profile_token(self.user)})
+        self.assertFalse(RequestProfile.objects.exists())
+
+        self.client.get(
+            '/bookings/manage_bookings',
+            HTTP_X_PROFILE_TOKEN=profile_token(self.owner))
+        self.assertEqual(RequestProfile.objects.count(), 1)
+
+    def test_profile_records_stacks_sql_templates_and_table_search(self):
+        """
+        Test a profiled booking saves its stacks for a flame graph and
+        records its queries, templates and table search.
+        """
+        self.client.login(username='owner', password='ownerpassword')
+        token = profile_token(self.owner)
+        self.client.post(
+            f'/bookings/make_booking?profile={token}',
+            {
+                'date': '2030-01-04',
+                'time': datetime.time(18, 00),
+                'party_size': 4,
+                'name': 'Test Name',
+                'email': 'test@email.com',
+                'phone_number': '01234567890',
+            })
+        profile = RequestProfile.objects.get()
+        self.assertEqual(profile.method, 'POST')
+        self.assertEqual(profile.status_code, 302)
+        self.assertEqual(
+            profile.query_count, len(profile.details['queries']))
+
+        with open(os.path.join(
+                self.profile_dir.name, profile.stacks_file)) as file:
+            for line in file:
+                stack, count = line.rsplit(' ', 1)
+                self.assertIn(';', stack)
+                self.assertGreater(int(count), 0)
+
+        origins = [
+            line for query in profile.details['queries']
+            for line in query['origin']]
+        self.assertTrue(any(
+            line.startswith(os.path.join('bookings', 'views.py'))
+            for line in origins))
+        functions = [
+            row['function'] for row in profile.details['table_search']]
+        self.assertIn('check_availability.find_tables', functions)
+
+        self.client.get('/bookings/make_booking', {'profile': token})
+        templates = [
+            template['name'] for template in
+            RequestProfile.objects.latest('id').details['templates']]
+        self.assertIn('bookings/make_booking.html', templates)
+
+    def test_profiles_listed_in_admin(self):
+        """
+        Test the admin shows the owner's token and serves the stacks.
+        """
+        self.client.login(username='owner', password='ownerpassword')
+        response = self.client.get('/admin/profiling/requestprofile/')
+        self.assertContains(response, '?profile=')
+
+        self.client.get(
+            '/bookings/make_booking', {'profile': profile_token(self.owner)})
+        profile = RequestProfile.objects.get()
+        response = self.client.get(
+            f'/admin/profiling/requestprofile/{profile.id}/stacks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Disposition'],
+            f'attachment; filename="{profile.stacks_file}"')
+
+    def test_async_views_not_adapted(self):
+        """
+        Test the ASGI handler calls the middleware from the event loop, so
+        async views are only moved to a thread for a profiled request.
+        """
+        with mock.patch.object(
+                BaseHandler, 'adapt_method_mode', autospec=True,
+                side_effect=BaseHandler.adapt_method_mode) as adapt:
+            BaseHandler().load_middleware(is_async=True)
+        # Each middleware is given the rest of the chain, adapted when it
+        # is called in the other mode.
+        adapted = [
+            call.kwargs['name'] for call in adapt.call_args_list
+            if 'name' in call.kwargs and call.args[1] != call.args[3]]
+        self.assertFalse(any(
+            'ProfilingMiddleware' in name for name in adapted))
+
+        threads = []
+
+        async def view(request):
+            threads.append(threading.get_ident())
+            # Work in the event loop long enough to be sampled.
+            ends = time.perf_counter() + 0.05
+            while time.perf_counter() < ends:
+                pass
+            return HttpResponse()
+
+        middleware = ProfilingMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+
+        async def handle(request):
+            response = await middleware(request)
+            return response, threading.get_ident()
+
+        request = RequestFactory().get('/')
+        request.user = self.owner
+        _, loop_thread = async_to_sync(handle)(request)
+        self.assertEqual(threads, [loop_thread])
+        self.assertFalse(RequestProfile.objects.exists())
+
+        request = RequestFactory().get(
+            '/', {'profile': profile_token(self.owner)})
+        request.user = self.owner
+        async_to_sync(handle)(request)
+        profile = RequestProfile.objects.get()
+        with open(os.path.join(
+                self.profile_dir.name, profile.stacks_file)) as file:
+            self.assertIn('test_middleware:view', file.read())
@@ -1,15 +1,10 @@
 """ Admin panel set-up for the restaurant app. """
 from django.contrib import admin
-from django.contrib.sites.models import Site
-from allauth.socialaccount.models import SocialAccount, SocialToken, SocialApp
 from .models import Restaurant, Table
 
 
-# Remove unrequired models from the admin panel.
-admin.site.unregister(Site)
-admin.site.unregister(SocialAccount)
-admin.site.unregister(SocialToken)
-admin.site.unregister(SocialApp)
+# The sites and social account models are left out of the admin panel
+# by only loading the admin modules listed in the URLconf.
 
 # Disable delete action for the site
 admin.site.disable_action('delete_selected')
@@ -20,12 +15,18 @@ class RestaurantAdmin(admin.ModelAdmin):
     """
     Admin options for the Restaurant model.
     """
-    # Pizza oven restaurant name is used in some of the templates
-    # so ensure it cannot be changed in the admin.
-    readonly_fields = ('name',)
-
-    list_display = ('name', 'opening_time', 'closing_time')
+    list_display = ('name', 'slug', 'host', 'opening_time', 'closing_time')
     search_fields = ('name',)
+    prepopulated_fields = {'slug': ('name',)}
+
+    def get_readonly_fields(self, request, obj=None):
+        """
+        Restaurant names and slugs are used in some of the templates and
+        in links, so ensure they cannot be changed once added.
+        """
+        if obj is not None:
+            return ('name', 'slug')
+        return ()
 
 
 @admin.register(Table)
@@ -33,8 +34,20 @@ class TableAdmin(admin.ModelAdmin):
     """
     Admin options for the Table model.
     """
-    list_display = ('size', 'restaurant')
+    list_display = ('id', 'size', 'restaurant')
     ordering = ('size',)
-    list_filter = ('size',)
+    list_filter = ('restaurant', 'size')
+    filter_horizontal = ('adjacent',)
     # Enable delete action for this model
     actions = ['delete_selected']
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        """
+        Show the ids of the neighbouring tables, which otherwise all
+        look alike, as listed on the table list.
+        """
+        field = super().formfield_for_manytomany(db_field, request, **kwargs)
+        if db_field.name == 'adjacent':
+            field.label_from_instance = (
+                lambda table: f'Table {table.id} ({table.size} people)')
+        return field
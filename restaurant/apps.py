@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ItalianRestaurantWebsiteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'restaurant'
+
+    def ready(self):
+        """ Connect the restaurant cache invalidation receivers. """
+        # pylint: disable=import-outside-toplevel, unused-import
+        from . import signals  # noqa: F401
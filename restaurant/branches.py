@@ -0,0 +1,51 @@
+""" Find the restaurant a request is for. """
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Restaurant
+
+RESTAURANTS_CACHE_KEY = 'restaurants'
+# The session key remembering the restaurant last chosen by URL.
+SESSION_KEY = 'restaurant'
+
+
+def restaurants():
+    """
+    Return all of the restaurants by slug in the order they were added.
+    There are only a few so they are loaded together and cached.
+    """
+    branches = cache.get(RESTAURANTS_CACHE_KEY)
+    if branches is None:
+        branches = {
+            restaurant.slug: restaurant
+            for restaurant in Restaurant.objects.order_by('id')}
+        cache.set(
+            RESTAURANTS_CACHE_KEY, branches,
+            settings.RESTAURANT_CACHE_TIMEOUT)
+    return branches
+
+
+def invalidate_restaurants():
+    """ Remove the restaurants from the cache after one has changed. """
+    cache.delete(RESTAURANTS_CACHE_KEY)
+
+
+def resolve_restaurant(request, slug=None):
+    """
+    Return the restaurant named by the slug in the URL, otherwise the
+    one with its own host name, the one the visitor last chose or the
+    first restaurant. Returns None for an unknown slug.
+    """
+    branches = restaurants()
+    if slug:
+        return branches.get(slug)
+
+    host = request.get_host().split(':')[0]
+    for restaurant in branches.values():
+        if restaurant.host and restaurant.host == host:
+            return restaurant
+
+    remembered = request.session.get(SESSION_KEY)
+    if remembered in branches:
+        return branches[remembered]
+    return next(iter(branches.values()), None)
@@ -0,0 +1,28 @@
+""" Middleware for the restaurant app. """
+from django.http import Http404
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .branches import SESSION_KEY, resolve_restaurant
+
+
+class RestaurantMiddleware(MiddlewareMixin):
+    """
+    Set request.restaurant to the restaurant the request is for. The
+    restaurant slug captured by the URL is removed before the view is
+    called so views do not need to accept it.
+    """
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        slug = view_kwargs.pop('restaurant_slug', None)
+        if not slug:
+            # Only looked up by the views which use it.
+            request.restaurant = SimpleLazyObject(
+                lambda: resolve_restaurant(request))
+            return
+
+        request.restaurant = resolve_restaurant(request, slug)
+        if request.restaurant is None:
+            raise Http404('No restaurant found.')
+        # Links without the slug stay with the chosen restaurant.
+        if request.session.get(SESSION_KEY) != slug:
+            request.session[SESSION_KEY] = slug
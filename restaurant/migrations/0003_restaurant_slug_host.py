@@ -0,0 +1,50 @@
+# Generated by Django 3.2 on 2026-10-19 10:00
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def add_slugs(apps, schema_editor):
+    """ Create a unique slug from the name of each existing restaurant. """
+    Restaurant = apps.get_model('restaurant', 'Restaurant')
+    used = set()
+    for restaurant in Restaurant.objects.order_by('id'):
+        slug = base = slugify(restaurant.name) or 'restaurant'
+        number = 1
+        while slug in used:
+            number += 1
+            slug = f'{base}-{number}'
+        used.add(slug)
+        restaurant.slug = slug
+        restaurant.save(update_fields=['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0002_auto_20220415_1700'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='host',
+            field=models.CharField(blank=True, help_text='Domain name serving only this restaurant, if any.', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='slug',
+            field=models.SlugField(default='', db_index=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(add_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='slug',
+            field=models.SlugField(help_text='Used in the web address of the restaurant.', unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='table',
+            index=models.Index(fields=['restaurant', 'size'], name='table_restaurant_size_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-19 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0003_restaurant_slug_host'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='table',
+            name='adjacent',
+            field=models.ManyToManyField(blank=True, help_text='Tables next to this one which can be pushed together with it for larger parties.', related_name='_restaurant_table_adjacent_+', to='restaurant.Table'),
+        ),
+    ]
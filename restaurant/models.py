@@ -2,6 +2,7 @@
 import datetime
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.utils.text import slugify
 from cloudinary.models import CloudinaryField
 
 
@@ -12,6 +13,11 @@ class Restaurant(models.Model):
     booking system.
     """
     name = models.CharField(max_length=50)
+    slug = models.SlugField(
+        unique=True, help_text='Used in the web address of the restaurant.')
+    host = models.CharField(
+        max_length=100, blank=True,
+        help_text='Domain name serving only this restaurant, if any.')
     description = models.TextField(
         blank=True, help_text='Warning editing this field will change the'
         ' About Us section on the home page!'
@@ -30,6 +36,15 @@ class Restaurant(models.Model):
         if self.closing_time <= self.opening_time:
             raise ValidationError('Closing time should be after opening time!')
 
+    def save(self, *args, **kwargs):
+        """
+        Override the original save method to create the slug from
+        the name if one has not been given.
+        """
+        if not self.slug:
+            self.slug = slugify(self.name)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
@@ -50,6 +65,22 @@ class Table(models.Model):
     restaurant = models.ForeignKey(
         Restaurant, on_delete=models.CASCADE, related_name='tables')
     size = models.IntegerField(choices=TABLE_SIZES)
+    # The floor plan. When no table of a restaurant has neighbours set
+    # any of its tables can be combined.
+    adjacent = models.ManyToManyField(
+        'self', blank=True,
+        help_text='Tables next to this one which can be pushed together '
+        'with it for larger parties.')
+
+    class Meta:
+        """
+        Tables are always searched within one restaurant, often by size.
+        """
+        indexes = [
+            models.Index(
+                fields=['restaurant', 'size'],
+                name='table_restaurant_size_idx'),
+        ]
 
     def __str__(self):
         return f"A table of {self.size} people size"
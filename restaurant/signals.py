@@ -0,0 +1,13 @@
+""" Keep the cached restaurants up to date. """
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .branches import invalidate_restaurants
+from .models import Restaurant
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def restaurant_changed(sender, instance, **kwargs):
+    """ Reload the restaurants when one is added, changed or removed. """
+    invalidate_restaurants()
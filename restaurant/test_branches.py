@@ -0,0 +1,82 @@
+""" Testcases for finding the restaurant a request is for. """
+import datetime
+from django.test import TestCase
+from bookings.models import Booking
+from bookings.check_availability import find_tables
+from .models import Restaurant, Table
+
+
+class TestBranches(TestCase):
+    """ Tests for serving more than one restaurant. """
+    def setUp(self):
+        self.original = Restaurant.objects.create(name="Il oro d'Italia")
+        self.branch = Restaurant.objects.create(
+            name='Il oro Soho', host='soho.example.com',
+            opening_time=datetime.time(17, 00))
+        self.original_table = Table.objects.create(
+            restaurant=self.original, size=4)
+        self.branch_table = Table.objects.create(
+            restaurant=self.branch, size=4)
+
+    def test_slug_created_from_name(self):
+        """ Test the slug defaults to the restaurant name. """
+        self.assertEqual(self.original.slug, 'il-oro-ditalia')
+        self.assertEqual(self.branch.slug, 'il-oro-soho')
+
+    def test_restaurant_chosen_by_url_host_or_session(self):
+        """
+        Test the restaurant is taken from the URL, then the host name,
+        then the restaurant last chosen, then the first restaurant.
+        """
+        response = self.client.get('/bookings/make_booking')
+        self.assertEqual(response.wsgi_request.restaurant, self.original)
+
+        with self.settings(ALLOWED_HOSTS=['soho.example.com']):
+            response = self.client.get(
+                '/bookings/make_booking', HTTP_HOST='soho.example.com')
+        self.assertEqual(response.wsgi_request.restaurant, self.branch)
+
+        response = self.client.get('/il-oro-soho/bookings/make_booking')
+        self.assertEqual(response.wsgi_request.restaurant, self.branch)
+        # The booking slots start at the branch opening time.
+        slots = response.context['booking_form'].fields['time'].widget.choices
+        self.assertEqual(slots[0][1], '17:00')
+
+        response = self.client.get('/bookings/make_booking')
+        self.assertEqual(response.wsgi_request.restaurant, self.branch)
+
+        response = self.client.get('/nowhere/bookings/make_booking')
+        self.assertEqual(response.status_code, 404)
+
+    def test_availability_scoped_to_restaurant(self):
+        """
+        Test the table search only uses and is only affected by the
+        tables and bookings of the restaurant.
+        """
+        booking = Booking.objects.create(
+            restaurant=self.original, date=datetime.date(2030, 1, 4),
+            time=datetime.time(18, 00), party_size=4, name='Test Name',
+            email='test@email.com', phone_number='01234567890')
+        booking.tables.add(self.original_table)
+
+        search = (
+            datetime.date(2030, 1, 4), datetime.time(18, 00),
+            datetime.time(20, 00), 4, '')
+        self.assertIsNone(find_tables(*search, self.original))
+        self.assertEqual(find_tables(*search, self.branch), self.branch_table)
+
+    def test_booking_made_at_restaurant_in_url(self):
+        """ Test a booking made through a branch URL belongs to it. """
+        self.client.post(
+            '/il-oro-soho/bookings/make_booking',
+            {
+                'date': '2030-01-04',
+                'time': datetime.time(18, 00),
+                'party_size': 4,
+                'name': 'Test Name',
+                'email': 'test@email.com',
+                'phone_number': '01234567890',
+            })
+        booking = Booking.objects.get()
+        self.assertEqual(booking.restaurant, self.branch)
+        self.assertEqual(list(booking.tables.all()), [self.branch_table])
@@ -1,16 +1,16 @@
 """ Views for the restaurant app. """
-from django.shortcuts import render
-from .models import Restaurant
+from il_oro_ditalia.asynchronous import arender
+from il_oro_ditalia.routers import read_from_replica
 
 
-def index(request):
+@read_from_replica
+async def index(request):
     """
     A view to return the homepage. Fields from the restaurant
     model will be used to populate some sections of the page.
     """
-    restaurant = Restaurant.objects.get(name="Il oro d'Italia")
     context = {
-        'restaurant': restaurant,
+        'restaurant': request.restaurant,
     }
 
-    return render(request, 'restaurant/index.html', context)
+    return await arender(request, 'restaurant/index.html', context)
@@ -0,0 +1,54 @@
+// Patch the owner's booking dashboard as bookings change
+const dashboard = document.querySelector('[data-events-url]');
+if (dashboard && window.EventSource) {
+    const list = dashboard.querySelector('.manage-content');
+    const events = new EventSource(dashboard.dataset.eventsUrl);
+
+    events.addEventListener('booking', function (message) {
+        const change = JSON.parse(message.data);
+        const current = document.getElementById('booking-' + change.id);
+        if (current) {
+            current.remove();
+        }
+        if (change.kind === 'cancelled') {
+            return;
+        }
+
+        // Keep the cards in date and time order
+        const template = document.createElement('template');
+        template.innerHTML = change.html.trim();
+        const card = template.content.querySelector('.card');
+        const later = Array.from(list.querySelectorAll('[data-start]')).find(
+            other => other.dataset.start > change.start);
+        if (later) {
+            list.insertBefore(card, later);
+        } else {
+            list.appendChild(card);
+        }
+        const empty = document.getElementById('no-bookings');
+        if (empty) {
+            empty.remove();
+        }
+    });
+}
+
+// Turn off the updated flag of every flagged booking in one request
+const markSeen = document.getElementById('mark-seen');
+if (markSeen) {
+    markSeen.addEventListener('submit', function (event) {
+        event.preventDefault();
+        const data = new FormData(markSeen);
+        document.querySelectorAll('.card .manage-updated').forEach(function (flag) {
+            data.append('booking_id', flag.closest('.card').id.replace('booking-', ''));
+        });
+        if (!data.has('booking_id')) {
+            return;
+        }
+        fetch(markSeen.action, {method: 'POST', body: data}).then(function () {
+            // Open dashboards are sent the changed bookings
+            if (!window.EventSource) {
+                window.location.reload();
+            }
+        });
+    });
+}